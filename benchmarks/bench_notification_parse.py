@@ -0,0 +1,71 @@
+"""
+Benchmark parsing a notifications response body into GhNotifications.
+
+    python -m benchmarks.bench_notification_parse --count 10000
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from loguru import logger
+
+from gh_taskw._json import backend
+from gh_taskw.gh_notification import parse_notifications
+
+REASONS = ["review_requested", "mention", "author", "ci_activity", "subscribed"]
+
+
+def make_payload(count: int) -> bytes:
+    notifications = []
+    for i in range(count):
+        kind = "pulls" if i % 2 else "issues"
+        notifications.append(
+            {
+                "id": str(i),
+                "unread": True,
+                "reason": REASONS[i % len(REASONS)],
+                "updated_at": "2024-01-01T00:00:00Z",
+                "subject": {
+                    "title": f"Notification number {i}",
+                    "url": f"https://api.github.com/repos/octo/repo{i % 50}/{kind}/{i}",
+                    "type": "PullRequest" if kind == "pulls" else "Issue",
+                },
+                "repository": {
+                    "name": f"repo{i % 50}",
+                    "full_name": f"octo/repo{i % 50}",
+                    "owner": {"login": "octo"},
+                },
+            }
+        )
+    return json.dumps(notifications).encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--loglevel", default="INFO")
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level=args.loglevel)
+
+    payload = make_payload(args.count)
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        notifications = list(parse_notifications(payload))
+        timings.append(time.perf_counter() - start)
+    assert len(notifications) == args.count
+
+    best = min(timings)
+    print(
+        f"parsed {args.count} notifications ({len(payload) / 1e6:.1f} MB, {backend()[0]}) "
+        f"in {best * 1000:.1f} ms, {args.count / best:,.0f} notifications/s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark routing notifications through a large set of rules.
+
+    python -m benchmarks.bench_routing --rules 500 --count 10000
+"""
+
+import argparse
+import random
+import time
+
+from gh_taskw.routing import Router, Rule
+
+REASONS = ["review_requested", "mention", "author", "ci_activity", "subscribed"]
+SUBJECTS = [r"^\[security\]", "(?i)release", r"^Bump \S+ from", "flaky", r"#\d+$"]
+
+
+def make_rules(count: int, rng: random.Random) -> list[Rule]:
+    rules = []
+    for i in range(count):
+        config = {"tags": [f"rule{i}"]}
+        if rng.random() < 0.6:
+            config["reason"] = rng.choice(REASONS)
+        if rng.random() < 0.8:
+            repo = rng.choice(["*", f"repo{i % 50}", "repo1*"])
+            config["repo"] = f"org{rng.randrange(100)}/{repo}"
+        if rng.random() < 0.5:
+            config["subject"] = rng.choice(SUBJECTS)
+        rules.append(Rule.from_config(config))
+    return rules
+
+
+def make_notifications(count: int, rng: random.Random) -> list[tuple[str, str, str]]:
+    return [
+        (
+            rng.choice(REASONS),
+            f"org{rng.randrange(120)}/repo{rng.randrange(60)}",
+            rng.choice(
+                [
+                    "Fix the flaky test",
+                    "Bump foo from 1 to 2",
+                    "Release 1.0",
+                    "Misc #12",
+                ]
+            ),
+        )
+        for _ in range(count)
+    ]
+
+
+def best_of(repeat: int, fn) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rules", type=int, default=500)
+    parser.add_argument("--count", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    rules = make_rules(args.rules, rng)
+    notifications = make_notifications(args.count, rng)
+
+    start = time.perf_counter()
+    router = Router(rules)
+    compile_time = time.perf_counter() - start
+
+    compiled = best_of(
+        args.repeat,
+        lambda: [router.route(*notification) for notification in notifications],
+    )
+    # the rules one after the other, as a baseline
+    linear = best_of(
+        1,
+        lambda: [
+            next((rule for rule in rules if rule.matches(*notification)), None)
+            for notification in notifications
+        ],
+    )
+
+    print(f"compiled {args.rules} rules in {compile_time * 1000:.1f} ms")
+    print(
+        f"compiled: {args.count} notifications in {compiled * 1000:.1f} ms, "
+        f"{args.count / compiled:,.0f} notifications/s"
+    )
+    print(
+        f"linear:   {args.count} notifications in {linear * 1000:.1f} ms, "
+        f"{args.count / linear:,.0f} notifications/s"
+    )
+
+
+if __name__ == "__main__":
+    main()
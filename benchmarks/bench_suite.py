@@ -0,0 +1,293 @@
+"""
+Benchmark suite of gh_taskw against fake GitHub and Taskwarrior backends.
+
+    python -m benchmarks.bench_suite
+    python -m benchmarks.bench_suite --scenario add_task --count 5000
+    python -m benchmarks.bench_suite --update-baselines
+
+Scenarios:
+
+    pipeline    a full `gh_taskw` run (cli.main): poll, process, import tasks,
+                mark read and check closed PRs
+    add_task    TaskwarriorHandler.add_task for every notification, then flush_tasks
+    closed_prs  TaskwarriorHandler.handle_closed_prs over pending review tasks,
+                half of which are closed
+
+Each scenario reports ops/s, the number of `task` subprocesses and the peak
+of Python allocations. The suite exits with 1 if a result regressed past the
+baselines in `benchmarks/baselines.json`: throughput or peak memory by more
+than `--tolerance`, or any additional subprocess. Throughput baselines are
+only compared for the same `--count` and only mean something on the machine
+they were taken on, refresh them with `--update-baselines`.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable
+
+from benchmarks.fakes import (
+    FakeGitHub,
+    REASONS,
+    install_fake_task,
+    make_notifications,
+    write_tasks,
+)
+
+BASELINES = Path(__file__).with_name("baselines.json")
+
+
+@dataclass
+class Result:
+    scenario: str
+    count: int
+    seconds: float
+    subprocess_spawns: int
+    peak_mb: float
+
+    @property
+    def ops_per_sec(self) -> float:
+        return self.count / self.seconds
+
+
+def _handler(workdir: Path, github: FakeGitHub, **kwargs):
+    from gh_taskw.github_api import GitHubClient
+    from gh_taskw.taskwarrior_handler import TaskwarriorHandler
+
+    return TaskwarriorHandler(
+        github=GitHubClient(token="fake", base_url=github.url),
+        taskdata=workdir / "taskdata",
+        state_dir=workdir / "state",
+        loglevel="ERROR",
+        **kwargs,
+    )
+
+
+def setup_pipeline(workdir: Path, github: FakeGitHub, count: int) -> Callable[[], None]:
+    from gh_taskw.cli import main
+
+    github.reset(make_notifications(count))
+    home = workdir / "home"
+    (home / ".config").mkdir(parents=True)
+    (home / ".config" / "gh_taskw.toml").write_text(
+        "\n".join(
+            [
+                'github_token = "fake"',
+                f'api_url = "{github.url}"',
+                f'taskdata = "{workdir / "taskdata"}"',
+                f'state_dir = "{workdir / "state"}"',
+                'loglevel = "ERROR"',
+                'ignore_notification_reasons = ["ci_activity"]',
+                'high_priority_reasons = ["review_requested"]',
+                'add_task_for_reasons = ["review_requested", "mention", "author", "comment"]',
+            ]
+        )
+    )
+
+    def run():
+        old_home = os.environ.get("HOME")
+        os.environ["HOME"] = str(home)
+        try:
+            main.main(args=[], standalone_mode=False)
+        finally:
+            if old_home is None:
+                del os.environ["HOME"]
+            else:
+                os.environ["HOME"] = old_home
+
+    return run
+
+
+def setup_add_task(workdir: Path, github: FakeGitHub, count: int) -> Callable[[], None]:
+    from gh_taskw.gh_notification import GhNotification
+
+    github.reset([])
+    handler = _handler(workdir, github, add_task_for_reasons=REASONS)
+    notifications = [
+        GhNotification.from_notification_dict(n) for n in make_notifications(count)
+    ]
+
+    def run():
+        for notification in notifications:
+            handler.add_task(notification)
+        handler.flush_tasks()
+        handler.close()
+
+    return run
+
+
+def setup_closed_prs(
+    workdir: Path, github: FakeGitHub, count: int
+) -> Callable[[], None]:
+    notifications = make_notifications(count, reasons=["review_requested"])
+    states = {}
+    tasks = []
+    for i, notification in enumerate(notifications):
+        url = notification["subject"]["url"]
+        owner, repo, _, number = url.split("/")[-4:]
+        if i % 2:
+            states[(owner, repo, int(number))] = "MERGED" if i % 4 == 1 else "CLOSED"
+        tasks.append(
+            {
+                "uuid": f"00000000-0000-4000-8000-{i:012d}",
+                "id": i + 1,
+                "status": "pending",
+                "entry": "20261001T000000Z",
+                "description": f"review_requested: {notification['subject']['title']}",
+                "project": repo,
+                "tags": ["review_requested", "github"],
+                "githuburl": url.replace("api.github.com/repos", "github.com").replace(
+                    "/pulls/", "/pull/"
+                ),
+            }
+        )
+    github.reset([], states)
+    write_tasks(workdir / "taskdata", tasks)
+    handler = _handler(workdir, github)
+
+    def run():
+        handler.handle_closed_prs()
+        handler.close()
+
+    return run
+
+
+SCENARIOS = {
+    "pipeline": setup_pipeline,
+    "add_task": setup_add_task,
+    "closed_prs": setup_closed_prs,
+}
+
+
+def _run_once(
+    scenario: str, github: FakeGitHub, count: int, trace_memory: bool
+) -> tuple[float, int, int]:
+    from gh_taskw.metrics import metrics
+
+    with tempfile.TemporaryDirectory(prefix=f"gh_taskw_bench_{scenario}_") as workdir:
+        run = SCENARIOS[scenario](Path(workdir), github, count)
+        metrics.reset()
+        if trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            run()
+            seconds = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] if trace_memory else 0
+        finally:
+            if trace_memory:
+                tracemalloc.stop()
+        return seconds, int(metrics.counters.get("subprocess_spawns", 0)), peak
+
+
+def run_suite(
+    scenarios: list[str], count: int, repeat: int, workdir: Path
+) -> list[Result]:
+    """Run the scenarios with the fake `task` first on the PATH, best of `repeat` runs."""
+    bin_dir = install_fake_task(workdir / "bin")
+    old_path = os.environ["PATH"]
+    os.environ["PATH"] = f"{bin_dir}{os.pathsep}{old_path}"
+    results = []
+    try:
+        with FakeGitHub() as github:
+            for scenario in scenarios:
+                runs = [
+                    _run_once(scenario, github, count, False) for _ in range(repeat)
+                ]
+                # allocations are traced in a separate run, tracing slows everything down
+                _, _, peak = _run_once(scenario, github, count, True)
+                results.append(
+                    Result(
+                        scenario=scenario,
+                        count=count,
+                        seconds=min(seconds for seconds, _, _ in runs),
+                        subprocess_spawns=max(spawns for _, spawns, _ in runs),
+                        peak_mb=peak / 1e6,
+                    )
+                )
+    finally:
+        os.environ["PATH"] = old_path
+    return results
+
+
+def find_regressions(
+    results: list[Result], baselines: dict, tolerance: float
+) -> list[str]:
+    regressions = []
+    for result in results:
+        baseline = baselines.get(result.scenario)
+        if baseline is None:
+            continue
+        if result.subprocess_spawns > baseline["subprocess_spawns"]:
+            regressions.append(
+                f"{result.scenario}: {result.subprocess_spawns} subprocesses, "
+                f"baseline {baseline['subprocess_spawns']}"
+            )
+        if baseline["count"] != result.count:
+            continue
+        if result.ops_per_sec < baseline["ops_per_sec"] * (1 - tolerance):
+            regressions.append(
+                f"{result.scenario}: {result.ops_per_sec:,.0f} ops/s, "
+                f"baseline {baseline['ops_per_sec']:,.0f} ops/s"
+            )
+        if result.peak_mb > baseline["peak_mb"] * (1 + tolerance):
+            regressions.append(
+                f"{result.scenario}: peak {result.peak_mb:.1f} MB, "
+                f"baseline {baseline['peak_mb']:.1f} MB"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS))
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=0.3)
+    parser.add_argument("--baselines", type=Path, default=BASELINES)
+    parser.add_argument("--update-baselines", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="gh_taskw_bench_") as workdir:
+        results = run_suite(
+            args.scenario or list(SCENARIOS), args.count, args.repeat, Path(workdir)
+        )
+
+    for result in results:
+        print(
+            f"{result.scenario:<12} {result.count} ops in {result.seconds * 1000:8.1f} ms "
+            f"{result.ops_per_sec:10,.0f} ops/s {result.subprocess_spawns:3d} subprocesses "
+            f"peak {result.peak_mb:6.1f} MB"
+        )
+
+    baselines = (
+        json.loads(args.baselines.read_text()) if args.baselines.exists() else {}
+    )
+    if args.update_baselines:
+        for result in results:
+            baselines[result.scenario] = {
+                **{k: v for k, v in asdict(result).items() if k != "seconds"},
+                "ops_per_sec": round(result.ops_per_sec),
+                "peak_mb": round(result.peak_mb, 1),
+            }
+            del baselines[result.scenario]["scenario"]
+        args.baselines.write_text(
+            json.dumps(baselines, indent=2, sort_keys=True) + "\n"
+        )
+        print(f"Updated {args.baselines}")
+        return 0
+
+    regressions = find_regressions(results, baselines, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
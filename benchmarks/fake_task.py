@@ -0,0 +1,100 @@
+"""
+Stand-in for the `task` binary, with just the commands gh_taskw runs.
+
+Tasks are kept as a JSON list in `<rc.data.location>/tasks.json`. Supported:
+
+    task --version
+    task rc.data.location=... import FILE
+    task rc.data.location=... [UUID ...] [status:X] [tags:X] export
+    task rc.data.location=... UUID ... done
+
+Only the standard library is imported, so a spawn costs little more than the
+interpreter start, like the real binary.
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+VERSION = "2.6.2"
+COMMANDS = ("import", "export", "done")
+
+
+def _now() -> str:
+    return time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+
+
+def _matches(task: dict, uuids: set, filters: dict) -> bool:
+    if uuids and task["uuid"] not in uuids:
+        return False
+    if "status" in filters and task["status"] != filters["status"]:
+        return False
+    return "tags" not in filters or filters["tags"] in task.get("tags", [])
+
+
+def main(argv: list[str]) -> int:
+    if argv == ["--version"]:
+        print(VERSION)
+        return 0
+
+    overrides = {}
+    args = []
+    for arg in argv:
+        if arg.startswith("rc."):
+            key, _, value = arg[3:].partition("=")
+            overrides[key] = value
+        else:
+            args.append(arg)
+    command = next((arg for arg in args if arg in COMMANDS), None)
+    if command is None:
+        print(f"fake task: unsupported command {args}", file=sys.stderr)
+        return 1
+    position = args.index(command)
+    filter_args, command_args = args[:position], args[position + 1 :]
+
+    data_file = Path(overrides.get("data.location", ".")) / "tasks.json"
+    tasks = json.loads(data_file.read_text()) if data_file.exists() else []
+
+    uuids = set()
+    filters = {}
+    for arg in filter_args:
+        key, colon, value = arg.partition(":")
+        if colon:
+            filters[key] = value.strip("'\"")
+        else:
+            uuids.add(arg)
+
+    if command == "export":
+        for task in tasks:
+            if _matches(task, uuids, filters):
+                print(json.dumps(task))
+        return 0
+
+    if command == "import":
+        imported = json.loads(Path(command_args[0]).read_text())
+        by_uuid = {task["uuid"]: task for task in tasks}
+        next_id = max((task.get("id", 0) for task in tasks), default=0) + 1
+        for task in imported:
+            task.setdefault("modified", _now())
+            if task["uuid"] not in by_uuid and task.get("status") == "pending":
+                task["id"] = next_id
+                next_id += 1
+            by_uuid[task["uuid"]] = {**by_uuid.get(task["uuid"], {}), **task}
+        tasks = list(by_uuid.values())
+        print(f"Imported {len(imported)} tasks.")
+    else:
+        done = 0
+        for task in tasks:
+            if task["uuid"] in uuids and task["status"] == "pending":
+                task.update(status="completed", end=_now(), modified=_now(), id=0)
+                done += 1
+        print(f"Completed {done} tasks.")
+
+    data_file.parent.mkdir(parents=True, exist_ok=True)
+    data_file.write_text(json.dumps(tasks))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
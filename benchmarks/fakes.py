@@ -0,0 +1,231 @@
+"""
+Local fake GitHub and Taskwarrior backends for the benchmarks.
+
+`FakeGitHub` is an HTTP server on localhost that answers the endpoints
+gh_taskw uses (notifications, marking them read, GraphQL subject states and
+REST pull requests/issues), so the real `GitHubClient` is measured.
+`install_fake_task` writes a `task` executable that runs `fake_task.py`. With
+it first on the PATH, tasklib spawns a real subprocess for every Taskwarrior call.
+"""
+
+import json
+import random
+import re
+import sys
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+
+REASONS = [
+    "review_requested",
+    "mention",
+    "author",
+    "comment",
+    "ci_activity",
+    "state_change",
+    "subscribed",
+]
+
+GRAPHQL_SELECTION_RE = re.compile(
+    r'\s*(?P<alias>\w+): repository\(owner: "(?P<owner>[^"]*)", name: "(?P<repo>[^"]*)"\) '
+    r"\{ (?P<field>\w+)\(number: (?P<number>\d+)\)"
+)
+
+
+def make_notifications(
+    count: int, seed: int = 0, repos: int = 50, reasons: Optional[list[str]] = None
+) -> list[dict]:
+    """Synthetic unread notifications, spread over `repos` repositories and the reasons."""
+    rng = random.Random(seed)
+    notifications = []
+    for i in range(count):
+        owner = f"org{i % 5}"
+        repo = f"repo{rng.randrange(repos)}"
+        kind = rng.choice(["pulls", "pulls", "issues"])
+        notifications.append(
+            {
+                "id": str(100_000 + i),
+                "unread": True,
+                "reason": rng.choice(reasons or REASONS),
+                "updated_at": f"2026-10-01T{i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}Z",
+                "subject": {
+                    "title": f"Synthetic subject {i}",
+                    "url": f"https://api.github.com/repos/{owner}/{repo}/{kind}/{i}",
+                    "type": "PullRequest" if kind == "pulls" else "Issue",
+                },
+                "repository": {
+                    "name": repo,
+                    "full_name": f"{owner}/{repo}",
+                    "owner": {"login": owner},
+                },
+            }
+        )
+    return notifications
+
+
+class FakeGitHub:
+    """
+    Fake GitHub API on a local port.
+
+    `states` maps `(owner, repo, number)` to "OPEN", "MERGED" or "CLOSED",
+    subjects without an entry are open.
+    """
+
+    def __init__(
+        self, notifications: Optional[list[dict]] = None, states: Optional[dict] = None
+    ):
+        self.notifications = notifications or []
+        self.states = states or {}
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def reset(self, notifications: list[dict], states: Optional[dict] = None):
+        with self._lock:
+            self.notifications = notifications
+            self.states = states or {}
+            self.requests = 0
+
+    def __enter__(self) -> "FakeGitHub":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _headers(self) -> dict:
+        return {
+            "X-RateLimit-Limit": "5000",
+            "X-RateLimit-Remaining": "4999",
+            "X-RateLimit-Reset": str(int(time.time()) + 3600),
+            "X-RateLimit-Resource": "core",
+        }
+
+    def handle(
+        self, method: str, target: str, body: Optional[dict]
+    ) -> tuple[int, dict, object]:
+        with self._lock:
+            self.requests += 1
+        parsed = urllib.parse.urlsplit(target)
+        path = parsed.path.strip("/")
+        query = dict(urllib.parse.parse_qsl(parsed.query))
+        headers = self._headers()
+
+        if path == "notifications" and method == "GET":
+            per_page = int(query.get("per_page", 50))
+            page = int(query.get("page", 1))
+            unread = [n for n in self.notifications if n["unread"]]
+            chunk = unread[(page - 1) * per_page : page * per_page]
+            headers["X-Poll-Interval"] = "60"
+            headers["Last-Modified"] = "Thu, 01 Oct 2026 00:00:00 GMT"
+            if page * per_page < len(unread):
+                next_url = (
+                    f"{self.url}/notifications?per_page={per_page}&page={page + 1}"
+                )
+                headers["Link"] = f'<{next_url}>; rel="next"'
+            return 200, headers, chunk
+
+        if path == "notifications" and method == "PUT":
+            last_read_at = body["last_read_at"]
+            with self._lock:
+                for notification in self.notifications:
+                    if notification["updated_at"] <= last_read_at:
+                        notification["unread"] = False
+            return 205, headers, None
+
+        if path.startswith("notifications/threads/") and method == "PATCH":
+            thread_id = path.rsplit("/", 1)[-1]
+            with self._lock:
+                for notification in self.notifications:
+                    if notification["id"] == thread_id:
+                        notification["unread"] = False
+            return 205, headers, None
+
+        if path == "graphql" and method == "POST":
+            headers["X-RateLimit-Resource"] = "graphql"
+            data = {}
+            for line in body["query"].splitlines():
+                match = GRAPHQL_SELECTION_RE.match(line)
+                if not match:
+                    continue
+                state = self.states.get(
+                    (match["owner"], match["repo"], int(match["number"])), "OPEN"
+                )
+                if match["field"] == "discussion":
+                    node = {"closed": state != "OPEN"}
+                else:
+                    node = {"state": state, "updatedAt": "2026-10-01T00:00:00Z"}
+                data[match["alias"]] = {match["field"]: node}
+            return 200, headers, {"data": data}
+
+        parts = path.split("/")
+        if method == "GET" and len(parts) == 5 and parts[0] == "repos":
+            _, owner, repo, _, number = parts
+            state = self.states.get((owner, repo, int(number)), "OPEN")
+            subject = {
+                "number": int(number),
+                "state": "open" if state == "OPEN" else "closed",
+                "merged": state == "MERGED",
+                "user": {"login": "octocat"},
+                "labels": [],
+            }
+            return 200, headers, subject
+
+        return 404, headers, {"message": "Not Found"}
+
+
+def _make_handler(github: FakeGitHub):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _respond(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length)) if length else None
+            status, headers, payload = github.handle(self.command, self.path, body)
+            data = json.dumps(payload).encode() if payload is not None else b""
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        do_GET = do_PUT = do_PATCH = do_POST = _respond
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def install_fake_task(bin_dir: Path) -> Path:
+    """Write a `task` executable running `fake_task.py` to `bin_dir`, returns `bin_dir`."""
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    task = bin_dir / "task"
+    script = Path(__file__).with_name("fake_task.py")
+    # -S skips site-packages, the fake only needs the standard library
+    task.write_text(
+        f"#!{sys.executable} -S\n"
+        f"import runpy\n"
+        f"runpy.run_path({str(script)!r}, run_name='__main__')\n"
+    )
+    task.chmod(0o755)
+    return bin_dir
+
+
+def write_tasks(data_location: Path, tasks: list[dict]):
+    """Replace the tasks of the fake Taskwarrior at `data_location`."""
+    data_location.mkdir(parents=True, exist_ok=True)
+    (data_location / "tasks.json").write_text(json.dumps(tasks))
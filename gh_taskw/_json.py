@@ -0,0 +1,23 @@
+"""
+JSON decoding with an optional faster backend.
+
+Uses orjson when it is installed (`pip install gh_taskw[fast]`) and falls back
+to the standard library otherwise. The backend is only imported on first use.
+"""
+
+import functools
+import json
+
+
+@functools.cache
+def backend():
+    """Return the name and `loads` function of the JSON backend."""
+    try:
+        import orjson
+    except ImportError:
+        return "json", json.loads
+    return "orjson", orjson.loads
+
+
+def loads(data):
+    return backend()[1](data)
@@ -0,0 +1,51 @@
+"""
+GitHub accounts whose notifications are polled.
+
+Every account has its own token, API client, poll state and notification
+reasons. The Taskwarrior write path and the task index are shared between all
+accounts of a handler, so a thread that several accounts are notified about
+only gets one task.
+"""
+
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Any
+
+from gh_taskw.routing import Router, Rule
+from gh_taskw.state import PollState
+
+# keys of an [[accounts]] table, missing keys fall back to the top level config
+ACCOUNT_KEYS = (
+    "github_token",
+    "ignore_notification_reasons",
+    "high_priority_reasons",
+    "add_task_for_reasons",
+    "project_prefix",
+)
+
+
+@dataclass
+class Account:
+    name: str
+    github: Any
+    poll_state: PollState
+    ignore_notification_reasons: list[str] = field(default_factory=list)
+    high_priority_reasons: list[str] = field(default_factory=list)
+    add_task_for_reasons: list[str] = field(default_factory=list)
+    project_prefix: str = ""
+    # the [[rules]] of the config, shared by all accounts
+    rules: list[Rule] = field(default_factory=list)
+
+    @cached_property
+    def router(self) -> Router:
+        """The rules compiled with this account's reasons as defaults, built on first use."""
+        return Router(
+            self.rules,
+            ignore_notification_reasons=self.ignore_notification_reasons,
+            add_task_for_reasons=self.add_task_for_reasons,
+            high_priority_reasons=self.high_priority_reasons,
+            project_prefix=self.project_prefix,
+        )
+
+    def close(self):
+        self.github.close()
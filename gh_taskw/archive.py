@@ -0,0 +1,166 @@
+"""
+Append-only archive of the fetched GitHub notifications.
+
+Every notification is appended as one JSON line to the active segment. Once
+the segment grows past `max_bytes` or gets older than `max_age`, it is closed,
+renamed after its closing time and optionally gzipped. Readers stream the
+entries segment by segment and can skip whole segments by time range.
+"""
+
+import fcntl
+import gzip
+import json
+import os
+import shutil
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, Optional
+
+from gh_taskw.log import logger
+
+SEGMENT_TIME_FORMAT = "%Y%m%dT%H%M%S%f"
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class NotificationArchive:
+    """
+    JSON Lines archive with size and time based rotation.
+
+    The active segment lives at `path`, closed segments next to it as
+    `<stem>.<closing time>.jsonl[.gz]`. Appends and rotations take an exclusive
+    lock, so overlapping runs don't interleave or lose entries.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        max_bytes: int = 50 * 1024 * 1024,
+        max_age: Optional[float] = None,
+        compress: bool = True,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.compress = compress
+
+    @contextmanager
+    def _locked(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_suffix(".lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def append(self, notifications: list[dict], fetched_at: Optional[datetime] = None):
+        """Append one entry per notification to the active segment."""
+        if not notifications:
+            return
+        fetched_at = fetched_at or _now()
+        lines = "".join(
+            json.dumps(
+                {"fetched_at": fetched_at.isoformat(), "notification": notification}
+            )
+            + "\n"
+            for notification in notifications
+        )
+        with self._locked():
+            self._rotate_if_needed(fetched_at)
+            with open(self.path, "a") as textfile:
+                textfile.write(lines)
+
+    def _segment_started_at(self) -> Optional[datetime]:
+        with open(self.path) as textfile:
+            first_line = textfile.readline()
+        try:
+            return datetime.fromisoformat(json.loads(first_line)["fetched_at"])
+        except (ValueError, KeyError):
+            return None
+
+    def _rotate_if_needed(self, now: datetime):
+        try:
+            size = self.path.stat().st_size
+        except FileNotFoundError:
+            return
+        if size == 0:
+            return
+
+        too_big = size >= self.max_bytes
+        too_old = False
+        if self.max_age is not None and not too_big:
+            started_at = self._segment_started_at()
+            too_old = (
+                started_at is not None
+                and (now - started_at).total_seconds() >= self.max_age
+            )
+        if too_big or too_old:
+            self.rotate(now)
+
+    def rotate(self, closed_at: datetime):
+        """
+        Close the active segment at `closed_at`. Callers must hold the lock.
+
+        `closed_at` must not be older than the newest entry of the segment.
+        """
+        closed_at = closed_at.astimezone(timezone.utc).strftime(SEGMENT_TIME_FORMAT)
+        segment = self.path.with_name(f"{self.path.stem}.{closed_at}{self.path.suffix}")
+        os.replace(self.path, segment)
+        if self.compress:
+            with open(segment, "rb") as source, gzip.open(
+                segment.with_name(segment.name + ".gz"), "wb"
+            ) as target:
+                shutil.copyfileobj(source, target)
+            segment.unlink()
+        logger.debug(f"Rotated notification archive segment {segment}")
+
+    def segments(self) -> list[tuple[datetime, Path]]:
+        """Return the closed segments with their closing time, oldest first."""
+        segments = []
+        prefix = f"{self.path.stem}."
+        for candidate in self.path.parent.glob(f"{prefix}*{self.path.suffix}*"):
+            stamp = candidate.name[len(prefix) :].split(".")[0]
+            try:
+                closed_at = datetime.strptime(stamp, SEGMENT_TIME_FORMAT)
+            except ValueError:
+                continue
+            segments.append((closed_at.replace(tzinfo=timezone.utc), candidate))
+        return sorted(segments)
+
+    def iter_entries(
+        self, since: Optional[datetime] = None, until: Optional[datetime] = None
+    ) -> Iterator[dict]:
+        """
+        Stream the archived entries, oldest first.
+
+        Only entries fetched within [`since`, `until`] are yielded. Segments that
+        closed before `since` are skipped without being read.
+        """
+        opened_at = None
+        paths = []
+        for closed_at, segment in self.segments():
+            if not (since and closed_at < since):
+                paths.append((opened_at, segment))
+            opened_at = closed_at
+        if self.path.exists():
+            paths.append((opened_at, self.path))
+
+        for opened_at, segment in paths:
+            if until and opened_at and opened_at > until:
+                break
+            opener = gzip.open if segment.suffix == ".gz" else open
+            with opener(segment, "rt") as textfile:
+                for line in textfile:
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    fetched_at = datetime.fromisoformat(entry["fetched_at"])
+                    if since and fetched_at < since:
+                        continue
+                    if until and fetched_at > until:
+                        return
+                    yield entry
@@ -1,45 +1,442 @@
 """Console script for gh_taskw."""
 
+import itertools
 from pathlib import Path
+import signal
 import sys
+import threading
+import time
+from typing import Callable, Optional
 import click
+from gh_taskw.log import logger
+from gh_taskw import pipeline
+from gh_taskw.accounts import Account
 from gh_taskw.gh_notification import GhNotification
-
+from gh_taskw.metrics import metrics
+from gh_taskw.rate_limit import POLL
 from gh_taskw.utils import (
-    get_notifications,
+    iter_notification_pages,
     log_errors,
-    mark_notification_as_read,
+    mark_notifications_as_read,
 )
 from gh_taskw.taskwarrior_handler import TaskwarriorHandler
+from gh_taskw.thread_store import ABANDONED, FAILED, HANDLED, MAX_ATTEMPTS
+
+CONFIG_FILE = Path("~/.config/gh_taskw.toml")
 
 
 @log_errors
-def process_row(row, tw_handler: TaskwarriorHandler):
-    # mark the notification as read first to make sure a task is not added twice if the script fails
-    if not "test" in row:
-        mark_notification_as_read(row["id"], env_vars=tw_handler.env)
-    tw_handler.process_gh_notification(
-        GhNotification.from_notification_dict(row.to_dict())
+def process_row(row, tw_handler: TaskwarriorHandler, account: Optional[Account] = None):
+    task_uuid = tw_handler.process_gh_notification(
+        GhNotification.from_notification_dict(row), account
+    )
+    thread_store = tw_handler.thread_store
+    if thread_store is not None and "test" not in row:
+        thread_store.record(
+            account.name if account else "default", row, HANDLED, task_uuid
+        )
+    return True
+
+
+def poll_account(
+    taskwarrior_handler: TaskwarriorHandler,
+    account: Account,
+    refresh_index: Optional[Callable[[], None]] = None,
+) -> Optional[pipeline.NotificationWindow]:
+    """
+    Fetch and process the unread notifications of one account.
+
+    Threads that failed in earlier cycles are retried after the fetched ones.
+    `refresh_index` is called before the first notification is processed.
+    """
+    thread_store = taskwarrior_handler.thread_store
+
+    def process(row) -> bool:
+        ok = process_row(row, taskwarrior_handler, account)
+        if ok or thread_store is None:
+            return ok
+        if thread_store.attempts(account.name, row) + 1 >= MAX_ATTEMPTS:
+            # give up and mark it as read, an unread thread that always fails
+            # would keep every newer one from the single `last_read_at` call
+            logger.warning(
+                f"Giving up on notification thread {row['id']} after {MAX_ATTEMPTS} attempts"
+            )
+            metrics.count("notifications_abandoned")
+            thread_store.record(account.name, row, ABANDONED)
+            return True
+        thread_store.record(account.name, row, FAILED)
+        return False
+
+    pages = iter_notification_pages(
+        account.github,
+        archive=taskwarrior_handler.archive,
+        poll_state=account.poll_state,
+    )
+    if thread_store is not None:
+        pages = itertools.chain(pages, _failed_pages(thread_store, account))
+    if refresh_index is not None:
+        pages = _refreshing_index(pages, refresh_index)
+    try:
+        return pipeline.run(
+            pages,
+            process=process,
+            ignored_reasons=account.ignore_notification_reasons,
+            is_unchanged=(
+                (lambda row: thread_store.is_unchanged(account.name, row))
+                if thread_store is not None
+                else None
+            ),
+            workers=taskwarrior_handler.process_workers,
+            on_row=taskwarrior_handler.note_activity,
+        )
+    except Exception as e:
+        logger.error(f"Polling notifications of account {account.name} failed: {e}")
+        # don't retry right away, and fetch everything again on the next poll
+        account.poll_state.last_modified = None
+        account.poll_state.last_polled = time.time()
+        return None
+
+
+def _failed_pages(thread_store, account: Account):
+    # only queried once the fetched pages are processed
+    yield thread_store.failed(account.name)
+
+
+def _refreshing_index(pages, refresh_index: Callable[[], None]):
+    refreshed = False
+    for page in pages:
+        if page and not refreshed:
+            refresh_index()
+            refreshed = True
+        yield page
+
+
+def _once(fn: Callable[[], None]) -> Callable[[], None]:
+    """Wrap `fn` so that it only runs on the first call, from any thread."""
+    lock = threading.Lock()
+    done = False
+
+    def call():
+        nonlocal done
+        with lock:
+            if not done:
+                fn()
+                done = True
+
+    return call
+
+
+def _for_each_account(fn, accounts: list[Account], *iterables) -> list:
+    """Call `fn` for every account, concurrently if there are several."""
+    if len(accounts) == 1:
+        return [fn(accounts[0], *(iterable[0] for iterable in iterables))]
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=len(accounts)) as pool:
+        return list(pool.map(fn, accounts, *iterables))
+
+
+def finish_account(account: Account, window: Optional[pipeline.NotificationWindow]):
+    """Mark the handled notifications of an account as read and save its state."""
+    if window is None:
+        return
+    # notifications are only marked as read once all pages have been fetched,
+    # marking them earlier would shift the following pages of the unread list
+    log_errors(mark_notifications_as_read)(
+        account.github, window.handled, window.failed_updated_at
+    )
+    # only remember Last-Modified once the notifications have been processed
+    account.poll_state.save()
+
+
+def process_notifications(taskwarrior_handler: TaskwarriorHandler):
+    """
+    Fetch and process all unread notifications of every account that is due.
+
+    The accounts are polled concurrently, their tasks are written together.
+    """
+    accounts = []
+    for account in taskwarrior_handler.accounts:
+        if not account.poll_state.is_due():
+            continue
+        if not account.github.budget.allows(POLL):
+            logger.warning(
+                f"Rate limited, deferring the poll of account {account.name}"
+            )
+            metrics.count("deferred_polls")
+            continue
+        accounts.append(account)
+    if not accounts:
+        return
+
+    # tasks may have been completed or deleted by hand since the last cycle,
+    # export them again once notifications come in, a 304 leaves the index alone
+    refresh_index = _once(lambda: taskwarrior_handler.task_index.invalidate())
+    windows = _for_each_account(
+        lambda account: poll_account(taskwarrior_handler, account, refresh_index),
+        accounts,
     )
 
+    thread_store = taskwarrior_handler.thread_store
+    try:
+        taskwarrior_handler.flush_tasks()
+    except Exception:
+        if thread_store is not None:
+            thread_store.rollback()
+        raise
+    # failed threads are kept in the store and retried on the next cycle
+    if thread_store is not None:
+        thread_store.commit()
+    # tasks of subjects that were closed are closed right away
+    log_errors(taskwarrior_handler.close_changed_subjects)()
+
+    _for_each_account(finish_account, accounts, windows)
+
+
+def build_handler(
+    record: Optional[Path] = None,
+    replay: Optional[Path] = None,
+    replay_notifications: Optional[Path] = None,
+) -> TaskwarriorHandler:
+    """
+    Create the handler from the config file.
+
+    With `replay`, GitHub responses are served from the recording and all writes
+    (tasks, state, logs) go to a throwaway directory. Tasknotes and system
+    notifications are disabled. With `record`, all GitHub traffic is saved.
+    """
+    # only needed for recording and replaying, keep them off the startup path
+    if record or replay or replay_notifications:
+        import tempfile
 
-@click.command()
-def main(args=None):
+        from gh_taskw.replay import (
+            RecordingClient,
+            ReplayClient,
+            load_notification_pages,
+            restore_tasks,
+            snapshot_tasks,
+        )
+
+    if replay is None and replay_notifications is None:
+        taskwarrior_handler = TaskwarriorHandler.from_config(CONFIG_FILE.expanduser())
+    else:
+        workdir = Path(tempfile.mkdtemp(prefix="gh_taskw_replay_"))
+        logger.info(f"Replaying into {workdir}")
+        github = ReplayClient.from_dir(
+            replay or workdir,
+            notification_pages=(
+                load_notification_pages(replay_notifications)
+                if replay_notifications
+                else None
+            ),
+        )
+        taskwarrior_handler = TaskwarriorHandler.from_config(
+            CONFIG_FILE.expanduser(),
+            github=github,
+            taskdata=workdir / "taskdata",
+            state_dir=workdir / "state",
+            logdir=workdir / "log",
+            tasknote_config=None,
+            notifications=None,
+            accounts=None,
+        )
+        if replay:
+            restore_tasks(taskwarrior_handler.tw, replay)
+
+    if record:
+        snapshot_tasks(taskwarrior_handler.tw, record)
+        for account in taskwarrior_handler.accounts:
+            account.github = RecordingClient(account.github, record)
+    return taskwarrior_handler
+
+
+@click.group(invoke_without_command=True)
+@click.option(
+    "--record",
+    type=click.Path(file_okay=False, path_type=Path),
+    help="Save all GitHub requests and responses to this directory.",
+)
+@click.option(
+    "--replay",
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+    help="Serve GitHub responses from a recording instead of the network.",
+)
+@click.option(
+    "--replay-notifications",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    help="Replay the notifications of a notification log (gh_notifications.jsonl/.json).",
+)
+@click.option(
+    "--profile",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Profile the run with cProfile and dump the pstats to this file.",
+)
+@click.pass_context
+def main(ctx, record, replay, replay_notifications, profile, args=None):
     """Console script for gh_taskw."""
-    taskwarrior_handler = TaskwarriorHandler.from_config(
-        Path("~/.config/gh_taskw.toml").expanduser()
+    if profile:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+        def dump_profile():
+            profiler.disable()
+            profiler.dump_stats(profile)
+
+        ctx.call_on_close(dump_profile)
+
+    ctx.obj = lambda: build_handler(record, replay, replay_notifications)
+    if ctx.invoked_subcommand is not None:
+        return
+
+    taskwarrior_handler = ctx.obj()
+    process_notifications(taskwarrior_handler)
+    if taskwarrior_handler.closed_prs_check_due():
+        taskwarrior_handler.handle_closed_prs()
+    taskwarrior_handler.write_metrics()
+    taskwarrior_handler.close()
+
+
+def run_cycles(
+    taskwarrior_handler: TaskwarriorHandler,
+    stop: threading.Event,
+    closed_prs_interval: int,
+    poll_interval: float = 0,
+    polling: Optional[threading.Event] = None,
+):
+    """
+    Poll for notifications and check for closed PRs until `stop` is set.
+
+    Notifications are polled on GitHub's poll interval, but at most every
+    `poll_interval` seconds. `polling` is set while a cycle processes
+    notifications, webhook deliveries leave their tasks to its flush then.
+    """
+    polling = polling or threading.Event()
+    next_poll = next_closed_prs_check = time.monotonic()
+    while not stop.is_set():
+        if time.monotonic() >= next_poll:
+            next_poll = time.monotonic() + poll_interval
+            # a delivery that is flushing finishes before the cycle queues tasks
+            with taskwarrior_handler.write_lock:
+                polling.set()
+            try:
+                process_notifications(taskwarrior_handler)
+            except Exception as e:
+                logger.error(f"Error: {str(e)}")
+                # don't retry right away, wait for the next poll interval, and
+                # fetch the notifications that were not marked as read again
+                for account in taskwarrior_handler.accounts:
+                    account.poll_state.last_modified = None
+                    account.poll_state.last_polled = time.time()
+            finally:
+                with taskwarrior_handler.write_lock:
+                    polling.clear()
+            # tasks of deliveries that came in after the cycle's flush
+            log_errors(taskwarrior_handler.flush_tasks)()
+
+        if time.monotonic() >= next_closed_prs_check:
+            # tasks may have been edited by hand in the meantime
+            taskwarrior_handler.task_index.invalidate()
+            log_errors(taskwarrior_handler.handle_closed_prs)()
+            next_closed_prs_check = time.monotonic() + closed_prs_interval
+        taskwarrior_handler.write_metrics()
+        # webhook deliveries until the next cycle are counted in its metrics
+        metrics.reset()
+
+        stop.wait(
+            min(
+                max(
+                    taskwarrior_handler.seconds_until_next_poll(),
+                    next_poll - time.monotonic(),
+                ),
+                max(0.0, next_closed_prs_check - time.monotonic()),
+            )
+        )
+
+
+def _stop_on_signals() -> threading.Event:
+    stop = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: stop.set())
+    return stop
+
+
+@main.command()
+@click.option(
+    "--closed-prs-interval",
+    type=int,
+    help="Seconds between two full sweeps for closed PRs [default: closed_prs_interval].",
+)
+@click.pass_obj
+def daemon(build_handler, closed_prs_interval: Optional[int]):
+    """Keep running and poll for notifications on GitHub's poll interval."""
+    taskwarrior_handler = build_handler()
+    stop = _stop_on_signals()
+
+    logger.info("Starting gh_taskw daemon")
+    run_cycles(
+        taskwarrior_handler,
+        stop,
+        closed_prs_interval or taskwarrior_handler.closed_prs_interval,
+    )
+
+    logger.info("Stopping gh_taskw daemon")
+    taskwarrior_handler.close()
+
+
+@main.command()
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", default=8787, show_default=True)
+@click.option(
+    "--poll-interval",
+    default=900,
+    show_default=True,
+    help="Seconds between two polls for notifications, as a safety net for missed deliveries.",
+)
+@click.option(
+    "--closed-prs-interval",
+    type=int,
+    help="Seconds between two full sweeps for closed PRs [default: closed_prs_interval].",
+)
+@click.pass_obj
+def serve(
+    build_handler,
+    host: str,
+    port: int,
+    poll_interval: int,
+    closed_prs_interval: Optional[int],
+):
+    """Receive GitHub webhook deliveries, and poll for notifications on a slow interval."""
+    taskwarrior_handler = build_handler()
+    if not taskwarrior_handler.webhook_secret:
+        raise click.UsageError("`gh_taskw serve` needs a webhook_secret in the config")
+
+    from gh_taskw.webhook import WebhookReceiver
+
+    receiver = WebhookReceiver(
+        taskwarrior_handler,
+        taskwarrior_handler.webhook_secret,
+        login=taskwarrior_handler.webhook_login,
+        host=host,
+        port=port,
     )
+    stop = _stop_on_signals()
 
-    log_fn = (
-        taskwarrior_handler.logdir / "gh_notifications.json"
-        if taskwarrior_handler.logdir
-        else None
+    logger.info("Starting gh_taskw webhook receiver")
+    receiver.start()
+    run_cycles(
+        taskwarrior_handler,
+        stop,
+        closed_prs_interval or taskwarrior_handler.closed_prs_interval,
+        poll_interval=poll_interval,
+        polling=receiver.polling,
     )
-    df = get_notifications(log_fn=log_fn, env=taskwarrior_handler.env)
-    if not df.empty:
-        df.apply(lambda x: process_row(x, taskwarrior_handler), axis=1)
 
-    taskwarrior_handler.handle_closed_prs()
+    logger.info("Stopping gh_taskw webhook receiver")
+    receiver.shutdown()
+    taskwarrior_handler.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,201 @@
+"""
+Details of pull requests and issues for the tasknotes of new tasks.
+
+`DetailsPrefetch` looks up the author, labels, size, requested reviewers and
+CI status of all subjects of a cycle at once, on a bounded pool of worker
+threads. Details are cached by the `updated_at` of the notification, so an
+unchanged subject is not fetched again.
+"""
+
+import json
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Iterable, Optional
+
+from gh_taskw.log import logger
+
+from gh_taskw.gh_notification import GhNotification
+from gh_taskw.metrics import metrics
+from gh_taskw.rate_limit import CHECK
+from gh_taskw.state import write_json_atomic
+from gh_taskw.subject_state import Subject
+
+MAX_WORKERS = 4
+# cached details that were not needed for this long are dropped
+CACHE_RETENTION = 30 * 24 * 3600
+
+
+@dataclass
+class SubjectDetails:
+    author: Optional[str] = None
+    labels: list[str] = field(default_factory=list)
+    changed_files: Optional[int] = None
+    additions: Optional[int] = None
+    deletions: Optional[int] = None
+    requested_reviewers: list[str] = field(default_factory=list)
+    ci_status: Optional[str] = None
+
+    def to_note_lines(self) -> list[str]:
+        lines = []
+        if self.author:
+            lines.append(f"author: {self.author}")
+        if self.labels:
+            lines.append(f"labels: {', '.join(self.labels)}")
+        if self.changed_files is not None:
+            lines.append(
+                f"changes: {self.changed_files} files, +{self.additions} -{self.deletions}"
+            )
+        if self.requested_reviewers:
+            lines.append(f"reviewers: {', '.join(self.requested_reviewers)}")
+        if self.ci_status:
+            lines.append(f"ci: {self.ci_status}")
+        return lines
+
+
+def fetch_details(github, subject: Subject) -> Optional[SubjectDetails]:
+    """Fetch the details of a pull request or issue, discussions are not supported."""
+    if subject.rest_path is None:
+        return None
+    subject_dict = github.request("GET", subject.rest_path).json()
+    details = SubjectDetails(
+        author=(subject_dict.get("user") or {}).get("login"),
+        labels=[label["name"] for label in subject_dict.get("labels") or []],
+    )
+    if subject.kind == "pull":
+        details.changed_files = subject_dict.get("changed_files")
+        details.additions = subject_dict.get("additions")
+        details.deletions = subject_dict.get("deletions")
+        details.requested_reviewers = [
+            reviewer["login"]
+            for reviewer in subject_dict.get("requested_reviewers") or []
+        ] + [team["slug"] for team in subject_dict.get("requested_teams") or []]
+        sha = (subject_dict.get("head") or {}).get("sha")
+        if sha:
+            status = github.request(
+                "GET", f"/repos/{subject.owner}/{subject.repo}/commits/{sha}/status"
+            ).json()
+            # the combined status is "pending" as long as no status was reported
+            if status.get("total_count"):
+                details.ci_status = status["state"]
+    return details
+
+
+class DetailsCache:
+    """Subject details stored as JSON, keyed by subject URL and `updated_at`."""
+
+    def __init__(self, path: Optional[Path] = None, entries: Optional[dict] = None):
+        self.path = path
+        self.entries: dict[str, dict] = entries or {}
+
+    @classmethod
+    def load(cls, path: Path) -> "DetailsCache":
+        try:
+            entries = json.loads(path.read_text())
+        except FileNotFoundError:
+            entries = {}
+        except ValueError:
+            logger.warning(f"Ignoring corrupt details cache in {path}")
+            entries = {}
+        return cls(path, entries)
+
+    def get(self, url: str, updated_at: str) -> Optional[SubjectDetails]:
+        entry = self.entries.get(url)
+        if entry is None or entry["updated_at"] != updated_at:
+            return None
+        entry["used_at"] = time.time()
+        return SubjectDetails(**entry["details"])
+
+    def put(self, url: str, updated_at: str, details: SubjectDetails):
+        self.entries[url] = {
+            "updated_at": updated_at,
+            "used_at": time.time(),
+            "details": asdict(details),
+        }
+
+    def save(self):
+        if self.path is None:
+            return
+        oldest = time.time() - CACHE_RETENTION
+        self.entries = {
+            url: entry
+            for url, entry in self.entries.items()
+            if entry["used_at"] >= oldest
+        }
+        write_json_atomic(self.path, self.entries)
+
+
+class DetailsPrefetch:
+    """Details of a cycle's subjects that are being fetched in the background."""
+
+    def __init__(
+        self,
+        github,
+        notifications: Iterable[GhNotification],
+        cache: Optional[DetailsCache] = None,
+        max_workers: int = MAX_WORKERS,
+    ):
+        self.github = github
+        self.cache = cache
+        self.details: dict[str, SubjectDetails] = {}
+        self._updated_at: dict[str, str] = {}
+        pending: dict[str, Subject] = {}
+        for notification in notifications:
+            subject = Subject.from_url(notification.url)
+            if (
+                subject is None
+                or notification.url in self.details
+                or notification.url in pending
+            ):
+                continue
+            cached = (
+                cache.get(notification.url, notification.updated_at) if cache else None
+            )
+            if cached is not None:
+                self.details[notification.url] = cached
+            else:
+                pending[notification.url] = subject
+                self._updated_at[notification.url] = notification.updated_at
+
+        self._futures = {}
+        if pending:
+            from concurrent.futures import ThreadPoolExecutor
+
+            pool = ThreadPoolExecutor(max_workers=min(max_workers, len(pending)))
+            self._futures = {
+                url: pool.submit(self._fetch, url, subject)
+                for url, subject in pending.items()
+            }
+            pool.shutdown(wait=False)
+
+    def _fetch(self, url: str, subject: Subject) -> Optional[SubjectDetails]:
+        if not self.github.budget.allows(CHECK):
+            metrics.count("deferred_enrichments")
+            return None
+        try:
+            with metrics.stage("enrich"):
+                return fetch_details(self.github, subject)
+        except Exception as e:
+            # timeouts and connection errors included, the tasknote is still
+            # written, just without the details
+            logger.warning(f"Could not fetch the details of {url}: {e}")
+            return None
+
+    def result(self) -> dict[str, SubjectDetails]:
+        """
+        Wait for the prefetch and return the mapping of subject URL -> details.
+
+        Subjects that could not be fetched, or were skipped because the rate limit
+        budget is low, are left out.
+        """
+        for url, future in self._futures.items():
+            fetched = future.result()
+            if fetched is None:
+                continue
+            self.details[url] = fetched
+            if self.cache is not None:
+                self.cache.put(url, self._updated_at[url], fetched)
+        self._futures = {}
+        if self.cache is not None:
+            self.cache.save()
+        return self.details
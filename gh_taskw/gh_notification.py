@@ -1,24 +1,33 @@
 from dataclasses import dataclass
+from typing import Iterator, Union
 
-from loguru import logger
+from gh_taskw.log import logger
+
+from gh_taskw._json import loads
+
+API_PREFIX = "https://api.github.com/repos/"
+HTML_PREFIX = "https://github.com/"
 
 
 def get_url(notification_dict):
     url = ""
-    if (
-        "subject" in notification_dict
-        and isinstance(notification_dict["subject"], dict)
-        and "url" in notification_dict["subject"]
-    ):
-        url = notification_dict["subject"]["url"]
+    subject = notification_dict.get("subject")
+    if isinstance(subject, dict) and "url" in subject:
+        url = subject["url"]
     elif "url" in notification_dict:
         url = notification_dict["url"]
 
-    if url:
-        url = (
-            url.replace("api.", "").replace("/repos/", "/").replace("/pulls/", "/pull/")
-        )
-    return url
+    # `null` for some subjects, e.g. the check suites of `ci_activity` threads
+    if not url:
+        return ""
+    return to_html_url(url)
+
+
+def to_html_url(url: str) -> str:
+    """Turn an API URL (https://api.github.com/repos/o/r/pulls/1) into its web URL."""
+    if url.startswith(API_PREFIX):
+        url = HTML_PREFIX + url[len(API_PREFIX) :]
+    return url.replace("/pulls/", "/pull/", 1)
 
 
 def get_reason(notification_dict):
@@ -37,7 +46,7 @@ def get_owner(notification_dict):
     return notification_dict["repository"]["owner"]["login"]
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class GhNotification:
     """Base class for GitHub notification."""
 
@@ -47,32 +56,46 @@ class GhNotification:
     url: str
     owner: str
     id: int
+    updated_at: str = ""
 
     @classmethod
     def from_notification_dict(cls, notification_dict: dict):
-        logger.debug(f"Creating GhNotification from {notification_dict}")
-
-        url = get_url(notification_dict)
-        subject = get_subject(notification_dict)
-        repository = get_repository(notification_dict)
-        owner = get_owner(notification_dict)
-
-        try:
-            id = int(url.split("/")[-1])
-        except ValueError:
-            logger.error(f"Could not extract ID from URL: {url}")
+        logger.debug("Creating GhNotification from {}", notification_dict)
+
+        reason = notification_dict["reason"]
+        subject = notification_dict["subject"]["title"]
+        repository_dict = notification_dict["repository"]
+        repository = repository_dict["name"]
+        owner = repository_dict["owner"]["login"]
+
+        subject_url = get_url(notification_dict)
+        if reason == "ci_activity":
+            # check suites often have no subject URL, link the workflow instead
+            workflow_name = subject.split(" ")[0]
+            url = f"https://github.com/{owner}/{repository}/actions/workflows/{workflow_name}.yml"
+        else:
+            url = subject_url
+
+        number = subject_url.rpartition("/")[2]
+        if number.isdigit():
+            id = int(number)
+        else:
+            if subject_url:
+                logger.error("Could not extract ID from URL: {}", subject_url)
             id = 0
 
         return cls(
-            reason=notification_dict["reason"],
+            reason=reason,
             subject=subject,
             repository=repository,
             url=url,
             owner=owner,
             id=id,
+            updated_at=notification_dict.get("updated_at", ""),
         )
 
-    def __post_init__(self):
-        if self.reason == "ci_activity":
-            workflow_name = self.subject.split(" ")[0]
-            self.url = f"https://github.com/{self.owner}/{self.repository}/actions/workflows/{workflow_name}.yml"
+
+def parse_notifications(raw: Union[bytes, str]) -> Iterator[GhNotification]:
+    """Parse a raw notifications response body into GhNotifications."""
+    for notification_dict in loads(raw):
+        yield GhNotification.from_notification_dict(notification_dict)
@@ -0,0 +1,371 @@
+"""
+Access layer for the GitHub API.
+
+Requests either go through an in-process HTTP client that keeps its connections
+alive between calls, or through the GitHub CLI (`gh api`) as a fallback.
+Both clients expose the same `request`/`graphql` interface and return a
+`GitHubResponse`.
+"""
+
+import json
+import os
+import queue
+import subprocess
+import threading
+import urllib.parse
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Optional
+
+from gh_taskw.log import logger
+
+from gh_taskw._json import loads
+from gh_taskw.metrics import metrics
+from gh_taskw.rate_limit import RateLimitBudget
+
+if TYPE_CHECKING:
+    import http.client
+
+API_URL = "https://api.github.com"
+API_VERSION = "2022-11-28"
+USER_AGENT = "gh_taskw"
+
+
+class GitHubAPIError(Exception):
+    """Raised when the GitHub API answers with an error status."""
+
+    def __init__(self, response: "GitHubResponse", method: str, path: str):
+        self.response = response
+        super().__init__(
+            f"{method} {path} failed with status {response.status}\n"
+            f"{response.body.decode('utf-8', errors='replace')}"
+        )
+
+
+class RateLimitedError(GitHubAPIError):
+    """Raised when a request was rejected by a primary or secondary rate limit."""
+
+
+@dataclass
+class GitHubResponse:
+    status: int
+    headers: dict = field(default_factory=dict)
+    body: bytes = b""
+
+    def header(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        return self.headers.get(name.lower(), default)
+
+    def json(self):
+        return loads(self.body) if self.body else None
+
+
+# rate limit headers and the gauges they are recorded as
+RATE_LIMIT_GAUGES = {
+    "x-ratelimit-limit": "ratelimit_limit",
+    "x-ratelimit-remaining": "ratelimit_remaining",
+    "x-ratelimit-reset": "ratelimit_reset_timestamp_seconds",
+}
+
+
+def _observe(response: "GitHubResponse"):
+    """Count the API call and record the rate limit headroom it reported."""
+    metrics.count("api_calls")
+    for header, gauge in RATE_LIMIT_GAUGES.items():
+        if header in response.headers:
+            metrics.gauge(gauge, int(response.headers[header]))
+
+
+def _check_response(
+    response: "GitHubResponse", budget: RateLimitBudget, method: str, path: str
+):
+    """
+    Update the request budget from `response`.
+
+    Raises a `GitHubAPIError` for status codes >= 400.
+    """
+    _observe(response)
+    rate_limited = budget.update(response)
+    if rate_limited:
+        metrics.count("rate_limited")
+        raise RateLimitedError(response, method, path)
+    if response.status >= 400:
+        raise GitHubAPIError(response, method, path)
+
+
+def resolve_token(
+    token: Optional[str] = None, env: Optional[dict] = None
+) -> Optional[str]:
+    """
+    Return the token to authenticate with.
+
+    Uses the configured `github_token`, then `GH_TOKEN`/`GITHUB_TOKEN` from the
+    environment, and finally asks the GitHub CLI for the token it is logged in with.
+    """
+    env = env if env is not None else os.environ
+    token = token or env.get("GH_TOKEN") or env.get("GITHUB_TOKEN")
+    if token:
+        return token
+    logger.debug("No token configured, reading it from `gh auth token`")
+    metrics.count("subprocess_spawns")
+    try:
+        return subprocess.check_output(
+            ["gh", "auth", "token"], env=env, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        logger.warning("Could not get a GitHub token, sending unauthenticated requests")
+        return None
+
+
+def parse_link_header(link_header: Optional[str]) -> dict:
+    """Parse a `Link` header into a mapping of rel -> URL."""
+    links = {}
+    for part in (link_header or "").split(","):
+        url, _, params = part.partition(";")
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "rel":
+                links[value.strip('"')] = url.strip().strip("<>")
+    return links
+
+
+def _split_path(path: str, params: Optional[dict] = None) -> str:
+    """Normalize `path` (relative, absolute or a full URL) to a request target."""
+    if path.startswith(("http://", "https://")):
+        parsed = urllib.parse.urlsplit(path)
+        path = parsed.path + (f"?{parsed.query}" if parsed.query else "")
+    elif not path.startswith("/"):
+        path = "/" + path
+    if params:
+        separator = "&" if "?" in path else "?"
+        path += separator + urllib.parse.urlencode(params)
+    return path
+
+
+class GitHubClient:
+    """
+    HTTP client for the GitHub API with a pool of keep-alive connections.
+
+    Connections are reused across requests, so a whole cycle only pays for a
+    handful of TLS handshakes. The client is safe to share between threads:
+    every request checks out its own connection from the pool.
+
+    Without a `token`, `token_provider` is called for it on the first request.
+    """
+
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        base_url: str = API_URL,
+        max_connections: int = 4,
+        timeout: float = 30,
+        token_provider: Optional[Callable[[], Optional[str]]] = None,
+    ):
+        parsed = urllib.parse.urlsplit(base_url)
+        self._token = token
+        self._token_provider = token_provider
+        self._token_lock = threading.Lock()
+        self.base_url = base_url.rstrip("/")
+        self._https = parsed.scheme == "https"
+        self._host = parsed.hostname
+        self._port = parsed.port
+        self._prefix = parsed.path.rstrip("/")
+        self._timeout = timeout
+        self._pool: queue.LifoQueue = queue.LifoQueue(maxsize=max_connections)
+        self.connections_opened = 0
+        self.budget = RateLimitBudget()
+
+    @property
+    def token(self) -> Optional[str]:
+        with self._token_lock:
+            if self._token is None and self._token_provider is not None:
+                self._token = self._token_provider()
+                self._token_provider = None
+            return self._token
+
+    def _new_connection(self) -> "http.client.HTTPConnection":
+        import http.client
+
+        self.connections_opened += 1
+        connection_cls = (
+            http.client.HTTPSConnection if self._https else http.client.HTTPConnection
+        )
+        return connection_cls(self._host, self._port, timeout=self._timeout)
+
+    def _acquire(self) -> tuple["http.client.HTTPConnection", bool]:
+        try:
+            return self._pool.get_nowait(), True
+        except queue.Empty:
+            return self._new_connection(), False
+
+    def _release(self, connection: "http.client.HTTPConnection"):
+        try:
+            self._pool.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def _headers(self, headers: Optional[dict], has_body: bool) -> dict:
+        request_headers = {
+            "Accept": "application/vnd.github+json",
+            "User-Agent": USER_AGENT,
+            "X-GitHub-Api-Version": API_VERSION,
+        }
+        if self.token:
+            request_headers["Authorization"] = f"Bearer {self.token}"
+        if has_body:
+            request_headers["Content-Type"] = "application/json"
+        request_headers.update(headers or {})
+        return request_headers
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        params: Optional[dict] = None,
+        json_body=None,
+        headers: Optional[dict] = None,
+    ) -> GitHubResponse:
+        """
+        Send a request and return the response.
+
+        Raises a `GitHubAPIError` for status codes >= 400, a `RateLimitedError`
+        if the request hit a rate limit.
+        """
+        import http.client
+
+        target = self._prefix + _split_path(path, params)
+        body = json.dumps(json_body).encode("utf-8") if json_body is not None else None
+        request_headers = self._headers(headers, body is not None)
+
+        logger.debug(f"{method} {target}")
+        connection, reused = self._acquire()
+        try:
+            connection.request(method, target, body=body, headers=request_headers)
+            raw_response = connection.getresponse()
+        except (http.client.RemoteDisconnected, ConnectionError):
+            connection.close()
+            if not reused:
+                raise
+            # the server dropped an idle keep-alive connection, retry on a fresh one
+            connection = self._new_connection()
+            connection.request(method, target, body=body, headers=request_headers)
+            raw_response = connection.getresponse()
+
+        response = GitHubResponse(
+            status=raw_response.status,
+            headers={k.lower(): v for k, v in raw_response.getheaders()},
+            body=raw_response.read(),
+        )
+        if raw_response.will_close:
+            connection.close()
+        else:
+            self._release(connection)
+        _check_response(response, self.budget, method, target)
+        return response
+
+    def graphql(self, query: str, variables: Optional[dict] = None) -> dict:
+        """Run a GraphQL query and return its `data` member."""
+        return _graphql_data(
+            self.request(
+                "POST",
+                "graphql",
+                json_body={"query": query, "variables": variables or {}},
+            )
+        )
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class GhCliClient:
+    """
+    Fallback client that sends every request through `gh api`.
+
+    Spawns one `gh` process per request, but needs nothing but a logged in GitHub CLI.
+    """
+
+    def __init__(self, env: Optional[dict] = None):
+        self.env = env
+        self.budget = RateLimitBudget()
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        params: Optional[dict] = None,
+        json_body=None,
+        headers: Optional[dict] = None,
+    ) -> GitHubResponse:
+        target = _split_path(path, params).lstrip("/")
+        cmd = ["gh", "api", "--include", "--method", method, target]
+        for name, value in (headers or {}).items():
+            cmd.extend(["-H", f"{name}: {value}"])
+        stdin = None
+        if json_body is not None:
+            cmd.extend(["--input", "-"])
+            stdin = json.dumps(json_body).encode("utf-8")
+
+        logger.debug(f"Running command: {' '.join(cmd)}")
+        metrics.count("subprocess_spawns")
+        result = subprocess.run(cmd, input=stdin, capture_output=True, env=self.env)
+        if not result.stdout.startswith(b"HTTP/"):
+            raise Exception(
+                f"Command failed with error code {result.returncode}\n"
+                f"{result.stderr.decode('utf-8', errors='replace')}"
+            )
+        response = _parse_included_response(result.stdout)
+        _check_response(response, self.budget, method, target)
+        return response
+
+    def graphql(self, query: str, variables: Optional[dict] = None) -> dict:
+        return _graphql_data(
+            self.request(
+                "POST",
+                "graphql",
+                json_body={"query": query, "variables": variables or {}},
+            )
+        )
+
+    def close(self):
+        pass
+
+
+def _parse_included_response(output: bytes) -> GitHubResponse:
+    """Parse the output of `gh api --include` into a `GitHubResponse`."""
+    head, _, body = output.replace(b"\r\n", b"\n").partition(b"\n\n")
+    status_line, *header_lines = head.decode("utf-8").split("\n")
+    headers = {}
+    for line in header_lines:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return GitHubResponse(
+        status=int(status_line.split()[1]), headers=headers, body=body.strip()
+    )
+
+
+def _graphql_data(response: GitHubResponse) -> dict:
+    payload = response.json()
+    for error in payload.get("errors") or []:
+        logger.warning(f"GraphQL error: {error.get('message')}")
+    return payload.get("data") or {}
+
+
+def make_client(
+    backend: str = "http",
+    token: Optional[str] = None,
+    env: Optional[dict] = None,
+    base_url: str = API_URL,
+):
+    """Create the GitHub client for the configured `api_backend` ("http" or "gh")."""
+    if backend == "gh":
+        return GhCliClient(env=env)
+    if backend == "http":
+        # resolving the token may spawn `gh`, only do it once a request is made
+        return GitHubClient(
+            token=token,
+            base_url=base_url,
+            token_provider=lambda: resolve_token(token, env),
+        )
+    raise ValueError(f"Unknown api_backend: {backend}")
@@ -0,0 +1,37 @@
+"""
+Locks that serialize work per key.
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Hashable, Iterator
+
+
+class KeyedLock:
+    """
+    One re-entrant lock per key, e.g. per subject URL.
+
+    Work on different keys runs in parallel, work on the same key one at a
+    time. A key's lock is dropped again once nobody holds or waits for it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._locks: dict[Hashable, list] = {}
+
+    @contextmanager
+    def hold(self, key: Hashable) -> Iterator[None]:
+        with self._lock:
+            entry = self._locks.setdefault(key, [threading.RLock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[key]
+
+    def __len__(self) -> int:
+        return len(self._locks)
@@ -0,0 +1,88 @@
+"""
+Lazily imported loguru logger.
+
+Importing loguru takes longer than a whole run that finds nothing to do, so it
+is only imported on the first log call that a sink would record. Sinks added,
+and the default sink removed, before that are applied to loguru when it is loaded.
+"""
+
+import threading
+
+LEVELS = {
+    "TRACE": 5,
+    "DEBUG": 10,
+    "INFO": 20,
+    "SUCCESS": 25,
+    "WARNING": 30,
+    "ERROR": 40,
+    "CRITICAL": 50,
+}
+# level of loguru's default stderr sink
+DEFAULT_LEVEL = "DEBUG"
+
+
+def _level_no(level) -> int:
+    if isinstance(level, int):
+        return level
+    # custom levels are unknown until loguru is loaded, let them through
+    return LEVELS.get(str(level).upper(), 0)
+
+
+def _discard(*args, **kwargs):
+    pass
+
+
+class LazyLogger:
+    def __init__(self):
+        self._logger = None
+        self._sinks: list[tuple[tuple, dict]] = []
+        self._remove_default = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._logger is None:
+                from loguru import logger
+
+                if self._remove_default:
+                    logger.remove()
+                for args, kwargs in self._sinks:
+                    logger.add(*args, **kwargs)
+                self._logger = logger
+        return self._logger
+
+    def add(self, *args, **kwargs):
+        """Add a sink, deferred until loguru is loaded."""
+        if self._logger is None:
+            self._sinks.append((args, kwargs))
+            return None
+        return self._logger.add(*args, **kwargs)
+
+    def remove(self, handler_id=None):
+        """Remove a sink, or all sinks, loguru's default one included."""
+        if self._logger is None and handler_id is None:
+            self._sinks = []
+            self._remove_default = True
+            return None
+        return self._load().remove(handler_id)
+
+    def _records(self, level: str) -> bool:
+        """True if any sink would record a message of `level`."""
+        levels = [
+            _level_no(kwargs.get("level", DEFAULT_LEVEL)) for _, kwargs in self._sinks
+        ]
+        if not self._remove_default:
+            levels.append(LEVELS[DEFAULT_LEVEL])
+        return any(LEVELS[level] >= level_no for level_no in levels)
+
+    def __getattr__(self, name):
+        if (
+            self._logger is None
+            and name.upper() in LEVELS
+            and not self._records(name.upper())
+        ):
+            return _discard
+        return getattr(self._logger or self._load(), name)
+
+
+logger = LazyLogger()
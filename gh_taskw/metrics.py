@@ -0,0 +1,127 @@
+"""
+Per-run instrumentation of gh_taskw.
+
+`metrics` records the wall time and number of calls of every processing stage,
+plus counters (API calls, subprocess spawns, ...) and gauges (rate limit
+headroom). At the end of a run it is written as a Prometheus textfile and/or
+a JSON summary.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import wraps
+from pathlib import Path
+
+from gh_taskw.state import write_json_atomic
+
+PROMETHEUS_PREFIX = "gh_taskw"
+
+
+@dataclass
+class StageStats:
+    calls: int = 0
+    seconds: float = 0.0
+
+
+class Metrics:
+    """Thread-safe collection of stage timings, counters and gauges."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self.stages: dict[str, StageStats] = {}
+            self.counters: dict[str, float] = {}
+            self.gauges: dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the wrapped block as one call of stage `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                stats = self.stages.setdefault(name, StageStats())
+                stats.calls += 1
+                stats.seconds += elapsed
+
+    def timed(self, name: str):
+        """Decorator version of `stage`."""
+
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def count(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def gauge(self, name: str, value: float):
+        with self._lock:
+            self.gauges[name] = value
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "started_at": self.started_at,
+                "duration_seconds": time.time() - self.started_at,
+                "stages": {
+                    name: {"calls": stats.calls, "seconds": stats.seconds}
+                    for name, stats in self.stages.items()
+                },
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+            }
+
+    def to_prometheus(self) -> str:
+        summary = self.to_dict()
+        lines = [
+            f"# TYPE {PROMETHEUS_PREFIX}_stage_seconds gauge",
+            *(
+                f'{PROMETHEUS_PREFIX}_stage_seconds{{stage="{name}"}} {stats["seconds"]}'
+                for name, stats in summary["stages"].items()
+            ),
+            f"# TYPE {PROMETHEUS_PREFIX}_stage_calls gauge",
+            *(
+                f'{PROMETHEUS_PREFIX}_stage_calls{{stage="{name}"}} {stats["calls"]}'
+                for name, stats in summary["stages"].items()
+            ),
+        ]
+        for name, value in {**summary["counters"], **summary["gauges"]}.items():
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{name} gauge")
+            lines.append(f"{PROMETHEUS_PREFIX}_{name} {value}")
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}_run_duration_seconds gauge")
+        lines.append(
+            f"{PROMETHEUS_PREFIX}_run_duration_seconds {summary['duration_seconds']}"
+        )
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}_last_run_timestamp_seconds gauge")
+        lines.append(
+            f"{PROMETHEUS_PREFIX}_last_run_timestamp_seconds {summary['started_at']}"
+        )
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: Path):
+        """Write a textfile for the node exporter's textfile collector."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        tmp_path.write_text(self.to_prometheus())
+        tmp_path.replace(path)
+
+    def write_json(self, path: Path):
+        write_json_atomic(path, self.to_dict())
+
+
+metrics = Metrics()
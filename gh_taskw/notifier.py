@@ -1,7 +1,17 @@
-from dataclasses import dataclass
-from gotify import Gotify
+import atexit
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
 import subprocess
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
+
+from gh_taskw.log import logger
+
+from gh_taskw.metrics import metrics
+
+if TYPE_CHECKING:
+    from gotify import Gotify
 
 
 URGENCY_LEVELS = {"low": 0, "normal": 1, "critical": 2}
@@ -14,32 +24,90 @@ class NotifierNotification:
     urgency: str = "low"
     timeout: str = "5000"
     icon: Optional[str] = None
+    # notifications with the same category and repository are coalesced into a digest
+    category: Optional[str] = None
+    repository: Optional[str] = None
 
     @property
     def urgency_level(self) -> int:
         return URGENCY_LEVELS[self.urgency]
 
 
+def coalesce(notifications: list[NotifierNotification]) -> list[NotifierNotification]:
+    """
+    Merge notifications of the same category and repository into digests.
+
+    A digest reads e.g. "12 review_requested in org/repo" and carries the highest
+    urgency of the notifications it replaces.
+    """
+    groups: dict[tuple, list[NotifierNotification]] = {}
+    for notification in notifications:
+        key = (
+            (notification.category, notification.repository)
+            if notification.category
+            else (id(notification),)
+        )
+        groups.setdefault(key, []).append(notification)
+
+    coalesced = []
+    for group in groups.values():
+        if len(group) == 1:
+            coalesced.append(group[0])
+            continue
+        first = group[0]
+        where = f" in {first.repository}" if first.repository else ""
+        coalesced.append(
+            NotifierNotification(
+                title=first.title,
+                body=f"{len(group)} {first.category}{where}",
+                urgency=max(group, key=lambda n: n.urgency_level).urgency,
+                timeout=first.timeout,
+                icon=first.icon,
+            )
+        )
+    return coalesced
+
+
 @dataclass
 class Notifier:
     """
     Send a notification to the configured notification service.
+
+    With `asynchronous`, notifications are handed to a background worker that
+    collects them for `coalesce_window` seconds and sends bursts as digests.
+    Queued notifications are flushed on `close` and at interpreter exit.
+
+    The gotify client is only created (and gotify imported) for the first message.
     """
 
     notification_system: str
-    gotify: Optional[Gotify] = None
+    gotify: Optional["Gotify"] = None
+    gotify_config: Optional[dict] = None
+    asynchronous: bool = False
+    coalesce_window: float = 2.0
+    _queue: queue.Queue = field(default_factory=queue.Queue, init=False, repr=False)
+    _worker: Optional[threading.Thread] = field(default=None, init=False, repr=False)
+    # notifications are sent from several processing threads
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, init=False, repr=False
+    )
 
     @classmethod
     def from_config(cls, config: dict):
         if config["system"] == "gotify":
-            gotify = Gotify(
-                base_url=config["base_url"],
-                app_token=config["app_token"],
-            )
+            gotify_config = {
+                "base_url": config["base_url"],
+                "app_token": config["app_token"],
+            }
         else:
-            gotify = None
+            gotify_config = None
 
-        return cls(config["system"], gotify=gotify)
+        return cls(
+            config["system"],
+            gotify_config=gotify_config,
+            asynchronous=config.get("asynchronous", False),
+            coalesce_window=config.get("coalesce_window", 2.0),
+        )
 
     def _send_notify_send(
         self,
@@ -57,17 +125,22 @@ class Notifier:
         ]
         if notification.icon:
             command.extend(["-i", notification.icon])
+        metrics.count("subprocess_spawns")
         subprocess.run(command, check=True)
 
     def _send_gotify(self, notification: NotifierNotification):
+        with self._lock:
+            if self.gotify is None:
+                from gotify import Gotify
+
+                self.gotify = Gotify(**self.gotify_config)
         self.gotify.create_message(
             title=notification.title,
             message=notification.body,
             priority=notification.urgency_level,
         )
 
-    def notify(self, notification: NotifierNotification) -> None:
-        """Send a notification to the configured notification service."""
+    def _send(self, notification: NotifierNotification) -> None:
         send_methods = {
             "notify_send": self._send_notify_send,
             "gotify": self._send_gotify,
@@ -75,3 +148,58 @@ class Notifier:
         send_method = send_methods.get(self.notification_system)
         if send_method:
             send_method(notification)
+
+    def notify(self, notification: NotifierNotification) -> None:
+        """Send a notification to the configured notification service."""
+        if not self.asynchronous:
+            self._send(notification)
+            return
+
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run_worker, name="gh_taskw-notifier", daemon=True
+                )
+                self._worker.start()
+                atexit.register(self.flush)
+        self._queue.put(notification)
+
+    def _collect_burst(self, first: NotifierNotification) -> list:
+        burst = [first]
+        deadline = time.monotonic() + self.coalesce_window
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                notification = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if notification is None:
+                # flush requested, send what we have right away
+                self._queue.task_done()
+                break
+            burst.append(notification)
+        return burst
+
+    def _run_worker(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                self._queue.task_done()
+                continue
+            burst = self._collect_burst(first)
+            for notification in coalesce(burst):
+                try:
+                    self._send(notification)
+                except Exception as e:
+                    logger.error(f"Error: {str(e)}")
+            for _ in burst:
+                self._queue.task_done()
+
+    def flush(self) -> None:
+        """Block until all queued notifications have been sent."""
+        if self._worker is None:
+            return
+        self._queue.put(None)
+        self._queue.join()
+
+    def close(self) -> None:
+        self.flush()
@@ -0,0 +1,173 @@
+"""
+Processing pipeline for a window of GitHub notifications.
+
+The notifications flow through a chain of generator stages, so only the page
+that is currently being processed is held in memory:
+
+    fetch -> parse -> observe -> filter by ignored reasons -> skip unchanged -> dedupe -> act
+
+`NotificationWindow` keeps track of which notifications were handled and which
+failed, so they can be marked as read afterwards.
+
+With several `workers`, the act stage processes notifications concurrently on
+a bounded pool, the caller serializes work on the same subject.
+"""
+
+import itertools
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator, Optional
+
+from gh_taskw.log import logger
+
+from gh_taskw.metrics import metrics
+
+
+@dataclass
+class NotificationWindow:
+    """Outcome of all notifications processed in one cycle."""
+
+    handled: list[tuple[str, str]] = field(default_factory=list)
+    failed_updated_at: list[str] = field(default_factory=list)
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, init=False, repr=False, compare=False
+    )
+
+    def record(self, row: dict, ok: bool):
+        if "test" in row:
+            # notifications from the test fixture must not be marked as read
+            return
+        with self._lock:
+            if ok:
+                self.handled.append((row["id"], row["updated_at"]))
+            else:
+                self.failed_updated_at.append(row["updated_at"])
+
+
+def parse(pages: Iterable[list[dict]]) -> Iterator[dict]:
+    """Flatten the fetched pages into single notification rows."""
+    for page in pages:
+        yield from page
+
+
+def observe(rows: Iterable[dict], callback: Callable[[dict], None]) -> Iterator[dict]:
+    """Show every fetched notification to `callback`, ignored ones included."""
+    for row in rows:
+        callback(row)
+        yield row
+
+
+def drop_ignored(
+    rows: Iterable[dict], ignored_reasons: Iterable[str], window: NotificationWindow
+) -> Iterator[dict]:
+    """Drop notifications with an ignored reason, they only need to be marked as read."""
+    ignored_reasons = frozenset(ignored_reasons)
+    for row in rows:
+        if row["reason"] in ignored_reasons:
+            metrics.count("notifications_ignored")
+            window.record(row, ok=True)
+            continue
+        yield row
+
+
+def skip_unchanged(
+    rows: Iterable[dict],
+    is_unchanged: Callable[[dict], bool],
+    window: NotificationWindow,
+) -> Iterator[dict]:
+    """Skip threads that were already handled at their current `updated_at`."""
+    for row in rows:
+        if is_unchanged(row):
+            metrics.count("notifications_unchanged")
+            window.record(row, ok=True)
+            continue
+        yield row
+
+
+def dedupe(rows: Iterable[dict]) -> Iterator[dict]:
+    """
+    Drop threads that were already seen in this window.
+
+    New activity while paginating can push a thread onto a later page again.
+    """
+    seen = set()
+    for row in rows:
+        if row["id"] in seen:
+            logger.debug(f"Skipping duplicate notification thread {row['id']}")
+            continue
+        seen.add(row["id"])
+        yield row
+
+
+def _act_on(row: dict, process: Callable[[dict], bool], window: NotificationWindow):
+    with metrics.stage("process_notification"):
+        ok = bool(process(row))
+    if not ok:
+        metrics.count("notifications_failed")
+    window.record(row, ok=ok)
+
+
+def act(
+    rows: Iterable[dict],
+    process: Callable[[dict], bool],
+    window: NotificationWindow,
+    workers: int = 1,
+) -> NotificationWindow:
+    """
+    Process every notification and record the outcome in `window`.
+
+    With more than one worker, up to `workers` notifications are processed at
+    once. At most twice as many rows are taken from the upstream stages ahead
+    of the workers, so pages are still fetched as they are needed.
+    """
+    if workers <= 1:
+        for row in rows:
+            _act_on(row, process, window)
+        return window
+
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        # nothing to process, don't start the workers
+        return window
+    rows = itertools.chain([first], rows)
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    slots = threading.BoundedSemaphore(2 * workers)
+
+    def work(row: dict):
+        try:
+            _act_on(row, process, window)
+        finally:
+            slots.release()
+
+    futures = []
+    with ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix="gh_taskw-act"
+    ) as pool:
+        for row in rows:
+            slots.acquire()
+            futures.append(pool.submit(work, row))
+    for future in futures:
+        future.result()
+    return window
+
+
+def run(
+    pages: Iterable[list[dict]],
+    process: Callable[[dict], bool],
+    ignored_reasons: Iterable[str] = (),
+    is_unchanged: Optional[Callable[[dict], bool]] = None,
+    workers: int = 1,
+    on_row: Optional[Callable[[dict], None]] = None,
+) -> NotificationWindow:
+    """Run all pipeline stages over the fetched `pages`."""
+    window = NotificationWindow()
+    rows = parse(pages)
+    if on_row is not None:
+        rows = observe(rows, on_row)
+    rows = drop_ignored(rows, ignored_reasons, window)
+    if is_unchanged is not None:
+        rows = skip_unchanged(rows, is_unchanged, window)
+    return act(dedupe(rows), process, window, workers)
@@ -0,0 +1,139 @@
+"""
+Request budget derived from GitHub's rate limit headers.
+
+Every client keeps a `RateLimitBudget` that is updated from the
+`X-RateLimit-*` headers of its responses, per rate limit resource ("core",
+"graphql", ...). Work is split into two priorities:
+
+    POLL   fetching and marking notifications, may use the whole quota
+    CHECK  looking up the state of PRs, issues and discussions, only runs
+           while more than the reserve of the quota is left
+
+After a 403/429 caused by a primary or secondary rate limit, no more work is
+allowed until `Retry-After`, or the quota reset, passed.
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from gh_taskw.log import logger
+
+POLL = "poll"
+CHECK = "check"
+
+# share of the quota that CHECK work leaves for notification polling
+CHECK_RESERVE = 0.1
+MIN_CHECK_RESERVE = 50
+
+# backoff after a secondary rate limit without Retry-After, doubled for every repeat
+DEFAULT_BACKOFF = 60
+MAX_BACKOFF = 15 * 60
+
+
+@dataclass
+class ResourceQuota:
+    limit: int
+    remaining: int
+    reset_at: float
+
+
+class RateLimitBudget:
+    """Remaining quota of one token, shared by everything that uses its client."""
+
+    def __init__(self):
+        self.resources: dict[str, ResourceQuota] = {}
+        self.blocked_until = 0.0
+        self._strikes = 0
+        self._lock = threading.Lock()
+
+    def update(self, response, now: Optional[float] = None) -> bool:
+        """
+        Record the quota reported by `response`.
+
+        Returns True if the response is a rate limit error, in which case all
+        work is blocked until the limit is lifted.
+        """
+        now = time.time() if now is None else now
+        headers = response.headers
+        resource = headers.get("x-ratelimit-resource", "core")
+        with self._lock:
+            quota = None
+            if "x-ratelimit-remaining" in headers:
+                quota = self.resources[resource] = ResourceQuota(
+                    limit=int(headers.get("x-ratelimit-limit", 0)),
+                    remaining=int(headers["x-ratelimit-remaining"]),
+                    reset_at=float(headers.get("x-ratelimit-reset", 0)),
+                )
+
+            if response.status not in (403, 429) or not (
+                "retry-after" in headers
+                or (quota is not None and quota.remaining == 0)
+                or b"rate limit" in response.body.lower()
+            ):
+                if response.status < 400:
+                    self._strikes = 0
+                return False
+
+            if "retry-after" in headers:
+                blocked_until = now + int(headers["retry-after"])
+            elif quota is not None and quota.remaining == 0:
+                blocked_until = quota.reset_at
+            else:
+                blocked_until = now + min(
+                    MAX_BACKOFF, DEFAULT_BACKOFF * 2 ** self._strikes
+                )
+            self._strikes += 1
+            self.blocked_until = max(self.blocked_until, blocked_until)
+        logger.warning(
+            f"Rate limited by GitHub ({resource}), backing off for "
+            f"{self.blocked_until - now:.0f}s"
+        )
+        return True
+
+    def remaining(
+        self, resource: str = "core", now: Optional[float] = None
+    ) -> Optional[int]:
+        """Remaining quota of `resource`, None if unknown or already reset."""
+        now = time.time() if now is None else now
+        quota = self.resources.get(resource)
+        if quota is None or now >= quota.reset_at:
+            return None
+        return quota.remaining
+
+    def allows(
+        self,
+        priority: str,
+        resource: str = "core",
+        cost: int = 1,
+        now: Optional[float] = None,
+    ) -> bool:
+        """True if work of `priority` may spend `cost` requests of `resource` now."""
+        now = time.time() if now is None else now
+        if now < self.blocked_until:
+            return False
+        remaining = self.remaining(resource, now)
+        if remaining is None:
+            return True
+        reserve = 0
+        if priority == CHECK:
+            limit = self.resources[resource].limit
+            reserve = max(MIN_CHECK_RESERVE, int(limit * CHECK_RESERVE))
+        return remaining - cost >= reserve
+
+    def seconds_until_allowed(
+        self,
+        priority: str,
+        resource: str = "core",
+        cost: int = 1,
+        now: Optional[float] = None,
+    ) -> float:
+        """Seconds until work of `priority` is allowed again, 0 if it is allowed now."""
+        now = time.time() if now is None else now
+        if self.allows(priority, resource, cost, now):
+            return 0.0
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        # not enough quota left, wait for the reset
+        return max(0.0, self.resources[resource].reset_at - now)
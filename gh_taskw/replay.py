@@ -0,0 +1,259 @@
+"""
+Record and replay the GitHub API traffic of gh_taskw runs.
+
+`RecordingClient` wraps a GitHub client and appends every request and its
+response to a cassette (JSON Lines). `ReplayClient` serves those responses
+from disk, so a production cycle can be reproduced without network access or
+a `gh` binary.
+
+A recording directory holds:
+
+    cassette.jsonl   every request/response of the recorded runs
+    tasks.json       the pending GitHub tasks when recording started
+"""
+
+import json
+import re
+import threading
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from gh_taskw.log import logger
+
+from gh_taskw.archive import NotificationArchive
+from gh_taskw.github_api import (
+    GitHubAPIError,
+    GitHubResponse,
+    _graphql_data,
+    _split_path,
+)
+from gh_taskw.rate_limit import RateLimitBudget
+
+CASSETTE_FILE = "cassette.jsonl"
+TASKS_FILE = "tasks.json"
+
+# one aliased selection of a batched GraphQL query, see gh_taskw.subject_state
+GRAPHQL_SELECTION_RE = re.compile(r"^\s*(?P<alias>\w+): (?P<selection>repository\(.*)$")
+
+
+class ReplayMissError(Exception):
+    """Raised when a replayed run makes a request that was never recorded."""
+
+
+def _request_key(method: str, path: str, params: Optional[dict], json_body) -> tuple:
+    body = json.dumps(json_body, sort_keys=True) if json_body is not None else None
+    return method.upper(), _split_path(path, params), body
+
+
+def _graphql_selections(json_body) -> dict[str, str]:
+    """Map alias -> selection for every aliased line of a GraphQL query."""
+    selections = {}
+    for line in (json_body or {}).get("query", "").splitlines():
+        match = GRAPHQL_SELECTION_RE.match(line)
+        if match:
+            selections[match["alias"]] = match["selection"]
+    return selections
+
+
+# all recording clients of a run (one per account) append to the same cassette
+_CASSETTE_LOCK = threading.Lock()
+
+
+class RecordingClient:
+    """Wraps a GitHub client and records all of its traffic to a cassette."""
+
+    def __init__(self, client, record_dir: Path):
+        self.client = client
+        record_dir.mkdir(parents=True, exist_ok=True)
+        self.cassette = record_dir / CASSETTE_FILE
+
+    @property
+    def budget(self) -> RateLimitBudget:
+        return self.client.budget
+
+    def _record(self, key: tuple, json_body, response: GitHubResponse):
+        method, path, _ = key
+        entry = {
+            "method": method,
+            "path": path,
+            "json_body": json_body,
+            "status": response.status,
+            "headers": response.headers,
+            "body": response.body.decode("utf-8"),
+        }
+        with _CASSETTE_LOCK, open(self.cassette, "a") as textfile:
+            textfile.write(json.dumps(entry) + "\n")
+
+    def request(self, method, path, params=None, json_body=None, headers=None):
+        key = _request_key(method, path, params, json_body)
+        try:
+            response = self.client.request(
+                method, path, params=params, json_body=json_body, headers=headers
+            )
+        except GitHubAPIError as e:
+            self._record(key, json_body, e.response)
+            raise
+        self._record(key, json_body, response)
+        return response
+
+    def graphql(self, query: str, variables: Optional[dict] = None) -> dict:
+        return _graphql_data(
+            self.request(
+                "POST",
+                "graphql",
+                json_body={"query": query, "variables": variables or {}},
+            )
+        )
+
+    def close(self):
+        self.client.close()
+
+
+class ReplayClient:
+    """
+    Serves recorded responses instead of talking to GitHub.
+
+    Requests are matched on method, path and body. Repeated requests get the
+    recorded responses in order, the last one is repeated once they run out.
+    Batched GraphQL queries are also answered selection by selection, so lookups
+    are found even if the batches are composed differently than when recording.
+    Marking notifications as read is acknowledged without a recording.
+    """
+
+    def __init__(
+        self,
+        entries: Iterable[dict] = (),
+        notification_pages: Optional[Iterable[list[dict]]] = None,
+    ):
+        self._responses: dict[tuple, deque] = defaultdict(deque)
+        self._graphql_nodes: dict[str, dict] = {}
+        self._notification_pages = (
+            iter(notification_pages) if notification_pages is not None else None
+        )
+        self._lock = threading.Lock()
+        # replayed runs are never rate limited
+        self.budget = RateLimitBudget()
+        for entry in entries:
+            self._add(entry)
+
+    @classmethod
+    def from_dir(
+        cls, record_dir: Path, notification_pages: Optional[Iterable[list[dict]]] = None
+    ) -> "ReplayClient":
+        cassette = record_dir / CASSETTE_FILE
+        entries = []
+        if cassette.exists():
+            with open(cassette) as textfile:
+                entries = [json.loads(line) for line in textfile if line.strip()]
+        logger.info(f"Replaying {len(entries)} recorded GitHub responses")
+        return cls(entries, notification_pages=notification_pages)
+
+    def _add(self, entry: dict):
+        response = GitHubResponse(
+            status=entry["status"],
+            headers=entry["headers"],
+            body=entry["body"].encode("utf-8"),
+        )
+        key = _request_key(entry["method"], entry["path"], None, entry["json_body"])
+        self._responses[key].append(response)
+
+        if key[1].endswith("/graphql") and response.status == 200:
+            data = json.loads(response.body).get("data") or {}
+            for alias, selection in _graphql_selections(entry["json_body"]).items():
+                self._graphql_nodes[selection] = data.get(alias)
+
+    def _replay_graphql(self, json_body) -> GitHubResponse:
+        data = {}
+        for alias, selection in _graphql_selections(json_body).items():
+            if selection not in self._graphql_nodes:
+                raise ReplayMissError(f"No recorded GraphQL response for {selection}")
+            data[alias] = self._graphql_nodes[selection]
+        return GitHubResponse(
+            status=200, body=json.dumps({"data": data}).encode("utf-8")
+        )
+
+    def request(self, method, path, params=None, json_body=None, headers=None):
+        key = _request_key(method, path, params, json_body)
+        is_notifications = key[1].startswith("/notifications")
+        with self._lock:
+            recorded = self._responses.get(key)
+            if key[0] == "GET" and is_notifications and self._notification_pages:
+                response = self._next_notifications_page()
+            elif recorded:
+                response = recorded.popleft() if len(recorded) > 1 else recorded[0]
+            elif key[0] in ("PATCH", "PUT") and is_notifications:
+                response = GitHubResponse(status=205)
+            elif key[1].endswith("/graphql"):
+                response = self._replay_graphql(json_body)
+            else:
+                raise ReplayMissError(f"No recorded response for {method} {key[1]}")
+
+        if response.status >= 400:
+            raise GitHubAPIError(response, method, key[1])
+        return response
+
+    def _next_notifications_page(self) -> GitHubResponse:
+        """Serve the next page of the replayed notification log."""
+        page = next(self._notification_pages, None)
+        if page is None:
+            self._notification_pages = None
+            return GitHubResponse(status=200, body=b"[]")
+        return GitHubResponse(
+            status=200,
+            headers={"link": '</notifications?replay_page=next>; rel="next"'},
+            body=json.dumps(page).encode("utf-8"),
+        )
+
+    def graphql(self, query: str, variables: Optional[dict] = None) -> dict:
+        return _graphql_data(
+            self.request(
+                "POST",
+                "graphql",
+                json_body={"query": query, "variables": variables or {}},
+            )
+        )
+
+    def close(self):
+        pass
+
+
+def load_notification_pages(path: Path) -> Iterator[list[dict]]:
+    """
+    Read the notification pages from a notification log.
+
+    Accepts the JSON Lines archive written by `NotificationArchive` as well as the
+    old `gh_notifications.json`, a mapping of fetch time -> notifications.
+    """
+    if path.suffix == ".json":
+        for notifications in json.loads(path.read_text()).values():
+            yield notifications
+        return
+
+    page, fetched_at = [], None
+    for entry in NotificationArchive(path).iter_entries():
+        if page and entry["fetched_at"] != fetched_at:
+            yield page
+            page = []
+        fetched_at = entry["fetched_at"]
+        page.append(entry["notification"])
+    if page:
+        yield page
+
+
+def snapshot_tasks(tw, record_dir: Path):
+    """Save the pending GitHub tasks, so a replay starts from the same task list."""
+    record_dir.mkdir(parents=True, exist_ok=True)
+    tasks = [
+        json.loads(line.strip(","))
+        for line in tw.execute_command(["status:pending", "+github", "export"])
+        if line.strip()
+    ]
+    (record_dir / TASKS_FILE).write_text(json.dumps(tasks))
+
+
+def restore_tasks(tw, record_dir: Path):
+    """Import the tasks saved by `snapshot_tasks` into `tw`."""
+    tasks_fn = record_dir / TASKS_FILE
+    if tasks_fn.exists():
+        tw.execute_command(["import", str(tasks_fn)])
@@ -0,0 +1,189 @@
+"""
+Routing rules that decide what happens with a notification.
+
+Rules are read from the `[[rules]]` tables of `gh_taskw.toml` and checked in
+order, the first matching rule wins:
+
+    [[rules]]
+    reason = ["review_requested", "mention"]  # one reason or a list, optional
+    repo = "my-org/*"                         # glob on "owner/repo", optional
+    subject = "^\\[security\\]"               # regex searched in the title, optional
+    ignore = false                            # drop the notification
+    add_task = true                           # create a task
+    project = "security"                      # task project
+    tags = ["security"]                       # extra task tags
+    priority = "H"                            # task priority
+    notify = true                             # send a system notification
+
+Actions a rule does not set fall back to `add_task_for_reasons`,
+`high_priority_reasons` and `project_prefix`. Reasons in
+`ignore_notification_reasons` are dropped before any rule is checked.
+
+The rules are compiled once: they are bucketed by reason, and the repo and
+subject patterns of each bucket are joined into one regex with a named group
+per rule. Routing a notification is a dict lookup plus a single regex match,
+however many rules there are. Because of that, subject patterns can not use
+named groups or backreferences.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+# keys of a [[rules]] table
+MATCH_KEYS = ("reason", "repo", "subject")
+ACTION_KEYS = ("ignore", "add_task", "project", "tags", "priority", "notify")
+
+
+@dataclass(frozen=True)
+class Route:
+    ignore: bool = False
+    add_task: bool = False
+    project: Optional[str] = None
+    tags: tuple[str, ...] = ()
+    priority: Optional[str] = None
+    notify: bool = True
+
+
+@dataclass(frozen=True)
+class Rule:
+    reasons: Optional[frozenset[str]] = None
+    repo: Optional[str] = None
+    subject: Optional[str] = None
+    actions: tuple[tuple[str, object], ...] = ()
+
+    @classmethod
+    def from_config(cls, config: dict) -> "Rule":
+        unknown_keys = set(config) - set(MATCH_KEYS) - set(ACTION_KEYS)
+        if unknown_keys:
+            raise ValueError(f"Unknown keys in [[rules]]: {sorted(unknown_keys)}")
+        reasons = config.get("reason")
+        if isinstance(reasons, str):
+            reasons = [reasons]
+        subject = config.get("subject")
+        # fail on the rule itself, not on the combined pattern
+        if subject is not None and re.compile(subject).groupindex:
+            raise ValueError(
+                f"Named groups are not supported in rule subjects: {subject}"
+            )
+        actions = {key: config[key] for key in ACTION_KEYS if key in config}
+        if "tags" in actions:
+            actions["tags"] = tuple(actions["tags"])
+        return cls(
+            reasons=frozenset(reasons) if reasons is not None else None,
+            repo=config.get("repo"),
+            subject=subject,
+            actions=tuple(actions.items()),
+        )
+
+    def matches(self, reason: str, repo: str, subject: str) -> bool:
+        """Check the rule on its own, the compiled `Router` does the same in one go."""
+        if self.reasons is not None and reason not in self.reasons:
+            return False
+        if self.repo is not None and not re.fullmatch(_glob_to_regex(self.repo), repo):
+            return False
+        return (
+            self.subject is None or re.search(self.subject, subject, re.M) is not None
+        )
+
+    def pattern(self) -> str:
+        """Regex for `"owner/repo\\nsubject"` matching this rule."""
+        repo = _glob_to_regex(self.repo) if self.repo is not None else "[^\\n]*"
+        subject = ""
+        if self.subject is not None:
+            # leading global flags like "(?i)" are only allowed at the start of
+            # the combined pattern, scope them to the rule instead
+            flags = re.match(r"\(\?([aiLmsux]+)\)", self.subject)
+            if flags:
+                subject = f".*?(?{flags[1]}:{self.subject[flags.end():]})"
+            else:
+                subject = f".*?(?:{self.subject})"
+        return f"{repo}\\n{subject}"
+
+
+def _glob_to_regex(glob: str) -> str:
+    return "".join(
+        "[^\\n]*" if char == "*" else "[^\\n]" if char == "?" else re.escape(char)
+        for char in glob
+    )
+
+
+class Router:
+    """The compiled routing rules of one account."""
+
+    def __init__(
+        self,
+        rules: Iterable[Rule] = (),
+        ignore_notification_reasons: Iterable[str] = (),
+        add_task_for_reasons: Iterable[str] = (),
+        high_priority_reasons: Iterable[str] = (),
+        project_prefix: str = "",
+    ):
+        self.rules = list(rules)
+        self.ignore_notification_reasons = frozenset(ignore_notification_reasons)
+        self.add_task_for_reasons = frozenset(add_task_for_reasons)
+        self.high_priority_reasons = frozenset(high_priority_reasons)
+        self.project_prefix = project_prefix
+
+        # one combined pattern per reason bucket, plus one for all other reasons
+        reasons = set().union(*(rule.reasons or () for rule in self.rules))
+        self._buckets = {reason: self._compile(reason) for reason in reasons}
+        self._other = self._compile(None)
+        self._routes: dict[tuple[str, Optional[int]], Route] = {}
+
+    @classmethod
+    def from_config(cls, rules: Optional[list[dict]] = None, **defaults) -> "Router":
+        return cls([Rule.from_config(rule) for rule in rules or ()], **defaults)
+
+    def _compile(self, reason: Optional[str]) -> Optional[re.Pattern]:
+        alternatives = [
+            f"(?P<r{index}>{rule.pattern()})"
+            for index, rule in enumerate(self.rules)
+            if rule.reasons is None or reason in rule.reasons
+        ]
+        if not alternatives:
+            return None
+        return re.compile("|".join(alternatives), re.M)
+
+    def match(self, reason: str, repo: str, subject: str) -> Optional[int]:
+        """Index of the first rule matching the notification, None if none matches."""
+        pattern = self._buckets.get(reason, self._other)
+        if pattern is None:
+            return None
+        match = pattern.match(f"{repo}\n{subject.replace(chr(10), ' ')}")
+        return int(match.lastgroup[1:]) if match else None
+
+    def route(self, reason: str, repo: str, subject: str) -> Route:
+        """Decide what to do with a notification of `repo` ("owner/name")."""
+        index = self.match(reason, repo, subject)
+        route = self._routes.get((reason, index))
+        if route is None:
+            route = self._routes[(reason, index)] = self._resolve(reason, index)
+        if route.project is None and route.add_task:
+            # the default project depends on the repository, it is not cached
+            return _with_project(route, self.project_prefix + repo.split("/", 1)[-1])
+        return route
+
+    def _resolve(self, reason: str, index: Optional[int]) -> Route:
+        actions = dict(self.rules[index].actions) if index is not None else {}
+        return Route(
+            ignore=actions.get("ignore", reason in self.ignore_notification_reasons),
+            add_task=actions.get("add_task", reason in self.add_task_for_reasons),
+            project=actions.get("project"),
+            tags=actions.get("tags", ()),
+            priority=actions.get(
+                "priority", "H" if reason in self.high_priority_reasons else None
+            ),
+            notify=actions.get("notify", True),
+        )
+
+
+def _with_project(route: Route, project: str) -> Route:
+    return Route(
+        ignore=route.ignore,
+        add_task=route.add_task,
+        project=project,
+        tags=route.tags,
+        priority=route.priority,
+        notify=route.notify,
+    )
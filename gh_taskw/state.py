@@ -0,0 +1,88 @@
+"""
+Small pieces of state that gh_taskw keeps between runs.
+"""
+
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from gh_taskw.log import logger
+
+# cron does not fire at exactly the same offset every minute, allow some slack
+# when comparing against the poll interval requested by GitHub
+POLL_INTERVAL_SLACK = 5
+
+
+def default_state_dir() -> Path:
+    state_home = os.environ.get("XDG_STATE_HOME") or Path("~/.local/state").expanduser()
+    return Path(state_home) / "gh_taskw"
+
+
+def write_json_atomic(path: Path, data) -> None:
+    """Write `data` as JSON to `path` without ever leaving a half written file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    tmp_path.write_text(json.dumps(data))
+    os.replace(tmp_path, path)
+
+
+@dataclass
+class PollState:
+    """
+    Conditional polling state of the notifications endpoint.
+
+    Stores the `Last-Modified` header of the last notifications response, which is
+    sent back as `If-Modified-Since`, and the `X-Poll-Interval` GitHub asks clients
+    to respect. Also remembers when closed PRs were last checked for.
+    """
+
+    last_modified: Optional[str] = None
+    poll_interval: int = 60
+    last_polled: float = 0.0
+    closed_prs_checked_at: float = 0.0
+    path: Optional[Path] = field(default=None, repr=False, compare=False)
+
+    @classmethod
+    def load(cls, path: Path) -> "PollState":
+        try:
+            data = json.loads(path.read_text())
+        except FileNotFoundError:
+            return cls(path=path)
+        except ValueError:
+            logger.warning(f"Ignoring corrupt poll state in {path}")
+            return cls(path=path)
+        return cls(
+            last_modified=data.get("last_modified"),
+            poll_interval=data.get("poll_interval", 60),
+            last_polled=data.get("last_polled", 0.0),
+            closed_prs_checked_at=data.get("closed_prs_checked_at", 0.0),
+            path=path,
+        )
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        data = asdict(self)
+        data.pop("path")
+        write_json_atomic(self.path, data)
+
+    def seconds_until_next_poll(self, now: Optional[float] = None) -> float:
+        now = time.time() if now is None else now
+        return max(0.0, self.last_polled + self.poll_interval - now)
+
+    def is_due(self, now: Optional[float] = None) -> bool:
+        return self.seconds_until_next_poll(now) <= POLL_INTERVAL_SLACK
+
+    def request_headers(self) -> dict:
+        return {"If-Modified-Since": self.last_modified} if self.last_modified else {}
+
+    def update(self, response, now: Optional[float] = None) -> None:
+        """Record the polling headers of a notifications response."""
+        self.last_polled = time.time() if now is None else now
+        self.last_modified = response.header("Last-Modified", self.last_modified)
+        poll_interval = response.header("X-Poll-Interval")
+        if poll_interval:
+            self.poll_interval = int(poll_interval)
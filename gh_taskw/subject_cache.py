@@ -0,0 +1,120 @@
+"""
+Persistent cache of the state of pull requests, issues and discussions.
+
+For every subject the cache keeps the last known state and when it was last
+checked and last active. Subjects are only
+rechecked once their backoff interval passed: subjects with recent activity
+are checked often, stale ones rarely.
+"""
+
+import json
+import time
+from dataclasses import asdict, dataclass
+from dataclasses import fields as dataclass_fields
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Optional
+
+from gh_taskw.log import logger
+
+from gh_taskw.state import write_json_atomic
+
+# recheck interval = age of the last activity * RECHECK_FACTOR, within these bounds
+MIN_RECHECK_INTERVAL = 60
+MAX_RECHECK_INTERVAL = 6 * 3600
+RECHECK_FACTOR = 0.1
+
+
+def parse_timestamp(timestamp: Optional[str]) -> Optional[float]:
+    """Convert an ISO 8601 timestamp from the GitHub API to epoch seconds."""
+    return datetime.fromisoformat(timestamp).timestamp() if timestamp else None
+
+
+@dataclass
+class CachedSubject:
+    state: str
+    checked_at: float
+    updated_at: Optional[float] = None
+
+    def recheck_interval(self) -> float:
+        last_activity = self.updated_at or self.checked_at
+        age = max(0.0, self.checked_at - last_activity)
+        return min(
+            MAX_RECHECK_INTERVAL, max(MIN_RECHECK_INTERVAL, age * RECHECK_FACTOR)
+        )
+
+    def is_due(self, now: float) -> bool:
+        return now - self.checked_at >= self.recheck_interval()
+
+
+class SubjectCache:
+    """Subject state cache stored as JSON, keyed by subject URL."""
+
+    def __init__(self, path: Optional[Path] = None, entries: Optional[dict] = None):
+        self.path = path
+        self.entries: dict[str, CachedSubject] = entries or {}
+
+    @classmethod
+    def load(cls, path: Path) -> "SubjectCache":
+        try:
+            data = json.loads(path.read_text())
+        except FileNotFoundError:
+            data = {}
+        except ValueError:
+            logger.warning(f"Ignoring corrupt subject cache in {path}")
+            data = {}
+        fields = {field.name for field in dataclass_fields(CachedSubject)}
+        return cls(
+            path,
+            {
+                # drops what older versions stored, like the ETag of REST rechecks
+                url: CachedSubject(**{k: v for k, v in entry.items() if k in fields})
+                for url, entry in data.items()
+            },
+        )
+
+    def save(self):
+        if self.path is not None:
+            write_json_atomic(
+                self.path, {url: asdict(entry) for url, entry in self.entries.items()}
+            )
+
+    def get(self, url: str) -> Optional[CachedSubject]:
+        return self.entries.get(url)
+
+    def put(
+        self,
+        url: str,
+        state: str,
+        updated_at: Optional[float] = None,
+        now: Optional[float] = None,
+    ):
+        self.entries[url] = CachedSubject(
+            state=state,
+            checked_at=time.time() if now is None else now,
+            updated_at=updated_at,
+        )
+
+    def mark_checked(self, url: str, now: Optional[float] = None):
+        """Record that `url` was checked and did not change."""
+        self.entries[url].checked_at = time.time() if now is None else now
+
+    def mark_active(self, url: str, updated_at: Optional[float] = None):
+        """
+        Record new activity on `url`, e.g. from a notification.
+
+        The subject is rechecked on the next run.
+        """
+        entry = self.entries.get(url)
+        if entry is not None:
+            entry.updated_at = updated_at or time.time()
+            entry.checked_at = 0.0
+
+    def is_due(self, url: str, now: Optional[float] = None) -> bool:
+        entry = self.entries.get(url)
+        return entry is None or entry.is_due(time.time() if now is None else now)
+
+    def prune(self, keep: Iterable[str]):
+        """Drop all subjects not in `keep`, e.g. those without pending task."""
+        keep = set(keep)
+        self.entries = {url: e for url, e in self.entries.items() if url in keep}
@@ -0,0 +1,182 @@
+"""
+Resolve the state of the pull requests, issues and discussions behind tasks.
+
+Instead of one REST call per task, the subjects are looked up with aliased
+GraphQL queries, each resolving up to `CHUNK_SIZE` subjects at once.
+
+With a `SubjectCache`, only subjects whose recheck interval passed are looked
+up, in the same batched queries. A subject whose `updatedAt` did not move since
+it was cached only has its check time updated.
+
+With a `RateLimitBudget`, lookups stop once the quota drops to the reserve
+kept for notification polling. The remaining subjects are deferred to the
+next check.
+"""
+
+import json
+import re
+import time
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from gh_taskw.log import logger
+
+from gh_taskw.github_api import RateLimitedError
+from gh_taskw.metrics import metrics
+from gh_taskw.rate_limit import CHECK, RateLimitBudget
+from gh_taskw.subject_cache import SubjectCache, parse_timestamp
+
+CHUNK_SIZE = 100
+
+# states in which the task for a subject is done
+CLOSED_STATES = {"closed", "merged"}
+
+SUBJECT_URL_RE = re.compile(
+    r"https://github\.com/(?P<owner>[^/]+)/(?P<repo>[^/]+)/"
+    r"(?P<kind>pull|issues|discussions)/(?P<number>\d+)"
+)
+
+# GraphQL field and the selection returning the state for each subject kind
+_KIND_FIELDS = {
+    "pull": ("pullRequest", "state"),
+    "issues": ("issue", "state"),
+    "discussions": ("discussion", "closed"),
+}
+
+# REST endpoint of each subject kind, discussions are only available via GraphQL
+_KIND_REST_PATHS = {"pull": "pulls", "issues": "issues"}
+
+_KIND_LABELS = {"pull": "PR", "issues": "Issue", "discussions": "Discussion"}
+
+
+@dataclass(frozen=True)
+class Subject:
+    owner: str
+    repo: str
+    kind: str
+    number: int
+
+    @classmethod
+    def from_url(cls, url: str) -> Optional["Subject"]:
+        match = SUBJECT_URL_RE.match(url or "")
+        if not match:
+            return None
+        return cls(
+            owner=match["owner"],
+            repo=match["repo"],
+            kind=match["kind"],
+            number=int(match["number"]),
+        )
+
+    @property
+    def label(self) -> str:
+        return f"{_KIND_LABELS[self.kind]} {self.number}"
+
+    def graphql_selection(self, alias: str) -> str:
+        field, selection = _KIND_FIELDS[self.kind]
+        return (
+            f"{alias}: repository(owner: {json.dumps(self.owner)}, name: {json.dumps(self.repo)}) "
+            f"{{ {field}(number: {self.number}) {{ {selection} updatedAt }} }}"
+        )
+
+    def state_from_graphql(self, repository: Optional[dict]) -> Optional[str]:
+        field, selection = _KIND_FIELDS[self.kind]
+        node = (repository or {}).get(field)
+        if node is None:
+            return None
+        if selection == "closed":
+            return "closed" if node["closed"] else "open"
+        return node["state"].lower()
+
+    @property
+    def rest_path(self) -> Optional[str]:
+        if self.kind not in _KIND_REST_PATHS:
+            return None
+        return f"/repos/{self.owner}/{self.repo}/{_KIND_REST_PATHS[self.kind]}/{self.number}"
+
+
+def _defer(count: int):
+    if count:
+        metrics.count("deferred_subject_checks", count)
+        logger.warning(f"Rate limit budget is low, deferring {count} subject checks")
+
+
+def resolve_subject_states(
+    github,
+    urls: Iterable[str],
+    chunk_size: int = CHUNK_SIZE,
+    cache: Optional[SubjectCache] = None,
+    now: Optional[float] = None,
+    budget: Optional[RateLimitBudget] = None,
+) -> dict[str, str]:
+    """
+    Return a mapping of subject URL -> state ("open", "closed" or "merged").
+
+    URLs that don't point to a pull request, issue or discussion, and subjects that
+    could not be resolved, are left out of the result. With a `cache`, subjects that
+    are not due for a recheck are answered from the cache. With a `budget`, subjects
+    are only looked up while it allows `CHECK` work, deferred subjects are left out
+    of the result unless they are cached.
+    """
+    now = time.time() if now is None else now
+    subjects = {}
+    for url in urls:
+        subject = Subject.from_url(url)
+        if subject:
+            subjects[url] = subject
+
+    if cache is not None:
+        due = {
+            url: subject
+            for url, subject in subjects.items()
+            if cache.is_due(url, now=now)
+        }
+        _resolve_graphql(github, due, chunk_size, cache, now, budget)
+        return {
+            url: cache.get(url).state for url in subjects if cache.get(url) is not None
+        }
+
+    return _resolve_graphql(github, subjects, chunk_size, budget=budget)
+
+
+def _resolve_graphql(
+    github,
+    subjects: dict[str, Subject],
+    chunk_size: int,
+    cache: Optional[SubjectCache] = None,
+    now: Optional[float] = None,
+    budget: Optional[RateLimitBudget] = None,
+) -> dict[str, str]:
+    states = {}
+    items = list(subjects.items())
+    for start in range(0, len(items), chunk_size):
+        if budget is not None and not budget.allows(CHECK, "graphql"):
+            _defer(len(items) - start)
+            break
+        chunk = items[start : start + chunk_size]
+        query = "query {\n%s\n}" % "\n".join(
+            subject.graphql_selection(f"s{i}") for i, (_, subject) in enumerate(chunk)
+        )
+        logger.debug(f"Resolving the state of {len(chunk)} subjects")
+        try:
+            data = github.graphql(query)
+        except RateLimitedError:
+            _defer(len(items) - start)
+            break
+        for i, (url, subject) in enumerate(chunk):
+            repository = data.get(f"s{i}")
+            state = subject.state_from_graphql(repository)
+            if state is None:
+                logger.warning(f"Could not resolve the state of {url}")
+                continue
+            states[url] = state
+            if cache is not None:
+                node = repository[_KIND_FIELDS[subject.kind][0]]
+                updated_at = parse_timestamp(node.get("updatedAt"))
+                entry = cache.get(url)
+                unchanged = entry is not None and entry.updated_at == updated_at
+                if unchanged and entry.state == state:
+                    cache.mark_checked(url, now=now)
+                else:
+                    cache.put(url, state, updated_at=updated_at, now=now)
+    return states
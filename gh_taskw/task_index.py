@@ -0,0 +1,67 @@
+"""
+In-memory index of the pending GitHub tasks.
+"""
+
+from typing import TYPE_CHECKING, Optional
+
+from gh_taskw.log import logger
+from gh_taskw.metrics import metrics
+
+if TYPE_CHECKING:
+    from tasklib import Task, TaskWarrior
+
+
+class TaskIndex:
+    """
+    Index of all pending `+github` tasks, keyed by `githuburl` and tag.
+
+    The pending tasks are exported once, on first use, instead of running one
+    `task export` per duplicate check. The index is kept up to date as tasks
+    are added or completed through it.
+    """
+
+    def __init__(self, tw: "TaskWarrior"):
+        self.tw = tw
+        self._by_uuid: Optional[dict[str, "Task"]] = None
+        self._by_key: dict[tuple[str, str], "Task"] = {}
+
+    def _load(self) -> dict[str, "Task"]:
+        if self._by_uuid is None:
+            self._by_uuid = {}
+            self._by_key = {}
+            with metrics.stage("task_index_load"):
+                for task in self.tw.tasks.pending().filter(tags=["github"]):
+                    self.add(task)
+            logger.debug(f"Indexed {len(self._by_uuid)} pending GitHub tasks")
+        return self._by_uuid
+
+    def invalidate(self):
+        """Forget the index, the next lookup exports the pending tasks again."""
+        self._by_uuid = None
+        self._by_key = {}
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+    def get(self, url: str, tag: str) -> Optional["Task"]:
+        """Return the pending task for `url` that is tagged with `tag`."""
+        self._load()
+        return self._by_key.get((url, tag))
+
+    def tasks_with_tag(self, tag: str) -> list["Task"]:
+        return [task for task in self._load().values() if tag in (task["tags"] or ())]
+
+    def add(self, task: "Task"):
+        by_uuid = self._load()
+        by_uuid[task["uuid"]] = task
+        url = task["githuburl"]
+        if url:
+            for tag in task["tags"] or ():
+                self._by_key[(url, tag)] = task
+
+    def remove(self, task: "Task"):
+        self._load().pop(task["uuid"], None)
+        url = task["githuburl"]
+        for tag in task["tags"] or ():
+            if self._by_key.get((url, tag)) is task:
+                del self._by_key[(url, tag)]
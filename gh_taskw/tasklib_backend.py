@@ -0,0 +1,23 @@
+"""
+Taskwarrior backend of gh_taskw.
+
+Kept apart from `gh_taskw.taskwarrior_handler`, so tasklib is only imported
+once Taskwarrior is actually needed.
+"""
+
+from tasklib import TaskWarrior
+
+from gh_taskw.metrics import metrics
+
+
+class InstrumentedTaskWarrior(TaskWarrior):
+    """TaskWarrior backend that counts and times its `task` invocations."""
+
+    def _get_version(self):
+        metrics.count("subprocess_spawns")
+        return super()._get_version()
+
+    def execute_command(self, args, *posargs, **kwargs):
+        metrics.count("subprocess_spawns")
+        with metrics.stage("taskwarrior"):
+            return super().execute_command(args, *posargs, **kwargs)
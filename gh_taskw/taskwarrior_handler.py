@@ -1,16 +1,38 @@
 import json
 import os
-import subprocess
 import sys
+import threading
+import time
 import tomllib
-from loguru import logger
+import uuid
+from datetime import datetime, timezone
+from gh_taskw.log import logger
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
+
+from gh_taskw.accounts import ACCOUNT_KEYS, Account
+from gh_taskw.locks import KeyedLock
+from gh_taskw.routing import Route, Rule
+from gh_taskw.archive import NotificationArchive
+from gh_taskw.gh_notification import GhNotification, get_url
+from gh_taskw.metrics import metrics
+from gh_taskw.github_api import API_URL, make_client
+from gh_taskw.notifier import Notifier, NotifierNotification
+from gh_taskw.rate_limit import POLL
+from gh_taskw.state import PollState, default_state_dir
+from gh_taskw.subject_cache import SubjectCache, parse_timestamp
+from gh_taskw.subject_state import CLOSED_STATES, Subject, resolve_subject_states
+from gh_taskw.task_index import TaskIndex
+from gh_taskw.thread_store import ThreadStore
 
-from tasklib import TaskWarrior, Task
+if TYPE_CHECKING:
+    from gh_taskw.enrichment import SubjectDetails
+    from gh_taskw.tasklib_backend import InstrumentedTaskWarrior
 
-from gh_taskw.gh_notification import GhNotification
-from gh_taskw.notifier import Notifier, NotifierNotification
+
+# closed subjects are normally noticed in the notification stream (see
+# `close_changed_subjects`), the full sweep over all review tasks is rare
+CLOSED_PRS_INTERVAL = 6 * 3600
 
 
 class TaskwarriorHandler:
@@ -23,10 +45,12 @@ class TaskwarriorHandler:
     -------
     run_command(cmd)
         Executes a command using subprocess and returns the output.
-    process_gh_notification(reason, subject, repository, title, url)
+    process_gh_notification(gh_notification, account)
         Processes a GitHub notification, adding a task and a tasknote to Taskwarrior.
-    add_task(reason, subject, repository)
-        Adds a task to Taskwarrior and returns the task ID.
+    add_task(gh_notification, account)
+        Queues a task for Taskwarrior and returns its UUID.
+    flush_tasks()
+        Writes all queued tasks with a single `task import` and adds their tasknotes.
     add_tasknote(subject, reason, task_id, url)
         Adds a tasknote to a Taskwarrior task.
     """
@@ -41,6 +65,25 @@ class TaskwarriorHandler:
         loglevel: str = "ERROR",
         notifier: Optional[Notifier] = None,
         github_token: Optional[str] = None,
+        api_backend: str = "http",
+        api_url: str = API_URL,
+        state_dir: Optional[Path] = None,
+        archive_max_mb: int = 50,
+        archive_max_age_days: Optional[float] = None,
+        archive_compress: bool = True,
+        taskdata: Optional[Path] = None,
+        github=None,
+        metrics_textfile: Optional[Path] = None,
+        metrics_json: Optional[Path] = None,
+        project_prefix: str = "",
+        accounts: Optional[list[dict]] = None,
+        enrich_tasknotes: bool = False,
+        enrich_workers: int = 4,
+        closed_prs_interval: int = CLOSED_PRS_INTERVAL,
+        rules: Optional[list[dict]] = None,
+        process_workers: int = 4,
+        webhook_secret: Optional[str] = None,
+        webhook_login: Optional[str] = None,
     ):
         self.tasknote_handler = tasknote_handler
 
@@ -49,64 +92,235 @@ class TaskwarriorHandler:
         self.ignore_notification_reasons: list[str] = ignore_notification_reasons or []
         self.add_task_for_reasons = add_task_for_reasons or []
         self.high_priority_reasons = high_priority_reasons or []
+        self.project_prefix = project_prefix
+        self.rules = [Rule.from_config(rule) for rule in rules or ()]
+        self.api_backend = api_backend
+        self.api_url = api_url
 
         self.logdir = logdir
+        self.metrics_textfile = metrics_textfile
+        self.metrics_json = metrics_json
+        self.archive = (
+            NotificationArchive(
+                logdir / "gh_notifications.jsonl",
+                max_bytes=archive_max_mb * 1024 * 1024,
+                max_age=(
+                    archive_max_age_days * 24 * 3600 if archive_max_age_days else None
+                ),
+                compress=archive_compress,
+            )
+            if logdir
+            else None
+        )
+        self.state_dir = state_dir or default_state_dir()
+        self.subject_cache = SubjectCache.load(self.state_dir / "subject_cache.json")
+        self.thread_store = ThreadStore(self.state_dir / "threads.sqlite3")
+        self.enrich_workers = enrich_workers
+        self.closed_prs_interval = closed_prs_interval
+        # only used by `gh_taskw serve`
+        self.webhook_secret = webhook_secret
+        self.webhook_login = webhook_login
+        self.details_cache = None
+        if enrich_tasknotes:
+            from gh_taskw.enrichment import DetailsCache
+
+            self.details_cache = DetailsCache.load(
+                self.state_dir / "details_cache.json"
+            )
 
-        self.tw = TaskWarrior()
+        # Taskwarrior is only started once a task is read or written
+        self.taskdata = taskdata
+        self._tw: Optional["InstrumentedTaskWarrior"] = None
+        self._task_index: Optional[TaskIndex] = None
+        self._pending_tasks: list[dict] = []
+        self._pending_tasknotes: list[tuple[str, GhNotification, Account]] = []
+        # subjects whose threads showed new activity this cycle
+        self._changed_subjects: set[str] = set()
+        # notifications are processed concurrently (see `process_workers`): the
+        # notifications of one subject one at a time, the shared task index and
+        # queues are guarded by `_lock`
+        self.process_workers = process_workers
+        self._lock = threading.RLock()
+        self._url_locks = KeyedLock()
+        # Taskwarrior writes, of the polling loop and of webhook deliveries,
+        # one at a time. Taken before `_lock`.
+        self.write_lock = threading.RLock()
 
         self.notifier: Optional[Notifier] = notifier
 
         self.env = self._set_env()
         self._setup_logger(loglevel)
 
+        if accounts:
+            self.accounts = [
+                self._make_account(account_config, index)
+                for index, account_config in enumerate(accounts)
+            ]
+        else:
+            self.accounts = [
+                Account(
+                    name="default",
+                    github=github
+                    or make_client(
+                        backend=api_backend,
+                        token=self.gh_token,
+                        env=self.env,
+                        base_url=api_url,
+                    ),
+                    poll_state=PollState.load(self.state_dir / "poll_state.json"),
+                    ignore_notification_reasons=self.ignore_notification_reasons,
+                    high_priority_reasons=self.high_priority_reasons,
+                    add_task_for_reasons=self.add_task_for_reasons,
+                    project_prefix=self.project_prefix,
+                    rules=self.rules,
+                )
+            ]
+
+    @property
+    def tw(self) -> "InstrumentedTaskWarrior":
+        if self._tw is None:
+            from gh_taskw.tasklib_backend import InstrumentedTaskWarrior
+
+            self._tw = InstrumentedTaskWarrior(data_location=self.taskdata)
+        return self._tw
+
+    @property
+    def task_index(self) -> TaskIndex:
+        if self._task_index is None:
+            self._task_index = TaskIndex(self.tw)
+        return self._task_index
+
+    def _make_account(self, account_config: dict, index: int) -> Account:
+        unknown_keys = set(account_config) - set(ACCOUNT_KEYS) - {"name"}
+        if unknown_keys:
+            raise ValueError(f"Unknown keys in [[accounts]]: {sorted(unknown_keys)}")
+
+        name = account_config.get("name", f"account{index}")
+        config = {
+            "github_token": self.gh_token,
+            "ignore_notification_reasons": self.ignore_notification_reasons,
+            "high_priority_reasons": self.high_priority_reasons,
+            "add_task_for_reasons": self.add_task_for_reasons,
+            "project_prefix": self.project_prefix,
+            **account_config,
+        }
+        token = config.pop("github_token")
+        config.pop("name", None)
+        return Account(
+            name=name,
+            github=make_client(
+                backend=self.api_backend,
+                token=token,
+                env=self._set_env(token),
+                base_url=self.api_url,
+            ),
+            poll_state=PollState.load(self.state_dir / f"poll_state.{name}.json"),
+            rules=self.rules,
+            **config,
+        )
+
+    @property
+    def github(self):
+        """Client of the first account, used for everything not tied to an account."""
+        return self.accounts[0].github
+
+    @github.setter
+    def github(self, client):
+        self.accounts[0].github = client
+
+    @property
+    def poll_state(self) -> PollState:
+        return self.accounts[0].poll_state
+
+    def closed_prs_check_due(self, now: Optional[float] = None) -> bool:
+        """True if the last check for closed PRs is `closed_prs_interval` ago."""
+        now = time.time() if now is None else now
+        return now - self.poll_state.closed_prs_checked_at >= self.closed_prs_interval
+
+    def seconds_until_next_poll(self) -> float:
+        """Seconds until an account is due and its rate limit allows polling it."""
+        return min(
+            max(
+                account.poll_state.seconds_until_next_poll(),
+                account.github.budget.seconds_until_allowed(POLL),
+            )
+            for account in self.accounts
+        )
+
     def _setup_logger(self, loglevel: str):
+        # replace loguru's default DEBUG sink, so `loglevel` applies
+        logger.remove()
         if self.logdir:
             self.logdir.mkdir(parents=True, exist_ok=True)
-            logdir = self.logdir
+            logger.add(
+                self.logdir / "gh_taskw.log",
+                rotation="500 MB",
+                level=loglevel,
+                format="{time} {level} {message}",
+            )
         else:
-            logdir = sys.stderr
-
-        logger.add(
-            logdir / "gh_taskw.log",
-            rotation="500 MB",
-            level=loglevel,
-            format="{time} {level} {message}",
-        )
+            logger.add(sys.stderr, level=loglevel, format="{time} {level} {message}")
 
-    def _set_env(self):
+    def _set_env(self, token: Optional[str] = None):
         env = os.environ.copy()
-        if self.gh_token is not None:
-            env["GH_TOKEN"] = self.gh_token
+        token = token or self.gh_token
+        if token is not None:
+            env["GH_TOKEN"] = token
         return env
 
     def _send_notification(self, notifier_notification: NotifierNotification):
         if self.notifier:
-            self.notifier.notify(notifier_notification)
+            with metrics.stage("notify"):
+                self.notifier.notify(notifier_notification)
+
+    def write_metrics(self):
+        """Write the metrics of this run to the configured outputs."""
+        if self.metrics_textfile:
+            metrics.write_prometheus(self.metrics_textfile)
+        if self.metrics_json:
+            metrics.write_json(self.metrics_json)
+
+    def close(self):
+        """Release the resources held by the handler."""
+        if self.notifier:
+            self.notifier.close()
+        for account in self.accounts:
+            account.close()
+        self.thread_store.close()
 
     @classmethod
-    def from_config(cls, config_file: Optional[Path] = None):
+    def from_config(cls, config_file: Optional[Path] = None, **overrides):
+        """
+        Creates a handler from the toml config, `overrides` replace config values.
+        """
         if config_file is None:
             config_file = Path("~/.config/gh_taskw.toml").expanduser()
 
         toml_config = config_file.read_text()
 
         toml_dict = tomllib.loads(toml_config)
+        toml_dict.update(overrides)
 
         # get tasknote config
-        if "tasknote_config" in toml_dict:
+        if toml_dict.get("tasknote_config"):
             from tasknote.tasknote_handler import TaskNoteHandler
 
             tasknote_handler = TaskNoteHandler.from_config(
                 Path(toml_dict.pop("tasknote_config"))
             )
         else:
+            toml_dict.pop("tasknote_config", None)
             tasknote_handler = None
 
         # check if logfile is set
         toml_dict["logdir"] = (
-            Path(toml_dict["logdir"]).expanduser() if "logdir" in toml_dict else None
+            Path(toml_dict["logdir"]).expanduser() if toml_dict.get("logdir") else None
         )
 
+        for path_key in ("state_dir", "metrics_textfile", "metrics_json"):
+            if toml_dict.get(path_key):
+                toml_dict[path_key] = Path(toml_dict[path_key]).expanduser()
+
         # check if gh token is set
         notification_config = toml_dict.pop("notifications", None)
 
@@ -120,88 +334,209 @@ class TaskwarriorHandler:
             **toml_dict,
         )
 
-    def process_gh_notification(self, gh_notification: GhNotification):
+    def process_gh_notification(
+        self, gh_notification: GhNotification, account: Optional[Account] = None
+    ):
         """
         Processes a GitHub notification, adding a task and a tasknote to Taskwarrior.
+
+        Returns the UUID of the queued task, if a new task was queued.
+        Safe to call from several threads, notifications of the same subject
+        are processed one at a time.
         """
-        logger.debug(f"Processing notification: {gh_notification}")
-        if gh_notification.reason in self.ignore_notification_reasons:
-            return
+        account = account or self.accounts[0]
+        logger.debug("Processing notification: {}", gh_notification)
+        route = self._route(gh_notification, account)
+        if route.ignore:
+            return None
+
+        with self._url_locks.hold(gh_notification.url):
+            return self._process_gh_notification(gh_notification, account, route)
+
+    def _route(self, gh_notification: GhNotification, account: Account) -> Route:
+        return account.router.route(
+            gh_notification.reason,
+            f"{gh_notification.owner}/{gh_notification.repository}",
+            gh_notification.subject,
+        )
+
+    def _process_gh_notification(
+        self, gh_notification: GhNotification, account: Account, route: Route
+    ):
 
         url = gh_notification.url
+        # new activity, recheck the subject's state on the next closed PR check
+        with self._lock:
+            self.subject_cache.mark_active(url)
 
         # send a notification to the system
-        self._send_notification(
-            NotifierNotification(
-                title="GitHub",
-                body=f"{gh_notification.reason}: {gh_notification.subject}\n{url}",
-                urgency=(
-                    "critical"
-                    if gh_notification.reason in self.high_priority_reasons
-                    else "normal"
-                ),
+        if route.notify:
+            self._send_notification(
+                NotifierNotification(
+                    title="GitHub",
+                    body=f"{gh_notification.reason}: {gh_notification.subject}\n{url}",
+                    urgency="critical" if route.priority == "H" else "normal",
+                    category=gh_notification.reason,
+                    repository=f"{gh_notification.owner}/{gh_notification.repository}",
+                )
             )
-        )
 
-        task_id = self.add_task(gh_notification)
+        task_uuid = self.add_task(gh_notification, account, route)
 
-        if task_id and self.tasknote_handler:
-            self.add_tasknote(gh_notification=gh_notification, task_id=task_id)
+        if task_uuid and self.tasknote_handler:
+            # the tasknote needs the task ID, which is only known after the import
+            with self._lock:
+                self._pending_tasknotes.append((task_uuid, gh_notification, account))
+        return task_uuid
 
-    def add_task(self, gh_notification: GhNotification):
+    def add_task(
+        self,
+        gh_notification: GhNotification,
+        account: Optional[Account] = None,
+        route: Optional[Route] = None,
+    ):
         """
-        Adds a task to Taskwarrior and returns the task ID.
+        Queues a task for Taskwarrior and returns its UUID.
+
+        The queued tasks are written with `flush_tasks`.
         """
+        account = account or self.accounts[0]
+        route = route or self._route(gh_notification, account)
 
-        kwargs = (
-            {"priority": "H"}
-            if gh_notification.reason in self.high_priority_reasons
-            else {}
-        )
+        kwargs = {"priority": route.priority} if route.priority else {}
 
-        if gh_notification.reason in self.add_task_for_reasons:
+        if route.add_task:
             logger.info(f"Adding task for GitHub notification: {gh_notification}")
-            tags = [gh_notification.reason, "github"]
-            tags_str = " ".join([f"+{e}" for e in tags])
-
-            # check if task already exists
-            task_exists = len(
-                self.tw.tasks.pending().filter(
-                    f"githuburl:{gh_notification.url} {tags_str}"
-                )
-            )
+            tags = [gh_notification.reason, "github", *route.tags]
+
+            # the check and the queueing must not interleave with another
+            # notification of the same subject
+            with self._url_locks.hold(gh_notification.url):
+                # check if task already exists
+                with self._lock:
+                    task_exists = (
+                        self.task_index.get(gh_notification.url, gh_notification.reason)
+                        is not None
+                    )
 
-            if not task_exists:
-                logger.info(
-                    f"No existing task found for GitHub notification: {gh_notification}. Creating new task."
-                )
+                if not task_exists:
+                    logger.info(
+                        f"No existing task found for GitHub notification: {gh_notification}. Creating new task."
+                    )
 
-                assert (
-                    gh_notification.subject
-                ), f"task {gh_notification.__dict__} has no subject."
-
-                added_task = Task(
-                    self.tw,
-                    description=f"{gh_notification.reason}: {gh_notification.subject}",
-                    project=gh_notification.repository,
-                    tags=tags,
-                    githuburl=gh_notification.url,
-                    **kwargs,
-                )
-                added_task.save()
-                logger.info(f"New task created with ID: {added_task._data['id']}")
-            else:
-                logger.info(
-                    f"Task already exists for GitHub notification: {gh_notification}"
-                )
+                    assert (
+                        gh_notification.subject
+                    ), f"task {gh_notification} has no subject."
+
+                    added_task = {
+                        "uuid": str(uuid.uuid4()),
+                        "status": "pending",
+                        "entry": datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ"),
+                        "description": f"{gh_notification.reason}: {gh_notification.subject}",
+                        "project": route.project,
+                        "tags": tags,
+                        "githuburl": gh_notification.url,
+                        **kwargs,
+                    }
+                    with self._lock:
+                        self._pending_tasks.append(added_task)
+                        self.task_index.add(added_task)
+                    logger.info(f"New task queued with UUID: {added_task['uuid']}")
+                else:
+                    logger.info(
+                        f"Task already exists for GitHub notification: {gh_notification}"
+                    )
+                    return None
 
-            return added_task._data["id"]
+                return added_task["uuid"]
         else:
             logger.info(
-                f"GitHub notification reason {gh_notification.reason} not in add_task_for_reasons. Task not added."
+                f"No task is added for GitHub notification reason {gh_notification.reason}."
+            )
+
+    def flush_tasks(self):
+        """
+        Writes all queued tasks with a single `task import` and adds their tasknotes.
+        """
+        with self.write_lock:
+            self._flush_tasks()
+
+    def _flush_tasks(self):
+        with self._lock:
+            if not self._pending_tasks:
+                return
+            pending_tasks, self._pending_tasks = self._pending_tasks, []
+            pending_tasknotes, self._pending_tasknotes = self._pending_tasknotes, []
+
+        # fetch the details for the tasknotes while the tasks are imported
+        prefetches = []
+        if self.details_cache is not None:
+            from gh_taskw.enrichment import DetailsPrefetch
+
+            accounts = {id(account): account for _, _, account in pending_tasknotes}
+            prefetches = [
+                DetailsPrefetch(
+                    account.github,
+                    [n for _, n, a in pending_tasknotes if a is account],
+                    cache=self.details_cache,
+                    max_workers=self.enrich_workers,
+                )
+                for account in accounts.values()
+            ]
+
+        import tempfile
+
+        from tasklib import Task
+
+        try:
+            with metrics.stage("task_import"), tempfile.NamedTemporaryFile(
+                "w", suffix=".json"
+            ) as import_file:
+                json.dump(pending_tasks, import_file)
+                import_file.flush()
+                self.tw.execute_command(["import", import_file.name])
+            metrics.count("tasks_created", len(pending_tasks))
+            logger.info(f"Imported {len(pending_tasks)} new tasks")
+
+            # map the UUIDs back to the task IDs assigned by Taskwarrior
+            uuids = [task["uuid"] for task in pending_tasks]
+            imported_tasks = {}
+            for line in self.tw.execute_command(uuids + ["export"]):
+                if line.strip():
+                    imported_task = Task(self.tw)
+                    imported_task._load_data(json.loads(line.strip(",")))
+                    imported_tasks[imported_task["uuid"]] = imported_task
+        except Exception:
+            # drop the queued tasks from the index, so their subjects get a task
+            # when they are retried. Some of them may have been imported, the
+            # index is exported from disk again.
+            with self._lock:
+                self.task_index.invalidate()
+            raise
+
+        with self._lock:
+            for task in pending_tasks:
+                self.task_index.remove(task)
+                if task["uuid"] in imported_tasks:
+                    self.task_index.add(imported_tasks[task["uuid"]])
+
+        details = {}
+        for prefetch in prefetches:
+            details.update(prefetch.result())
+        for task_uuid, gh_notification, _ in pending_tasknotes:
+            self.add_tasknote(
+                gh_notification=gh_notification,
+                task_id=imported_tasks[task_uuid]["id"],
+                details=details.get(gh_notification.url),
             )
 
-    def add_tasknote(self, gh_notification: GhNotification, task_id: int):
+    @metrics.timed("tasknote")
+    def add_tasknote(
+        self,
+        gh_notification: GhNotification,
+        task_id: int,
+        details: Optional["SubjectDetails"] = None,
+    ):
         """
         Adds a tasknote to a Taskwarrior task.
         """
@@ -212,60 +547,188 @@ class TaskwarriorHandler:
             f"title: {gh_notification.subject}",
             f"type: {gh_notification.reason}",
         ]
+        if details is not None:
+            metadata.extend(details.to_note_lines())
         with open(self.tasknote_fn, "a") as textfile:
             textfile.write("\n".join(metadata))
 
+    def note_activity(self, row: dict):
+        """
+        Remember the subject of a fetched notification if it may have changed.
+
+        Called for every fetched notification, ignored ones included. A subject
+        changed if GitHub reports a `state_change`, or if the thread was updated
+        after the subject's state was last looked up.
+        """
+        url = get_url(row)
+        if Subject.from_url(url) is None:
+            return
+        updated_at = parse_timestamp(row.get("updated_at")) or time.time()
+        with self._lock:
+            entry = self.subject_cache.get(url)
+            if (
+                row["reason"] == "state_change"
+                or entry is None
+                or entry.updated_at is None
+                or updated_at > entry.updated_at
+            ):
+                self._changed_subjects.add(url)
+
+    @metrics.timed("close_changed_subjects")
+    def close_changed_subjects(self):
+        """
+        Close the review tasks of the subjects that changed in this cycle.
+
+        Only the subjects seen in the notification stream are looked up, so the
+        cost of a cycle doesn't grow with the number of open review tasks. The
+        rare `handle_closed_prs` sweep catches what the stream misses.
+        """
+        with self._lock:
+            changed, self._changed_subjects = self._changed_subjects, set()
+        if not changed:
+            return
+        with self._lock:
+            tasks = {
+                url: task
+                for url in changed
+                if (task := self.task_index.get(url, "review_requested")) is not None
+            }
+            for url in tasks:
+                # look the subject up now, no matter its recheck schedule
+                self.subject_cache.mark_active(url)
+        if not tasks:
+            return
+        logger.debug(f"Checking {len(tasks)} changed subjects with a review task")
+        states = self._resolve_subject_states(tasks)
+
+        closed_tasks = []
+        for url, task in tasks.items():
+            if states.get(url) in CLOSED_STATES:
+                subject = Subject.from_url(url)
+                logger.info(f"{subject.label} is closed. Closing task {task}")
+                self._notify_closed(subject, subject.label)
+                closed_tasks.append(task)
+        self._close_tasks(closed_tasks)
+        self.subject_cache.save()
+
+    def _resolve_subject_states(self, urls) -> dict[str, str]:
+        """
+        Look up the states of subjects, with the accounts' clients in turn.
+
+        A subject in a private repository only resolves with the token of an
+        account that can see it, so what one account can't resolve is looked
+        up with the next one.
+        """
+        states = {}
+        remaining = list(urls)
+        for account in self.accounts:
+            states.update(
+                resolve_subject_states(
+                    account.github,
+                    remaining,
+                    cache=self.subject_cache,
+                    budget=account.github.budget,
+                )
+            )
+            remaining = [url for url in remaining if url not in states]
+            if not remaining:
+                break
+        return states
+
+    def _notify_closed(self, subject: Optional[Subject], label: str):
+        self._send_notification(
+            NotifierNotification(
+                title="GitHub",
+                body=f"{label} is closed",
+                urgency="normal",
+                category="closed",
+                repository=f"{subject.owner}/{subject.repo}" if subject else None,
+            )
+        )
+
+    def _close_tasks(self, tasks: list):
+        """Mark `tasks` as done with a single task call."""
+        if not tasks:
+            return
+        with self.write_lock:
+            self.tw.execute_command([task["uuid"] for task in tasks] + ["done"])
+        with self._lock:
+            for task in tasks:
+                self.task_index.remove(task)
+        metrics.count("tasks_closed", len(tasks))
+        logger.debug(f"Marked {len(tasks)} tasks as done")
+
+    def close_subject(self, url: str) -> bool:
+        """
+        Close the task of a PR, issue or discussion that is known to be closed.
+
+        Used when GitHub reports the closing itself, e.g. through a webhook, so
+        the subject doesn't have to wait for `handle_closed_prs`. Returns True if
+        a task was closed.
+        """
+        subject = Subject.from_url(url)
+        label = subject.label if subject else url
+        with self._url_locks.hold(url):
+            # the task can't be imported or closed by a flush in between
+            with self.write_lock:
+                with self._lock:
+                    task = self.task_index.get(url, "review_requested")
+                if task is None:
+                    return False
+                logger.info(f"{label} is closed. Closing task {task}")
+                self._close_tasks([task])
+            # notifiers may block, don't hold up the writes of others meanwhile
+            self._notify_closed(subject, label)
+        return True
+
+    @metrics.timed("handle_closed_prs")
     def handle_closed_prs(self):
         """
-        Close all tasks for closed pr's.
+        Close all tasks for closed pr's, issues and discussions.
+
+        A full sweep over all review tasks, run every `closed_prs_interval`.
+
+        The states are looked up as far as the accounts' rate limit budgets allow,
+        see `_resolve_subject_states`. The other subjects are checked on the next run.
         """
         logger.info("Starting to handle closed PRs")
 
-        pr_tasks = self.tw.tasks.pending().filter(tags=["github", "review_requested"])
+        with self._lock:
+            pr_tasks = self.task_index.tasks_with_tag("review_requested")
         logger.debug(f"Found {len(pr_tasks)} PR tasks")
 
-        for pr_task_obj in pr_tasks._result_cache:
-            pr_task_data = pr_task_obj._data
+        urls = [
+            pr_task_obj["githuburl"]
+            for pr_task_obj in pr_tasks
+            if pr_task_obj["githuburl"]
+        ]
+        states = self._resolve_subject_states(urls)
+
+        closed_tasks = []
+        for pr_task_obj in pr_tasks:
             logger.debug(f"Processing PR task {pr_task_obj}")
 
-            if pr_task_data.get("githuburl"):
-                repo = pr_task_data["project"]
-                if "pull" in pr_task_data["githuburl"]:
-                    owner = pr_task_data["githuburl"].split("/")[3]
-                    pr_id = pr_task_data["githuburl"].split("/")[6]
-                    gh_api_cmd = [
-                        "gh",
-                        "api",
-                        "-H",
-                        "Accept: application/vnd.github+json",
-                        f"/repos/{owner}/{repo}/pulls/{pr_id}",
-                    ]
-                    logger.debug(f"Running command: {' '.join(gh_api_cmd)}")
-
-                    pr_dict = json.loads(
-                        subprocess.check_output(gh_api_cmd, env=self.env).decode(
-                            "utf-8"
-                        )
-                    )
-                    is_closed = pr_dict["state"] == "closed"
-                else:
-                    is_closed = True
-                    pr_id = pr_task_data["description"].split(":")[-1].strip()
+            subject = Subject.from_url(pr_task_obj["githuburl"])
+            if subject:
+                is_closed = states.get(pr_task_obj["githuburl"]) in CLOSED_STATES
+                label = subject.label
             else:
                 is_closed = True
-                pr_id = pr_task_data["description"].split(":")[-1].strip()
+                label = "PR " + pr_task_obj["description"].split(":")[-1].strip()
 
             if is_closed:
-                logger.info(f"PR {pr_id} is closed. Closing task {pr_task_obj}")
-                self.notifier.notify(
-                    NotifierNotification(
-                        title="GitHub",
-                        body=f"PR {pr_id} is closed",
-                        urgency="normal",
-                    )
-                )
-                # mark task as done
-                pr_task_obj.done()
-                logger.debug(f"Task {pr_task_obj} marked as done")
+                logger.info(f"{label} is closed. Closing task {pr_task_obj}")
+                self._notify_closed(subject, label)
+                closed_tasks.append(pr_task_obj)
+
+        self._close_tasks(closed_tasks)
+
+        # only keep subjects that still have a pending task
+        self.subject_cache.prune(
+            url for url in urls if states.get(url) not in CLOSED_STATES
+        )
+        self.subject_cache.save()
+        self.poll_state.closed_prs_checked_at = time.time()
+        self.poll_state.save()
 
         logger.info("Finished handling closed PRs")
@@ -0,0 +1,176 @@
+"""
+SQLite store of the notification threads gh_taskw processed.
+
+For every thread the store keeps the `updated_at` it was processed at, the UUID
+of the task it resulted in and the outcome. A thread whose `updated_at` did not
+move since it was handled is skipped before any Taskwarrior or API work.
+Threads that failed are kept, with the notification itself, and retried on the
+following cycles. After `MAX_ATTEMPTS` failures a thread is given up: it is
+recorded as abandoned and marked as read like a handled one.
+
+Outcomes are buffered and only written with `commit`, once the tasks they
+refer to were imported into Taskwarrior.
+"""
+
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from gh_taskw.log import logger
+
+HANDLED = "handled"
+FAILED = "failed"
+ABANDONED = "abandoned"
+
+# failed threads are retried this many times before they are given up
+MAX_ATTEMPTS = 5
+# threads that were not seen for this long are forgotten
+RETENTION = 30 * 24 * 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS threads (
+    account TEXT NOT NULL,
+    thread_id TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    task_uuid TEXT,
+    outcome TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    notification TEXT,
+    processed_at REAL NOT NULL,
+    PRIMARY KEY (account, thread_id)
+)
+"""
+
+
+class ThreadStore:
+    """Processed notification threads, keyed by account and thread ID."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._connection = None
+        self._lock = threading.Lock()
+        self._pending: list[tuple] = []
+
+    @property
+    def _db(self):
+        # connected on first use, a run without notifications never opens the store
+        if self._connection is None:
+            import sqlite3
+
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute(SCHEMA)
+            self._connection.commit()
+        return self._connection
+
+    def is_unchanged(self, account: str, notification: dict) -> bool:
+        """True if the thread was handled at its current `updated_at` already."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT updated_at, outcome FROM threads WHERE account = ? AND thread_id = ?",
+                (account, notification["id"]),
+            ).fetchone()
+        return (
+            row is not None
+            and row[0] == notification["updated_at"]
+            and row[1] != FAILED
+        )
+
+    def record(
+        self,
+        account: str,
+        notification: dict,
+        outcome: str,
+        task_uuid: Optional[str] = None,
+    ):
+        """Buffer the outcome of processing `notification`, see `commit`."""
+        with self._lock:
+            self._pending.append(
+                (
+                    account,
+                    notification["id"],
+                    notification["updated_at"],
+                    task_uuid,
+                    outcome,
+                    1 if outcome == FAILED else 0,
+                    # the notification is only needed to retry failed threads
+                    json.dumps(notification) if outcome == FAILED else None,
+                    time.time(),
+                )
+            )
+
+    def commit(self):
+        """Write the buffered outcomes and forget threads past the retention."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            if not pending:
+                return
+            with self._db:
+                self._db.executemany(
+                    """
+                    INSERT INTO threads
+                        (account, thread_id, updated_at, task_uuid, outcome,
+                         attempts, notification, processed_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (account, thread_id) DO UPDATE SET
+                        updated_at = excluded.updated_at,
+                        task_uuid = coalesce(excluded.task_uuid, threads.task_uuid),
+                        outcome = excluded.outcome,
+                        attempts = CASE WHEN excluded.outcome = 'failed'
+                            THEN threads.attempts + 1 ELSE 0 END,
+                        notification = excluded.notification,
+                        processed_at = excluded.processed_at
+                    """,
+                    pending,
+                )
+                self._db.execute(
+                    "DELETE FROM threads WHERE processed_at < ?",
+                    (time.time() - RETENTION,),
+                )
+        logger.debug(f"Stored the outcome of {len(pending)} notification threads")
+
+    def attempts(self, account: str, notification: dict) -> int:
+        """Number of stored failed attempts at processing the thread."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT attempts FROM threads "
+                "WHERE account = ? AND thread_id = ? AND outcome = ?",
+                (account, notification["id"], FAILED),
+            ).fetchone()
+        return row[0] if row else 0
+
+    def rollback(self):
+        """Drop the buffered outcomes, e.g. because the task import failed."""
+        with self._lock:
+            self._pending = []
+
+    def failed(self, account: str) -> list[dict]:
+        """Return the notifications of `account` that failed and are due for a retry."""
+        if self._connection is None and not self.path.exists():
+            # nothing was ever stored, don't create the store just to look
+            return []
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT notification FROM threads "
+                "WHERE account = ? AND outcome = ? AND attempts < ? "
+                "ORDER BY updated_at",
+                (account, FAILED, MAX_ATTEMPTS),
+            ).fetchall()
+        return [json.loads(notification) for (notification,) in rows]
+
+    def get(self, account: str, thread_id: str) -> Optional[dict]:
+        with self._lock:
+            cursor = self._db.execute(
+                "SELECT * FROM threads WHERE account = ? AND thread_id = ?",
+                (account, thread_id),
+            )
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        return dict(zip((column[0] for column in cursor.description), row))
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
@@ -1,25 +1,28 @@
 """
 This script is used to fetch GitHub notifications and process them.
 
-It uses the GitHub CLI to fetch the notifications and convert them into a pandas DataFrame.
+It uses the GitHub API client to fetch the notifications page by page.
 Each notification is then processed based on its 'reason' field.
 If the 'reason' is not 'ci_activity', a task is added to Taskwarrior with details from the notification.
-Regardless of the 'reason', the notification is marked as read using the GitHub CLI.
+Regardless of the 'reason', the notification is marked as read.
 
 """
 
-from pathlib import Path
 import subprocess
-import json
 from typing import Optional
-import pandas as pd
-from loguru import logger
+from gh_taskw.log import logger
+
+from gh_taskw.archive import NotificationArchive
+from gh_taskw.github_api import parse_link_header
+from gh_taskw.metrics import metrics
+from gh_taskw.state import PollState
 
 
 def run_command(cmd, env_vars: Optional[dict] = None):
     """
     Run a command and return the output as a string.
     """
+    metrics.count("subprocess_spawns")
     result = subprocess.run(cmd, capture_output=True, text=True, env=env_vars)
     if result.returncode != 0:
         raise Exception(
@@ -28,44 +31,48 @@ def run_command(cmd, env_vars: Optional[dict] = None):
     return result.stdout
 
 
-def mylog(issue_dict: dict, logfile: Path = None):
-    import json
-    from datetime import datetime
-
-    if not issue_dict:
-        return
-
-    if not logfile.exists():
-        json_dict = {}
-
-    else:
-        # Load existing data
-        with open(logfile, "r") as textfile:
-            json_dict = json.load(textfile)
-
-    # Add new data
-    now = datetime.now().strftime("%Y-%m-%d_%H:%M:%S")
-    json_dict[now] = issue_dict
-
-    # Write back to file
-    with open(logfile, "w") as textfile:
-        json.dump(json_dict, textfile)
-
-
-def get_notifications(log_fn: Optional[Path] = None, env: Optional[dict] = None):
+def iter_notification_pages(
+    github,
+    archive: Optional[NotificationArchive] = None,
+    poll_state: Optional[PollState] = None,
+    per_page: int = 100,
+):
     """
-    Get all unread notifications using the GitHub CLI and return them as a DataFrame.
+    Yield all unread notifications from the GitHub API, one page at a time.
+
+    Follows the `Link: rel="next"` headers, so only a single page is held in memory.
+    If a `poll_state` is given, the first request is conditional and nothing is
+    yielded when nothing changed since the last poll.
     """
 
-    # API command to get unread notifications
-    notifications_json = run_command(["gh", "api", "notifications"], env_vars=env)
+    # API request to get unread notifications
+    with metrics.stage("fetch"):
+        response = github.request(
+            "GET",
+            "notifications",
+            params={"per_page": per_page},
+            headers=poll_state.request_headers() if poll_state else None,
+        )
+    if poll_state:
+        poll_state.update(response)
+    if response.status == 304:
+        logger.debug("Notifications not modified since last poll")
+        return
 
-    if log_fn:
-        mylog(json.loads(notifications_json), logfile=log_fn)
+    while True:
+        with metrics.stage("parse"):
+            notifications = response.json()
+        metrics.count("notifications_fetched", len(notifications))
+        if archive:
+            with metrics.stage("archive"):
+                archive.append(notifications)
+        yield notifications
 
-    # Parse the output into a DataFrame
-    notifications_df = pd.DataFrame(json.loads(notifications_json))
-    return notifications_df
+        next_url = parse_link_header(response.header("Link")).get("next")
+        if not next_url:
+            break
+        with metrics.stage("fetch"):
+            response = github.request("GET", next_url)
 
 
 def log_errors(func):
@@ -82,17 +89,38 @@ def log_errors(func):
     return wrapper
 
 
-def mark_notification_as_read(notification_id, env_vars: Optional[dict] = None):
-    # API command to mark a notification as read
+def mark_notification_as_read(github, notification_id):
+    # API request to mark a notification as read
     logger.debug(f"Marking notification {notification_id} as read")
-    run_command(
-        [
-            "gh",
-            "api",
-            "--silent",
-            "--method",
-            "PATCH",
-            f"notifications/threads/{notification_id}",
-        ],
-        env_vars=env_vars,
-    )
+    github.request("PATCH", f"notifications/threads/{notification_id}")
+
+
+@metrics.timed("mark_read")
+def mark_notifications_as_read(
+    github, handled: list[tuple[str, str]], failed_updated_at: list[str]
+):
+    """
+    Mark a window of handled notifications as read.
+
+    `handled` holds `(id, updated_at)` of the successfully processed notifications.
+    They are marked as read with a single `PUT notifications` whose `last_read_at`
+    is the newest `updated_at`. `last_read_at` must not reach any failed notification
+    though, so notifications updated at or after the oldest failure are marked as
+    read one by one instead.
+    """
+    cutoff = min(failed_updated_at) if failed_updated_at else None
+    covered = [
+        updated_at for _, updated_at in handled if cutoff is None or updated_at < cutoff
+    ]
+    if covered:
+        last_read_at = max(covered)
+        logger.debug(f"Marking notifications up to {last_read_at} as read")
+        github.request(
+            "PUT",
+            "notifications",
+            json_body={"last_read_at": last_read_at, "read": True},
+        )
+
+    for notification_id, updated_at in handled:
+        if cutoff is not None and updated_at >= cutoff:
+            mark_notification_as_read(github, notification_id)
@@ -0,0 +1,246 @@
+"""
+Receiver for GitHub webhook deliveries, see `gh_taskw serve`.
+
+Deliveries of the `pull_request`, `pull_request_review`, `issues` and
+`issue_comment` events are verified with the webhook secret
+(`X-Hub-Signature-256`), turned into `GhNotification`s and processed like
+polled notifications. Closed and merged PRs and issues close their task right
+away. Polling keeps running on a slow interval, as a safety net for missed
+deliveries.
+
+A recorded delivery can be sent to a local receiver with
+
+    python -m gh_taskw.webhook --secret ... --event pull_request payload.json
+"""
+
+import argparse
+import hashlib
+import hmac
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from gh_taskw import _json
+from gh_taskw.gh_notification import GhNotification
+from gh_taskw.log import logger
+from gh_taskw.metrics import metrics
+
+EVENTS = ("pull_request", "pull_request_review", "issues", "issue_comment")
+DEFAULT_PORT = 8787
+# GitHub caps payloads at 25 MB
+MAX_BODY = 25 * 1024 * 1024
+
+
+def sign(secret: str, body: bytes) -> str:
+    """The `X-Hub-Signature-256` GitHub sends for `body`."""
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def verify_signature(secret: str, body: bytes, signature: Optional[str]) -> bool:
+    # compared as bytes, `compare_digest` rejects non-ASCII strings
+    return signature is not None and hmac.compare_digest(
+        sign(secret, body).encode(), signature.encode()
+    )
+
+
+def _reason(event: str, payload: dict, login: Optional[str]) -> Optional[str]:
+    """Notification reason of a delivery, None if it would not notify `login`."""
+    action = payload.get("action")
+    subject = payload.get("pull_request") or payload.get("issue") or {}
+    author = (subject.get("user") or {}).get("login")
+
+    if event == "pull_request" and action == "review_requested":
+        reviewer = (payload.get("requested_reviewer") or {}).get("login")
+        if login is None or reviewer == login or "requested_team" in payload:
+            return "review_requested"
+    elif event in ("pull_request", "issues") and action == "assigned":
+        if login is None or (payload.get("assignee") or {}).get("login") == login:
+            return "assign"
+    elif event == "pull_request_review" and action == "submitted":
+        return "author" if login is not None and author == login else "comment"
+    elif event == "issue_comment" and action == "created":
+        if login is not None and f"@{login}" in (payload["comment"].get("body") or ""):
+            return "mention"
+        return "author" if login is not None and author == login else "comment"
+    return None
+
+
+def parse_event(
+    event: str, payload: dict, login: Optional[str] = None
+) -> tuple[Optional[GhNotification], Optional[str]]:
+    """
+    Turn a delivery into a notification and/or the URL of a closed subject.
+
+    With `login`, only deliveries that would notify that user result in a
+    notification, and their own actions are skipped like GitHub does.
+    """
+    subject = payload.get("pull_request") or payload.get("issue")
+    if event not in EVENTS or subject is None:
+        return None, None
+    url = subject["html_url"]
+
+    if payload.get("action") == "closed" and event in ("pull_request", "issues"):
+        return None, url
+
+    if login is not None and (payload.get("sender") or {}).get("login") == login:
+        return None, None
+    reason = _reason(event, payload, login)
+    if reason is None:
+        return None, None
+    repository = payload["repository"]
+    return (
+        GhNotification(
+            reason=reason,
+            subject=subject["title"],
+            repository=repository["name"],
+            url=url,
+            owner=repository["owner"]["login"],
+            id=subject["number"],
+            updated_at=subject.get("updated_at") or "",
+        ),
+        None,
+    )
+
+
+class WebhookReceiver:
+    """
+    HTTP server that hands verified deliveries to a `TaskwarriorHandler`.
+
+    The handler serializes the Taskwarrior writes of deliveries and of the
+    polling loop. While a poll cycle processes notifications (`polling` is
+    set), deliveries only queue their tasks, the cycle writes them with its own.
+    `polling` is set, cleared and checked under the handler's `write_lock`.
+    """
+
+    def __init__(
+        self,
+        handler,
+        secret: str,
+        login: Optional[str] = None,
+        host: str = "127.0.0.1",
+        port: int = DEFAULT_PORT,
+    ):
+        self.handler = handler
+        self.secret = secret
+        self.login = login
+        self.polling = threading.Event()
+        self._server = ThreadingHTTPServer((host, port), _make_request_handler(self))
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        """Serve from a background thread."""
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="gh_taskw-webhook", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Listening for GitHub webhooks on {self.url}")
+
+    def shutdown(self):
+        if self._thread is not None:
+            self._server.shutdown()
+        self._server.server_close()
+
+    def deliver(
+        self, event: Optional[str], body: bytes, signature: Optional[str]
+    ) -> int:
+        """Process one delivery and return the HTTP status to answer with."""
+        if not verify_signature(self.secret, body, signature):
+            logger.warning(f"Rejecting {event} delivery with an invalid signature")
+            metrics.count("webhook_rejected")
+            return 401
+        metrics.count("webhook_deliveries")
+        if event == "ping":
+            return 200
+        try:
+            payload = _json.loads(body)
+        except ValueError:
+            return 400
+        if not isinstance(payload, dict):
+            return 400
+        notification, closed_url = parse_event(event, payload, self.login)
+        if notification is None and closed_url is None:
+            return 202
+
+        try:
+            if closed_url is not None:
+                self.handler.close_subject(closed_url)
+            if notification is not None:
+                self.handler.process_gh_notification(notification)
+                # `polling` only changes under the write lock, a cycle can't start
+                # queueing tasks between the check and the flush
+                with self.handler.write_lock:
+                    if not self.polling.is_set():
+                        self.handler.flush_tasks()
+        except Exception as e:
+            logger.error(f"Processing the {event} delivery failed: {e}")
+            return 500
+        return 202
+
+
+def _make_request_handler(receiver: WebhookReceiver):
+    class RequestHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > MAX_BODY:
+                self.send_error(413)
+                return
+            status = receiver.deliver(
+                self.headers.get("X-GitHub-Event"),
+                self.rfile.read(length),
+                self.headers.get("X-Hub-Signature-256"),
+            )
+            self.send_response(status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            logger.debug(f"webhook: {format % args}")
+
+    return RequestHandler
+
+
+def send_delivery(url: str, secret: str, event: str, body: bytes) -> int:
+    """POST a (recorded) delivery to a receiver, signed like GitHub does."""
+    import urllib.error
+    import urllib.request
+
+    request = urllib.request.Request(
+        url,
+        data=body,
+        method="POST",
+        headers={
+            "Content-Type": "application/json",
+            "X-GitHub-Event": event,
+            "X-Hub-Signature-256": sign(secret, body),
+        },
+    )
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send a recorded webhook delivery.")
+    parser.add_argument("payload", help="JSON payload of the delivery")
+    parser.add_argument("--event", required=True, choices=EVENTS + ("ping",))
+    parser.add_argument("--secret", required=True)
+    parser.add_argument("--url", default=f"http://127.0.0.1:{DEFAULT_PORT}/")
+    args = parser.parse_args()
+
+    with open(args.payload, "rb") as payload:
+        status = send_delivery(args.url, args.secret, args.event, payload.read())
+    print(status)
+    return 0 if status < 400 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
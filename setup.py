@@ -7,7 +7,7 @@ from setuptools import setup, find_packages
 with open("README.md") as readme_file:
     readme = readme_file.read()
 
-requirements = ["Click>=7.0", "pandas>=2.1", "loguru>=0.5.3", "tasklib", "loguru"]
+requirements = ["Click>=7.0", "loguru>=0.5.3", "tasklib", "loguru"]
 
 test_requirements = [
     "pytest>=3",
@@ -16,22 +16,21 @@ test_requirements = [
 setup(
     author="Hendrik Klug",
     author_email="hendrik.klug@gmail.com",
-    python_requires=">=3.6",
+    python_requires=">=3.11",
     classifiers=[
         "Development Status :: 2 - Pre-Alpha",
         "Intended Audience :: Developers",
         "License :: OSI Approved :: MIT License",
         "Natural Language :: English",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.6",
-        "Programming Language :: Python :: 3.7",
-        "Programming Language :: Python :: 3.8",
+        "Programming Language :: Python :: 3.11",
     ],
     description="Convert GitHub notifications to taskwarrior tasks",
     entry_points={
         "console_scripts": ["gh_taskw=gh_taskw.cli:main"],
     },
     install_requires=requirements,
+    extras_require={"fast": ["orjson"]},
     license="MIT license",
     long_description=readme + "\n",
     include_package_data=True,
@@ -0,0 +1,135 @@
+"""Fakes shared by the tests."""
+
+import threading
+from types import SimpleNamespace
+
+from gh_taskw.gh_notification import GhNotification
+from gh_taskw.task_index import TaskIndex
+from gh_taskw.taskwarrior_handler import TaskwarriorHandler
+
+
+def make_notification(
+    thread_id, reason="review_requested", updated_at="2026-10-01T10:00:00Z"
+):
+    """A notification thread as returned by `GET /notifications`."""
+    return {
+        "id": thread_id,
+        "reason": reason,
+        "updated_at": updated_at,
+        "subject": {
+            "title": f"PR {thread_id}",
+            "url": f"https://api.github.com/repos/octo/repo/pulls/{thread_id}",
+        },
+        "repository": {"name": "repo", "owner": {"login": "octo"}},
+    }
+
+
+def make_gh_notification(
+    number, reason="review_requested", updated_at="2026-10-01T10:00:00Z"
+):
+    return GhNotification(
+        reason=reason,
+        subject=f"PR {number}",
+        repository="repo",
+        url=f"https://github.com/octo/repo/pull/{number}",
+        owner="octo",
+        id=number,
+        updated_at=updated_at,
+    )
+
+
+def make_task(uuid, url, *tags):
+    return {"uuid": uuid, "githuburl": url, "tags": {"github", *tags}}
+
+
+class FakeQuerySet:
+    """Stand-in for `TaskWarrior.tasks`, counts the pending task exports."""
+
+    def __init__(self, tasks):
+        self.tasks = tasks
+        self.exports = 0
+
+    def pending(self):
+        return self
+
+    def filter(self, **kwargs):
+        self.exports += 1
+        return [task for task in self.tasks if "github" in task["tags"]]
+
+
+class FakeHandler:
+    """
+    Stand-in for `TaskwarriorHandler` in the polling and webhook code.
+
+    Notifications whose ID is in `fail` raise while they are processed.
+    """
+
+    archive = None
+    process_workers = 1
+    seconds_until_next_poll = TaskwarriorHandler.seconds_until_next_poll
+
+    def __init__(self, accounts=(), thread_store=None):
+        self.accounts = list(accounts)
+        self.thread_store = thread_store
+        self.fail = set()
+        # (account name, notification ID) of every processed notification
+        self.processed = []
+        self.notifications = []
+        self.closed = []
+        self.flushed = 0
+        self.closed_prs_checks = 0
+        self.task_index = TaskIndex(SimpleNamespace(tasks=FakeQuerySet([])))
+        self.write_lock = threading.RLock()
+
+    def process_gh_notification(self, gh_notification, account=None):
+        self.processed.append((account.name if account else None, gh_notification.id))
+        self.notifications.append(gh_notification)
+        if gh_notification.id in self.fail:
+            raise RuntimeError("taskwarrior is busy")
+        return f"uuid-{gh_notification.id}"
+
+    def flush_tasks(self):
+        self.flushed += 1
+
+    def close_subject(self, url):
+        self.closed.append(url)
+
+    def note_activity(self, row):
+        pass
+
+    def close_changed_subjects(self):
+        pass
+
+    def handle_closed_prs(self):
+        self.closed_prs_checks += 1
+
+    def write_metrics(self):
+        pass
+
+
+class FakeGraphQLClient:
+    """Answers subject state lookups from `states`, keyed by (owner, repo, number)."""
+
+    def __init__(self, states: dict):
+        self.states = states
+        self.queries = []
+
+    def graphql(self, query, variables=None):
+        self.queries.append(query)
+        data = {}
+        for line in query.splitlines():
+            if ": repository(" not in line:
+                continue
+            alias = line.split(":")[0].strip()
+            owner = line.split('owner: "')[1].split('"')[0]
+            repo = line.split('name: "')[1].split('"')[0]
+            field = line.split("{ ")[1].split("(")[0]
+            number = int(line.split("number: ")[1].split(")")[0])
+            state = self.states.get((owner, repo, number))
+            if state is None:
+                data[alias] = None
+            elif field == "discussion":
+                data[alias] = {field: {"closed": state == "CLOSED"}}
+            else:
+                data[alias] = {field: {"state": state}}
+        return data
@@ -0,0 +1,53 @@
+"""Tests for polling several accounts in one run."""
+
+import threading
+
+from gh_taskw.accounts import Account
+from gh_taskw.cli import process_notifications
+from gh_taskw.replay import ReplayClient
+from gh_taskw.state import PollState
+from tests.conftest import FakeHandler, make_notification
+
+
+class BarrierClient(ReplayClient):
+    """Only answers the first request once all accounts are polling at the same time."""
+
+    def __init__(self, barrier, notification_pages):
+        super().__init__(notification_pages=notification_pages)
+        self.barrier = barrier
+        self.requests = []
+
+    def request(self, method, path, params=None, json_body=None, headers=None):
+        if not self.requests:
+            self.barrier.wait()
+        self.requests.append((method, path))
+        return super().request(method, path, params, json_body, headers)
+
+
+def test_accounts_are_polled_concurrently(tmp_path):
+    barrier = threading.Barrier(2, timeout=5)
+    accounts = [
+        Account(
+            name="personal",
+            github=BarrierClient(barrier, [[make_notification("1")]]),
+            poll_state=PollState.load(tmp_path / "poll_state.personal.json"),
+        ),
+        Account(
+            name="bot",
+            github=BarrierClient(
+                barrier,
+                [[make_notification("2"), make_notification("3", "ci_activity")]],
+            ),
+            poll_state=PollState.load(tmp_path / "poll_state.bot.json"),
+            ignore_notification_reasons=["ci_activity"],
+        ),
+    ]
+    handler = FakeHandler(accounts)
+
+    process_notifications(handler)
+
+    assert sorted(handler.processed) == [("bot", 2), ("personal", 1)]
+    assert handler.flushed == 1
+    assert accounts[1].github.requests[-1] == ("PUT", "notifications")
+    assert (tmp_path / "poll_state.personal.json").exists()
+    assert (tmp_path / "poll_state.bot.json").exists()
@@ -0,0 +1,44 @@
+"""Tests for the append-only notification archive."""
+
+from datetime import datetime, timedelta, timezone
+
+from gh_taskw.archive import NotificationArchive
+
+
+def test_archive_rotates_and_streams_entries(tmp_path):
+    archive = NotificationArchive(tmp_path / "gh_notifications.jsonl", max_bytes=200)
+    start = datetime(2026, 10, 1, tzinfo=timezone.utc)
+
+    for i in range(10):
+        archive.append(
+            [{"id": str(i), "reason": "mention"}],
+            fetched_at=start + timedelta(minutes=i),
+        )
+
+    segments = archive.segments()
+    assert segments
+    assert all(path.suffix == ".gz" for _, path in segments)
+
+    entries = list(archive.iter_entries())
+    assert [entry["notification"]["id"] for entry in entries] == [
+        str(i) for i in range(10)
+    ]
+
+    window = list(
+        archive.iter_entries(
+            since=start + timedelta(minutes=3), until=start + timedelta(minutes=5)
+        )
+    )
+    assert [entry["notification"]["id"] for entry in window] == ["3", "4", "5"]
+
+
+def test_archive_rotates_by_age(tmp_path):
+    archive = NotificationArchive(
+        tmp_path / "gh_notifications.jsonl", max_age=3600, compress=False
+    )
+    archive.append([{"id": "1"}], fetched_at=datetime(2020, 1, 1, tzinfo=timezone.utc))
+    archive.append([{"id": "2"}])
+
+    assert len(archive.segments()) == 1
+    ids = [entry["notification"]["id"] for entry in archive.iter_entries()]
+    assert ids == ["1", "2"]
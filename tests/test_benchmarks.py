@@ -0,0 +1,38 @@
+"""Tests for the benchmark suite and its fake backends."""
+
+from benchmarks.bench_suite import Result, find_regressions, run_suite
+
+
+def test_suite_runs_against_fake_backends(tmp_path):
+    results = run_suite(
+        ["pipeline", "add_task", "closed_prs"], count=50, repeat=1, workdir=tmp_path
+    )
+    results = {result.scenario: result for result in results}
+
+    # `task --version`, the pending task export, the import and the export of the new tasks
+    assert results["pipeline"].subprocess_spawns == 4
+    assert results["add_task"].subprocess_spawns == 4
+    # `task --version`, the pending task export and a single `done`
+    assert results["closed_prs"].subprocess_spawns == 3
+    assert all(result.peak_mb > 0 for result in results.values())
+
+
+def test_find_regressions():
+    baselines = {
+        "add_task": {
+            "count": 100,
+            "ops_per_sec": 1000,
+            "peak_mb": 10,
+            "subprocess_spawns": 4,
+        }
+    }
+
+    assert (
+        find_regressions([Result("add_task", 100, 0.11, 4, 12)], baselines, 0.3) == []
+    )
+    assert (
+        len(find_regressions([Result("add_task", 100, 0.2, 5, 14)], baselines, 0.3))
+        == 3
+    )
+    # throughput and memory are only compared at the baseline's count
+    assert find_regressions([Result("add_task", 10, 1, 4, 50)], baselines, 0.3) == []
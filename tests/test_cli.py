@@ -0,0 +1,119 @@
+"""Tests for the polling loop of `gh_taskw daemon` and `gh_taskw serve`."""
+
+import signal
+import threading
+import time
+from types import SimpleNamespace
+
+from gh_taskw.accounts import Account
+from gh_taskw.cli import _stop_on_signals, process_notifications, run_cycles
+from gh_taskw.metrics import metrics
+from gh_taskw.replay import ReplayClient
+from gh_taskw.state import PollState
+from gh_taskw.task_index import TaskIndex
+from tests.conftest import FakeHandler, FakeQuerySet, make_notification, make_task
+
+
+def test_failed_cycle_fetches_the_notifications_again():
+    account = Account(
+        name="default",
+        github=ReplayClient(notification_pages=[[make_notification("1")]]),
+        poll_state=PollState(last_modified="Thu, 01 Oct 2026 00:00:00 GMT"),
+    )
+    handler = FakeHandler([account])
+    stop = threading.Event()
+
+    def flush_tasks():
+        # stop after this cycle, the loop waits for the next poll otherwise
+        stop.set()
+        raise RuntimeError("task import failed")
+
+    handler.flush_tasks = flush_tasks
+    run_cycles(handler, stop, closed_prs_interval=3600)
+
+    assert handler.processed == [("default", 1)]
+    assert handler.closed_prs_checks == 1
+    # the notifications were not marked as read, don't ask with If-Modified-Since
+    assert account.poll_state.last_modified is None
+    assert not account.poll_state.is_due()
+
+
+def test_tasks_done_by_hand_are_forgotten_on_the_next_fetch():
+    url = "https://github.com/octo/repo/pull/1"
+    tasks = FakeQuerySet([make_task("a", url, "review_requested")])
+    account = Account(name="default", github=ReplayClient(), poll_state=PollState())
+    handler = FakeHandler([account])
+    handler.task_index = TaskIndex(SimpleNamespace(tasks=tasks))
+    assert handler.task_index.get(url, "review_requested") is not None
+    # the user completes the task by hand between two cycles
+    tasks.tasks = []
+
+    # a cycle without notifications leaves the index alone
+    account.github = ReplayClient(notification_pages=[[]])
+    process_notifications(handler)
+    assert tasks.exports == 1
+
+    account.github = ReplayClient(notification_pages=[[make_notification("1")]])
+    account.poll_state = PollState()
+    process_notifications(handler)
+    assert handler.task_index.get(url, "review_requested") is None
+    assert tasks.exports == 2
+
+
+def test_sigterm_stops_the_loop():
+    handlers = {
+        signum: signal.getsignal(signum) for signum in (signal.SIGTERM, signal.SIGINT)
+    }
+    try:
+        stop = _stop_on_signals()
+        account = Account(name="default", github=ReplayClient(), poll_state=PollState())
+        thread = threading.Thread(
+            target=run_cycles, args=(FakeHandler([account]), stop, 3600), daemon=True
+        )
+        thread.start()
+        signal.raise_signal(signal.SIGTERM)
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+    finally:
+        for signum, handler in handlers.items():
+            signal.signal(signum, handler)
+
+
+def test_rate_limited_accounts_are_not_polled_in_a_busy_loop():
+    account = Account(name="default", github=ReplayClient(), poll_state=PollState())
+    account.github.budget.blocked_until = time.time() + 60
+    handler = FakeHandler([account])
+    cycles = []
+    handler.write_metrics = lambda: cycles.append(time.time())
+    stop = threading.Event()
+
+    thread = threading.Thread(
+        target=run_cycles, args=(handler, stop, 3600), daemon=True
+    )
+    thread.start()
+    time.sleep(0.3)
+    stop.set()
+    thread.join(timeout=5)
+
+    assert len(cycles) == 1
+    assert 59 < handler.seconds_until_next_poll() <= 60
+
+
+def test_webhook_metrics_between_cycles_are_written():
+    account = Account(name="default", github=ReplayClient(), poll_state=PollState())
+    handler = FakeHandler([account])
+    written = []
+    stop = threading.Event()
+
+    def write_metrics():
+        written.append(metrics.to_dict()["counters"])
+        stop.set()
+
+    handler.write_metrics = write_metrics
+    metrics.reset()
+    # counted by the webhook receiver while the loop waited
+    metrics.count("webhook_deliveries")
+    run_cycles(handler, stop, closed_prs_interval=3600)
+
+    assert written[0]["webhook_deliveries"] == 1
+    assert "webhook_deliveries" not in metrics.to_dict()["counters"]
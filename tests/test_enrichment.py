@@ -0,0 +1,84 @@
+"""Tests for prefetching the details of new tasks' subjects."""
+
+import json
+import threading
+
+from gh_taskw.enrichment import DetailsCache, DetailsPrefetch
+from gh_taskw.github_api import GitHubResponse
+from gh_taskw.rate_limit import RateLimitBudget
+from tests.conftest import make_gh_notification
+
+
+class FakeClient:
+    def __init__(self, parallel: int):
+        # the first requests only return once `parallel` of them are in flight
+        self.barrier = threading.Barrier(parallel, timeout=5)
+        self.budget = RateLimitBudget()
+        self.requests = []
+
+    def request(self, method, path, params=None, json_body=None, headers=None):
+        self.requests.append(path)
+        if path.endswith("/status"):
+            status = {"state": "success", "total_count": 2}
+            return GitHubResponse(200, body=json.dumps(status).encode())
+        if self.barrier is not None:
+            self.barrier.wait()
+        number = int(path.rsplit("/", 1)[1])
+        body = {
+            "user": {"login": "octocat"},
+            "labels": [{"name": "bug"}],
+            "changed_files": number,
+            "additions": 10,
+            "deletions": 2,
+            "requested_reviewers": [{"login": "hubot"}],
+            "requested_teams": [],
+            "head": {"sha": f"sha{number}"},
+        }
+        return GitHubResponse(200, body=json.dumps(body).encode())
+
+
+def test_details_are_prefetched_concurrently_and_cached(tmp_path):
+    client = FakeClient(parallel=3)
+    cache = DetailsCache.load(tmp_path / "details_cache.json")
+    notifications = [make_gh_notification(n) for n in range(1, 4)]
+
+    details = DetailsPrefetch(
+        client, notifications, cache=cache, max_workers=3
+    ).result()
+
+    assert set(details) == {n.url for n in notifications}
+    assert details[notifications[0].url].to_note_lines() == [
+        "author: octocat",
+        "labels: bug",
+        "changes: 1 files, +10 -2",
+        "reviewers: hubot",
+        "ci: success",
+    ]
+    assert len(client.requests) == 6
+
+    # unchanged subjects come from the cache, updated ones are fetched again
+    cache = DetailsCache.load(tmp_path / "details_cache.json")
+    client.requests.clear()
+    client.barrier = None
+    notifications[2] = make_gh_notification(3, updated_at="2026-10-02T10:00:00Z")
+    details = DetailsPrefetch(client, notifications, cache=cache).result()
+    assert len(details) == 3
+    assert client.requests == [
+        "/repos/octo/repo/pulls/3",
+        "/repos/octo/repo/commits/sha3/status",
+    ]
+
+
+def test_failed_fetches_are_left_out(tmp_path):
+    class TimeoutClient(FakeClient):
+        def request(self, method, path, params=None, json_body=None, headers=None):
+            if path == "/repos/octo/repo/pulls/2":
+                raise TimeoutError("timed out")
+            return super().request(method, path, params, json_body, headers)
+
+    client = TimeoutClient(parallel=1)
+    notifications = [make_gh_notification(n) for n in (1, 2)]
+
+    details = DetailsPrefetch(client, notifications, max_workers=1).result()
+
+    assert list(details) == [notifications[0].url]
@@ -0,0 +1,69 @@
+"""Tests for parsing GitHub notifications."""
+
+import dataclasses
+import json
+
+import pytest
+
+from gh_taskw.gh_notification import GhNotification, parse_notifications
+
+
+def make_notification(reason="review_requested", title="Fix the thing", url=None):
+    return {
+        "id": "1",
+        "reason": reason,
+        "subject": {
+            "title": title,
+            "url": url or "https://api.github.com/repos/octo/repo/pulls/12",
+        },
+        "repository": {"name": "repo", "owner": {"login": "octo"}},
+    }
+
+
+def test_parse_notifications():
+    raw = json.dumps(
+        [
+            make_notification(),
+            make_notification(
+                url="https://api.github.com/repos/octo/repo/issues/7", reason="mention"
+            ),
+            make_notification(reason="ci_activity", title="CI workflow run failed"),
+        ]
+    ).encode()
+
+    pull, issue, ci = parse_notifications(raw)
+
+    assert pull == GhNotification(
+        reason="review_requested",
+        subject="Fix the thing",
+        repository="repo",
+        url="https://github.com/octo/repo/pull/12",
+        owner="octo",
+        id=12,
+    )
+    assert issue.url == "https://github.com/octo/repo/issues/7"
+    assert issue.id == 7
+    assert ci.url == "https://github.com/octo/repo/actions/workflows/CI.yml"
+    assert ci.id == 12
+
+
+def test_notification_without_subject_url():
+    notification_dict = make_notification(
+        reason="ci_activity", title="CI workflow run failed"
+    )
+    notification_dict["subject"]["url"] = None
+
+    ci = GhNotification.from_notification_dict(notification_dict)
+
+    assert ci.url == "https://github.com/octo/repo/actions/workflows/CI.yml"
+    assert ci.id == 0
+
+    notification_dict["reason"] = "subscribed"
+    assert GhNotification.from_notification_dict(notification_dict).url == ""
+
+
+def test_notification_is_immutable():
+    notification = GhNotification.from_notification_dict(make_notification())
+    assert not hasattr(notification, "__dict__")
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        notification.url = "https://github.com"
@@ -8,7 +8,6 @@ import tempfile
 from gh_taskw.taskwarrior_handler import TaskwarriorHandler
 
 from gh_taskw import cli
-import pandas as pd
 import json
 
 gh_taskw_tasknote_config = 'tasknote_config = "{tasknote_config}"'
@@ -55,9 +54,9 @@ def test_taskwarrior_handler(with_tasknote: bool):
         example_notification_fn = (
             Path(__file__).parent / "test_data" / "example_notification.json"
         )
-        df = pd.DataFrame(json.loads(example_notification_fn.read_text()))
-
-        df.apply(lambda x: cli.process_row(x, tw_handler=tw_handler), axis=1)
+        for row in json.loads(example_notification_fn.read_text()):
+            cli.process_row(row, tw_handler=tw_handler)
+        tw_handler.flush_tasks()
 
         # get all tasks with github tag
         gh_helloworld_tasks = json.loads(
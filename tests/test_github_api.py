@@ -0,0 +1,151 @@
+"""Tests for the GitHub API access layer."""
+
+import json
+import threading
+from urllib.parse import parse_qs, urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from gh_taskw.github_api import GitHubAPIError, GitHubClient
+from gh_taskw.state import PollState
+from gh_taskw.utils import iter_notification_pages, mark_notifications_as_read
+
+LAST_MODIFIED = "Thu, 01 Oct 2026 10:00:00 GMT"
+
+
+class FakeGitHubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status: int, payload=None, headers=None):
+        body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.requests.append(("GET", self.path, dict(self.headers)))
+        if self.path.startswith("/missing"):
+            self._reply(404, {"message": "Not Found"})
+        elif self.headers.get("If-Modified-Since") == LAST_MODIFIED:
+            self._reply(304, headers={"X-Poll-Interval": "120"})
+        elif self.path.startswith("/notifications"):
+            page = int(parse_qs(urlsplit(self.path).query).get("page", ["1"])[0])
+            headers = {"Last-Modified": LAST_MODIFIED, "X-Poll-Interval": "60"}
+            if page < 3:
+                next_url = f"http://127.0.0.1:{self.server.server_port}/notifications?per_page=100&page={page + 1}"
+                headers["Link"] = f'<{next_url}>; rel="next"'
+            self._reply(200, [{"id": str(page)}], headers=headers)
+        else:
+            self._reply(200, [{"id": "1"}])
+
+    def do_PATCH(self):
+        self.server.requests.append(("PATCH", self.path, dict(self.headers)))
+        self._reply(205)
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        payload = json.loads(self.rfile.read(length))
+        self.server.requests.append(("POST", self.path, payload))
+        self._reply(200, {"data": {"echo": payload["variables"]}})
+
+    def do_PUT(self):
+        length = int(self.headers["Content-Length"])
+        payload = json.loads(self.rfile.read(length))
+        self.server.requests.append(("PUT", self.path, payload))
+        self._reply(205)
+
+
+@pytest.fixture
+def fake_github():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGitHubHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_client_reuses_connections(fake_github):
+    client = GitHubClient(
+        token="secret", base_url=f"http://127.0.0.1:{fake_github.server_port}"
+    )
+
+    for _ in range(50):
+        assert client.request("GET", "notifications").json() == [{"id": "1"}]
+    for thread_id in range(30):
+        assert (
+            client.request("PATCH", f"notifications/threads/{thread_id}").status == 205
+        )
+    assert client.graphql("query {}", {"a": 1}) == {"echo": {"a": 1}}
+
+    assert client.connections_opened == 1
+    assert len(fake_github.requests) == 81
+    assert fake_github.requests[0][2]["Authorization"] == "Bearer secret"
+    client.close()
+
+
+def test_client_raises_on_error_status(fake_github):
+    client = GitHubClient(base_url=f"http://127.0.0.1:{fake_github.server_port}")
+
+    with pytest.raises(GitHubAPIError) as excinfo:
+        client.request("GET", "missing", params={"page": 2})
+
+    assert excinfo.value.response.status == 404
+    assert fake_github.requests[0][1] == "/missing?page=2"
+
+
+def test_paginated_conditional_notifications_poll(fake_github, tmp_path):
+    client = GitHubClient(base_url=f"http://127.0.0.1:{fake_github.server_port}")
+    poll_state = PollState.load(tmp_path / "poll_state.json")
+
+    pages = list(iter_notification_pages(client, poll_state=poll_state))
+    assert pages == [[{"id": "1"}], [{"id": "2"}], [{"id": "3"}]]
+    assert fake_github.requests[0][1] == "/notifications?per_page=100"
+    poll_state.save()
+
+    poll_state = PollState.load(tmp_path / "poll_state.json")
+    assert poll_state.last_modified == LAST_MODIFIED
+    assert not poll_state.is_due(now=poll_state.last_polled + 30)
+    assert poll_state.is_due(now=poll_state.last_polled + 60)
+
+    assert list(iter_notification_pages(client, poll_state=poll_state)) == []
+    assert fake_github.requests[-1][2]["If-Modified-Since"] == LAST_MODIFIED
+    assert poll_state.poll_interval == 120
+
+
+def test_mark_notifications_as_read_in_bulk(fake_github):
+    client = GitHubClient(base_url=f"http://127.0.0.1:{fake_github.server_port}")
+    handled = [
+        ("1", "2026-10-01T10:00:00Z"),
+        ("2", "2026-10-01T12:00:00Z"),
+        ("3", "2026-10-01T14:00:00Z"),
+    ]
+
+    mark_notifications_as_read(client, handled, failed_updated_at=[])
+    assert fake_github.requests == [
+        (
+            "PUT",
+            "/notifications",
+            {"last_read_at": "2026-10-01T14:00:00Z", "read": True},
+        )
+    ]
+
+    fake_github.requests.clear()
+    mark_notifications_as_read(
+        client, handled, failed_updated_at=["2026-10-01T11:00:00Z"]
+    )
+    assert [request[:2] for request in fake_github.requests] == [
+        ("PUT", "/notifications"),
+        ("PATCH", "/notifications/threads/2"),
+        ("PATCH", "/notifications/threads/3"),
+    ]
+    assert fake_github.requests[0][2]["last_read_at"] == "2026-10-01T10:00:00Z"
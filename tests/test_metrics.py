@@ -0,0 +1,33 @@
+"""Tests for the per-run metrics."""
+
+import json
+
+from gh_taskw.github_api import GitHubResponse, _observe
+from gh_taskw.metrics import Metrics, metrics
+
+
+def test_metrics_outputs(tmp_path):
+    run_metrics = Metrics()
+    for _ in range(3):
+        with run_metrics.stage("fetch"):
+            pass
+    run_metrics.count("api_calls", 3)
+    run_metrics.gauge("ratelimit_remaining", 4990)
+
+    run_metrics.write_json(tmp_path / "metrics.json")
+    run_metrics.write_prometheus(tmp_path / "gh_taskw.prom")
+
+    summary = json.loads((tmp_path / "metrics.json").read_text())
+    assert summary["stages"]["fetch"]["calls"] == 3
+    assert summary["counters"] == {"api_calls": 3}
+    textfile = (tmp_path / "gh_taskw.prom").read_text()
+    assert 'gh_taskw_stage_calls{stage="fetch"} 3' in textfile
+    assert "gh_taskw_ratelimit_remaining 4990" in textfile
+
+
+def test_responses_record_rate_limit_headroom():
+    metrics.reset()
+    _observe(GitHubResponse(200, headers={"x-ratelimit-remaining": "42"}))
+
+    assert metrics.counters["api_calls"] == 1
+    assert metrics.gauges["ratelimit_remaining"] == 42
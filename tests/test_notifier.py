@@ -0,0 +1,64 @@
+"""Tests for the asynchronous notifier."""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from gh_taskw.notifier import Notifier, NotifierNotification
+
+
+class FakeGotifyHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        self.server.messages.append(json.loads(self.rfile.read(length)))
+        body = json.dumps(
+            {
+                "id": len(self.server.messages),
+                "appid": 1,
+                "message": "",
+                "date": "2026-10-01T10:00:00Z",
+            }
+        ).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def test_async_notifier_coalesces_bursts():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGotifyHandler)
+    server.messages = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    notifier = Notifier.from_config(
+        {
+            "system": "gotify",
+            "base_url": f"http://127.0.0.1:{server.server_port}",
+            "app_token": "token",
+            "asynchronous": True,
+            "coalesce_window": 5,
+        }
+    )
+    for i in range(12):
+        notifier.notify(
+            NotifierNotification(
+                title="GitHub",
+                body=f"review_requested: PR {i}",
+                urgency="critical" if i == 3 else "normal",
+                category="review_requested",
+                repository="org/repo",
+            )
+        )
+    notifier.notify(NotifierNotification(title="GitHub", body="PR 1 is closed"))
+    notifier.close()
+
+    server.shutdown()
+    server.server_close()
+    assert [(m["message"], m["priority"]) for m in server.messages] == [
+        ("12 review_requested in org/repo", 2),
+        ("PR 1 is closed", 0),
+    ]
@@ -0,0 +1,86 @@
+"""Tests for the notification processing pipeline."""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from gh_taskw import pipeline
+from gh_taskw.gh_notification import GhNotification
+from gh_taskw.replay import ReplayClient
+from gh_taskw.task_index import TaskIndex
+from gh_taskw.taskwarrior_handler import TaskwarriorHandler
+from tests.conftest import FakeQuerySet
+
+
+def make_row(thread_id, reason, updated_at="2026-10-01T10:00:00Z"):
+    return {"id": thread_id, "reason": reason, "updated_at": updated_at}
+
+
+def test_pipeline_filters_dedupes_and_records_outcomes():
+    pages = [
+        [make_row("1", "review_requested"), make_row("2", "ci_activity")],
+        [
+            make_row("1", "review_requested"),
+            make_row("3", "mention", "2026-10-01T09:00:00Z"),
+        ],
+    ]
+    processed = []
+
+    def process(row):
+        processed.append(row["id"])
+        return row["reason"] != "mention"
+
+    window = pipeline.run(pages, process, ignored_reasons=["ci_activity"])
+
+    assert processed == ["1", "3"]
+    assert window.handled == [
+        ("1", "2026-10-01T10:00:00Z"),
+        ("2", "2026-10-01T10:00:00Z"),
+    ]
+    assert window.failed_updated_at == ["2026-10-01T09:00:00Z"]
+
+
+def test_pipeline_processes_notifications_concurrently():
+    # every notification waits for three others, so this only finishes with 4 workers
+    barrier = threading.Barrier(4, timeout=5)
+    pages = [[make_row(str(n), "mention") for n in range(20)]]
+
+    def process(row):
+        barrier.wait()
+        return row["id"] != "7"
+
+    window = pipeline.run(pages, process, workers=4)
+
+    assert sorted(thread_id for thread_id, _ in window.handled) == sorted(
+        str(n) for n in range(20) if n != 7
+    )
+    assert window.failed_updated_at == ["2026-10-01T10:00:00Z"]
+
+
+def test_concurrent_notifications_of_a_subject_add_one_task(tmp_path):
+    handler = TaskwarriorHandler(
+        github=ReplayClient(),
+        state_dir=tmp_path,
+        add_task_for_reasons=["review_requested"],
+    )
+    handler._task_index = TaskIndex(SimpleNamespace(tasks=FakeQuerySet([])))
+    notifications = [
+        GhNotification(
+            reason="review_requested",
+            subject="Fix it",
+            repository="repo",
+            url=f"https://github.com/octo/repo/pull/{n % 3}",
+            owner="octo",
+            id=n,
+        )
+        for n in range(30)
+    ]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        uuids = list(pool.map(handler.process_gh_notification, notifications))
+
+    assert len([task_uuid for task_uuid in uuids if task_uuid]) == 3
+    assert sorted(task["githuburl"] for task in handler._pending_tasks) == [
+        f"https://github.com/octo/repo/pull/{n}" for n in range(3)
+    ]
+    assert len(handler._url_locks) == 0
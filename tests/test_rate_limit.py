@@ -0,0 +1,92 @@
+"""Tests for the rate limit aware request budget."""
+
+import time
+
+from gh_taskw.github_api import GitHubResponse
+from gh_taskw.metrics import metrics
+from gh_taskw.rate_limit import CHECK, POLL, RateLimitBudget
+from gh_taskw.subject_state import resolve_subject_states
+
+from tests.conftest import FakeGraphQLClient
+
+
+def quota_response(remaining, status=200, limit=5000, reset=1000, **headers):
+    return GitHubResponse(
+        status,
+        headers={
+            "x-ratelimit-limit": str(limit),
+            "x-ratelimit-remaining": str(remaining),
+            "x-ratelimit-reset": str(reset),
+            **headers,
+        },
+    )
+
+
+def test_checks_leave_a_reserve_for_polling():
+    budget = RateLimitBudget()
+    assert budget.allows(CHECK, now=0)
+
+    budget.update(quota_response(400), now=0)
+    assert budget.allows(POLL, now=0)
+    assert not budget.allows(CHECK, now=0)
+    # the quota is refilled after the reset
+    assert budget.allows(CHECK, now=1000)
+
+
+def test_budget_backs_off_on_rate_limit_errors():
+    budget = RateLimitBudget()
+    assert budget.update(quota_response(0, status=403), now=0)
+    assert not budget.allows(POLL, now=999)
+    assert budget.allows(POLL, now=1000)
+
+    budget = RateLimitBudget()
+    assert budget.update(
+        quota_response(4000, status=429, **{"retry-after": "30"}), now=0
+    )
+    assert not budget.allows(POLL, now=29)
+    assert budget.allows(POLL, now=30)
+
+    # a permission error is not a rate limit
+    assert not RateLimitBudget().update(GitHubResponse(403, body=b"Forbidden"), now=0)
+
+    # secondary rate limits without Retry-After back off exponentially
+    budget = RateLimitBudget()
+    budget.update(
+        GitHubResponse(403, body=b"You have exceeded a secondary rate limit"), now=0
+    )
+    budget.update(
+        GitHubResponse(403, body=b"You have exceeded a secondary rate limit"), now=60
+    )
+    assert budget.blocked_until == 180
+
+
+class BudgetedClient(FakeGraphQLClient):
+    """Every query costs 100 points of the GraphQL quota."""
+
+    def __init__(self, states, remaining):
+        super().__init__(states)
+        self.budget = RateLimitBudget()
+        self.remaining = remaining
+
+    def graphql(self, query, variables=None):
+        self.remaining -= 100
+        self.budget.update(
+            quota_response(
+                self.remaining,
+                reset=time.time() + 3600,
+                **{"x-ratelimit-resource": "graphql"},
+            )
+        )
+        return super().graphql(query, variables)
+
+
+def test_subject_checks_are_deferred_when_the_budget_is_low():
+    metrics.reset()
+    client = BudgetedClient({("octo", "repo", n): "MERGED" for n in range(300)}, 600)
+    urls = [f"https://github.com/octo/repo/pull/{n}" for n in range(300)]
+
+    resolved = resolve_subject_states(client, urls, budget=client.budget)
+
+    assert len(client.queries) == 1
+    assert len(resolved) == 100
+    assert metrics.counters["deferred_subject_checks"] == 200
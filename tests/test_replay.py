@@ -0,0 +1,55 @@
+"""Tests for recording and replaying GitHub traffic."""
+
+import json
+
+from gh_taskw.github_api import GitHubResponse
+from gh_taskw.replay import RecordingClient, ReplayClient, load_notification_pages
+from gh_taskw.subject_state import resolve_subject_states
+from gh_taskw.utils import iter_notification_pages
+
+
+class ScriptedClient:
+    """Answers notification and GraphQL requests like GitHub would."""
+
+    def request(self, method, path, params=None, json_body=None, headers=None):
+        if path == "graphql":
+            data = {
+                line.split(":")[0].strip(): {"pullRequest": {"state": "MERGED"}}
+                for line in json_body["query"].splitlines()
+                if ": repository(" in line
+            }
+            return GitHubResponse(200, body=json.dumps({"data": data}).encode())
+        return GitHubResponse(200, body=json.dumps([{"id": "7"}]).encode())
+
+    def close(self):
+        pass
+
+
+def test_record_then_replay(tmp_path):
+    urls = [f"https://github.com/octo/repo/pull/{n}" for n in range(3)]
+    recorder = RecordingClient(ScriptedClient(), tmp_path)
+    recorded_pages = list(iter_notification_pages(recorder))
+    recorded_states = resolve_subject_states(recorder, urls)
+
+    replay = ReplayClient.from_dir(tmp_path)
+    assert list(iter_notification_pages(replay)) == recorded_pages
+    assert resolve_subject_states(replay, urls) == recorded_states
+    # differently composed batches are answered from the recorded selections
+    assert resolve_subject_states(replay, urls[1:], chunk_size=1) == {
+        url: "merged" for url in urls[1:]
+    }
+    assert replay.request("PUT", "notifications").status == 205
+
+
+def test_replay_notifications_from_legacy_log(tmp_path):
+    legacy_log = tmp_path / "gh_notifications.json"
+    legacy_log.write_text(
+        json.dumps(
+            {"2026-10-01_10:00:00": [{"id": "1"}], "2026-10-01_10:01:00": [{"id": "2"}]}
+        )
+    )
+
+    replay = ReplayClient(notification_pages=load_notification_pages(legacy_log))
+
+    pages = list(iter_notification_pages(replay))
+    assert [row["id"] for page in pages for row in page] == ["1", "2"]
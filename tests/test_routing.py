@@ -0,0 +1,83 @@
+"""Tests for the compiled routing rules."""
+
+import random
+
+import pytest
+
+from gh_taskw.routing import Route, Router, Rule
+
+RULES = [
+    {"reason": "ci_activity", "repo": "octo/sandbox-*", "ignore": True},
+    {
+        "repo": "octo/*",
+        "subject": r"^\[security\]",
+        "project": "security",
+        "priority": "H",
+    },
+    {
+        "reason": ["mention", "team_mention"],
+        "subject": "(?i)release",
+        "tags": ["release"],
+    },
+    {"repo": "other/?", "notify": False},
+]
+
+
+def test_first_matching_rule_wins():
+    router = Router.from_config(
+        RULES,
+        add_task_for_reasons=["review_requested", "mention"],
+        high_priority_reasons=["review_requested"],
+        project_prefix="gh.",
+    )
+
+    assert router.route("ci_activity", "octo/sandbox-1", "CI failed").ignore
+    assert not router.route("ci_activity", "octo/repo", "CI failed").ignore
+    assert router.route("mention", "octo/repo", "[security] Release 1.0") == Route(
+        add_task=True, project="security", priority="H"
+    )
+    assert router.route("mention", "octo/repo", "Prepare the Release") == Route(
+        add_task=True, project="gh.repo", tags=("release",)
+    )
+    assert router.route("comment", "octo/repo", "Prepare the release") == Route()
+    assert not router.route("comment", "other/x", "anything").notify
+    assert router.route("comment", "other/xy", "anything").notify
+    # defaults of the account when no rule matches
+    assert router.route("review_requested", "a/b", "Fix") == Route(
+        add_task=True, project="gh.b", priority="H"
+    )
+
+
+def test_compiled_router_matches_rules_one_by_one():
+    rng = random.Random(0)
+    reasons = ["review_requested", "mention", "comment", "ci_activity", "state_change"]
+    configs = []
+    for index in range(300):
+        config = {"tags": [f"rule{index}"]}
+        if rng.random() < 0.5:
+            config["reason"] = rng.sample(reasons, rng.randint(1, 2))
+        if rng.random() < 0.7:
+            repo = rng.choice(["*", "repo?", "repo1*"])
+            config["repo"] = f"org{rng.randrange(20)}/{repo}"
+        if rng.random() < 0.5:
+            config["subject"] = rng.choice(["fix", "^Bump", r"\d+$", "(docs|test)"])
+        configs.append(config)
+    rules = [Rule.from_config(config) for config in configs]
+    router = Router(rules)
+
+    for _ in range(2000):
+        reason = rng.choice(reasons + ["assign"])
+        repo = f"org{rng.randrange(25)}/repo{rng.randrange(15)}"
+        subject = rng.choice(["fix the docs", "Bump foo to 12", "Add tests", "misc"])
+        expected = next(
+            (i for i, rule in enumerate(rules) if rule.matches(reason, repo, subject)),
+            None,
+        )
+        assert router.match(reason, repo, subject) == expected
+
+
+def test_invalid_rules_are_rejected():
+    with pytest.raises(ValueError):
+        Rule.from_config({"repository": "octo/*"})
+    with pytest.raises(ValueError):
+        Rule.from_config({"subject": "(?P<name>x)"})
@@ -0,0 +1,122 @@
+"""Startup time regression tests, run under `python -X importtime`."""
+
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+# dependencies that must stay off the path of a run without notifications
+HEAVY_MODULES = {
+    "loguru",
+    "tasklib",
+    "tasknote",
+    "gotify",
+    "httpx",
+    "pandas",
+    "sqlite3",
+    "http.client",
+    "concurrent.futures",
+    "orjson",
+}
+
+# bound on the cumulative import time of gh_taskw.cli, in microseconds. It
+# measures about 100ms on a slow machine, so this fails on a 2x regression. Most
+# of it is click (~25ms), gh_taskw.taskwarrior_handler (~25ms: tomllib, notifier,
+# subject state), gh_taskw.utils (~15ms: github_api, subprocess, archive),
+# gh_taskw.pipeline (~13ms: metrics, state, json) and gh_taskw.accounts (~10ms:
+# the routing dataclasses).
+MAX_IMPORT_TIME_US = 150_000
+
+REPO_DIR = Path(__file__).parent.parent
+
+
+def run_importtime(
+    args: list[str], env: dict
+) -> tuple[subprocess.CompletedProcess, dict]:
+    """Run python with `-X importtime`, return the result and module -> cumulative us."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONPATH": str(REPO_DIR), **env},
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            modules[name.strip()] = int(cumulative)
+    return result, modules
+
+
+def test_cli_import_is_lean():
+    result, modules = run_importtime(["-c", "import gh_taskw.cli"], env={})
+    assert result.returncode == 0, result.stderr
+    assert not HEAVY_MODULES & set(modules)
+    assert modules["gh_taskw.cli"] < MAX_IMPORT_TIME_US
+
+
+class NotModifiedHandler(BaseHTTPRequestHandler):
+    """Answers every poll with 304 Not Modified."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.polls += 1
+        self.send_response(304)
+        self.send_header("X-Poll-Interval", "60")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def not_modified_github():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), NotModifiedHandler)
+    server.polls = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_empty_cycle_loads_no_heavy_dependencies(tmp_path, not_modified_github):
+    state_dir = tmp_path / "state"
+    state_dir.mkdir()
+    (state_dir / "poll_state.json").write_text(
+        json.dumps(
+            {
+                "last_modified": "Thu, 01 Oct 2026 00:00:00 GMT",
+                "last_polled": 0,
+                "closed_prs_checked_at": time.time(),
+            }
+        )
+    )
+    config_dir = tmp_path / ".config"
+    config_dir.mkdir()
+    host, port = not_modified_github.server_address[:2]
+    (config_dir / "gh_taskw.toml").write_text(
+        f'github_token = "secret"\nstate_dir = "{state_dir}"\n'
+        f'api_url = "http://{host}:{port}"\n'
+        'add_task_for_reasons = ["review_requested"]\n'
+    )
+
+    result, modules = run_importtime(
+        ["-m", "gh_taskw.cli"], env={"HOME": str(tmp_path)}
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert not_modified_github.polls == 1
+    # the poll itself needs http.client, nothing else is loaded for a 304
+    assert not (HEAVY_MODULES - {"http.client"}) & set(modules)
+    # only the poll state was written, the run did not even open the thread store
+    assert sorted(path.name for path in state_dir.iterdir()) == ["poll_state.json"]
@@ -0,0 +1,177 @@
+"""Tests for the batched subject state resolver."""
+
+from types import SimpleNamespace
+
+from gh_taskw.accounts import Account
+from gh_taskw.rate_limit import RateLimitBudget
+from gh_taskw.state import PollState
+from gh_taskw.subject_cache import MAX_RECHECK_INTERVAL, SubjectCache, parse_timestamp
+from gh_taskw.subject_state import Subject, resolve_subject_states
+from gh_taskw.task_index import TaskIndex
+from gh_taskw.taskwarrior_handler import TaskwarriorHandler
+from tests.conftest import FakeGraphQLClient, FakeQuerySet, make_task
+
+
+def test_subject_from_url():
+    assert Subject.from_url("https://github.com/octo/repo/pull/12") == Subject(
+        "octo", "repo", "pull", 12
+    )
+    assert Subject.from_url("https://github.com/octo/repo/discussions/3").kind == (
+        "discussions"
+    )
+    assert (
+        Subject.from_url("https://github.com/octo/repo/actions/workflows/ci.yml")
+        is None
+    )
+
+
+def test_resolve_subject_states_in_chunks():
+    states = {("octo", "repo", n): "MERGED" if n % 2 else "OPEN" for n in range(250)}
+    states[("octo", "repo", 1000)] = "CLOSED"
+    states[("octo", "repo", 1001)] = "CLOSED"
+    client = FakeGraphQLClient(states)
+    urls = [f"https://github.com/octo/repo/pull/{n}" for n in range(250)] + [
+        "https://github.com/octo/repo/issues/1000",
+        "https://github.com/octo/repo/discussions/1001",
+        "https://github.com/octo/repo/pull/9999",
+        "https://github.com/octo/repo/actions/workflows/ci.yml",
+    ]
+
+    resolved = resolve_subject_states(client, urls)
+
+    assert len(client.queries) == 3
+    assert resolved["https://github.com/octo/repo/pull/1"] == "merged"
+    assert resolved["https://github.com/octo/repo/pull/2"] == "open"
+    assert resolved["https://github.com/octo/repo/issues/1000"] == "closed"
+    assert resolved["https://github.com/octo/repo/discussions/1001"] == "closed"
+    assert "https://github.com/octo/repo/pull/9999" not in resolved
+    assert len(resolved) == 252
+
+
+def test_cached_subjects_are_rechecked_on_schedule(tmp_path):
+    states = {("octo", "repo", n): "OPEN" for n in range(3)}
+    client = FakeGraphQLClient(states)
+    cache = SubjectCache(tmp_path / "subject_cache.json")
+    urls = [f"https://github.com/octo/repo/pull/{n}" for n in range(3)]
+
+    resolved = resolve_subject_states(client, urls, cache=cache, now=0)
+    assert set(resolved.values()) == {"open"}
+    assert len(client.queries) == 1
+
+    # nothing is due yet
+    resolve_subject_states(client, urls, cache=cache, now=30)
+    assert len(client.queries) == 1
+
+    # due subjects are rechecked together
+    states[("octo", "repo", 1)] = "MERGED"
+    resolved = resolve_subject_states(client, urls, cache=cache, now=100)
+    assert resolved[urls[1]] == "merged"
+    assert len(client.queries) == 2 and client.queries[1].count("repository(") == 3
+
+    # new activity makes a subject due right away
+    cache.mark_active(urls[2])
+    resolve_subject_states(client, urls, cache=cache, now=101)
+    assert len(client.queries) == 3 and client.queries[2].count("repository(") == 1
+
+    cache.save()
+    loaded = SubjectCache.load(tmp_path / "subject_cache.json")
+    assert loaded.get(urls[1]).state == "merged"
+
+    # caches written with the ETags of REST rechecks still load
+    (tmp_path / "old_cache.json").write_text(
+        '{"%s": {"state": "open", "checked_at": 0, "etag": "\\"etag-0\\""}}' % urls[0]
+    )
+    assert SubjectCache.load(tmp_path / "old_cache.json").get(urls[0]).state == "open"
+
+
+def test_warm_cache_sweep_is_batched(tmp_path):
+    client = FakeGraphQLClient({("octo", "repo", n): "OPEN" for n in range(300)})
+    cache = SubjectCache(tmp_path / "subject_cache.json")
+    urls = [f"https://github.com/octo/repo/pull/{n}" for n in range(300)]
+
+    resolve_subject_states(client, urls, cache=cache, now=0)
+    # the next sweep, when every cached subject is due again
+    resolve_subject_states(client, urls, cache=cache, now=MAX_RECHECK_INTERVAL)
+
+    assert len(client.queries) == 6
+    assert all(
+        entry.checked_at == MAX_RECHECK_INTERVAL for entry in cache.entries.values()
+    )
+
+
+def test_changed_subjects_in_the_stream_close_their_tasks(tmp_path):
+    def row(number, reason="subscribed", updated_at="2026-10-01T10:00:00Z"):
+        return {
+            "reason": reason,
+            "updated_at": updated_at,
+            "subject": {
+                "url": f"https://api.github.com/repos/octo/repo/pulls/{number}"
+            },
+        }
+
+    url = "https://github.com/octo/repo/pull/{}".format
+    client = FakeGraphQLClient({("octo", "repo", n): "MERGED" for n in (1, 3, 4)})
+    client.states[("octo", "repo", 2)] = "OPEN"
+    client.budget = RateLimitBudget()
+    commands = []
+    handler = TaskwarriorHandler(github=client, state_dir=tmp_path)
+    handler._tw = SimpleNamespace(
+        tasks=FakeQuerySet(
+            [
+                make_task("a", url(1), "review_requested"),
+                make_task("b", url(2), "review_requested"),
+                make_task("c", url(3), "review_requested"),
+                make_task("d", url(4), "mention"),
+            ]
+        ),
+        execute_command=commands.append,
+    )
+    handler._task_index = TaskIndex(handler._tw)
+
+    for number in (1, 2, 4):
+        handler.note_activity(row(number))
+    handler.close_changed_subjects()
+
+    # only the subjects with activity and a review task are looked up
+    assert len(client.queries) == 1 and "number: 3" not in client.queries[0]
+    assert commands == [["a", "done"]]
+
+    # a thread that is older than the last lookup is no change, a state_change is
+    handler.subject_cache.put(
+        url(2), "open", updated_at=parse_timestamp("2026-10-01T12:00:00Z")
+    )
+    handler.note_activity(row(2))
+    handler.close_changed_subjects()
+    assert len(client.queries) == 1
+    handler.note_activity(row(2, reason="state_change"))
+    handler.close_changed_subjects()
+    assert len(client.queries) == 2
+
+
+def test_subjects_are_resolved_with_the_account_that_can_see_them(tmp_path):
+    url = "https://github.com/{}/pull/{}".format
+    personal = FakeGraphQLClient({("octo", "repo", 1): "MERGED"})
+    work = FakeGraphQLClient(
+        {("octo", "repo", 1): "MERGED", ("corp", "private", 2): "MERGED"}
+    )
+    for client in (personal, work):
+        client.budget = RateLimitBudget()
+    commands = []
+    handler = TaskwarriorHandler(github=personal, state_dir=tmp_path)
+    handler.accounts.append(Account(name="work", github=work, poll_state=PollState()))
+    handler._tw = SimpleNamespace(
+        tasks=FakeQuerySet(
+            [
+                make_task("a", url("octo/repo", 1), "review_requested"),
+                make_task("b", url("corp/private", 2), "review_requested"),
+            ]
+        ),
+        execute_command=commands.append,
+    )
+    handler._task_index = TaskIndex(handler._tw)
+
+    handler.handle_closed_prs()
+
+    assert commands == [["a", "b", "done"]]
+    # the second account only looks up what the first one could not resolve
+    assert len(work.queries) == 1 and "octo" not in work.queries[0]
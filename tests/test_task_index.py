@@ -0,0 +1,31 @@
+"""Tests for the in-memory index of pending GitHub tasks."""
+
+from types import SimpleNamespace
+
+from gh_taskw.task_index import TaskIndex
+from tests.conftest import FakeQuerySet, make_task
+
+
+def test_task_index_lookups_export_once():
+    pr_url = "https://github.com/octo/repo/pull/1"
+    tasks = FakeQuerySet(
+        [
+            make_task("a", pr_url, "review_requested"),
+            make_task("b", "https://github.com/octo/repo/issues/2", "mention"),
+            {"uuid": "c", "githuburl": None, "tags": {"home"}},
+        ]
+    )
+    index = TaskIndex(SimpleNamespace(tasks=tasks))
+
+    assert index.get(pr_url, "review_requested")["uuid"] == "a"
+    assert index.get(pr_url, "mention") is None
+    assert [task["uuid"] for task in index.tasks_with_tag("review_requested")] == ["a"]
+
+    new_task = make_task("d", pr_url, "mention")
+    index.add(new_task)
+    assert index.get(pr_url, "mention") is new_task
+
+    index.remove(new_task)
+    assert index.get(pr_url, "mention") is None
+    assert len(index) == 2
+    assert tasks.exports == 1
@@ -0,0 +1,95 @@
+"""Tests for writing tasks, against the fake `task` of the benchmarks."""
+
+import json
+
+import pytest
+
+from benchmarks.fakes import install_fake_task, write_tasks
+from gh_taskw.replay import ReplayClient
+from gh_taskw.taskwarrior_handler import TaskwarriorHandler
+from tests.conftest import make_gh_notification
+
+
+class FakeTaskNoteHandler:
+    def __init__(self, notes_dir):
+        self.notes_dir = notes_dir
+
+    def create_note(self, task_id):
+        return self.notes_dir / f"{task_id}.md"
+
+
+@pytest.fixture
+def handler(tmp_path, monkeypatch):
+    monkeypatch.setenv("PATH", str(install_fake_task(tmp_path / "bin")), prepend=":")
+    write_tasks(
+        tmp_path / "taskdata",
+        [
+            {
+                "uuid": "0",
+                "id": 1,
+                "status": "pending",
+                "description": "Water the plants",
+            }
+        ],
+    )
+    handler = TaskwarriorHandler(
+        tasknote_handler=FakeTaskNoteHandler(tmp_path),
+        add_task_for_reasons=["review_requested", "mention"],
+        github=ReplayClient(),
+        taskdata=tmp_path / "taskdata",
+        state_dir=tmp_path / "state",
+    )
+    yield handler
+    handler.close()
+
+
+def stored_tasks(handler):
+    return json.loads((handler.taskdata / "tasks.json").read_text())
+
+
+def test_flush_tasks_imports_tasks_and_adds_their_tasknotes(handler, tmp_path):
+    first = handler.process_gh_notification(make_gh_notification(7))
+    second = handler.process_gh_notification(make_gh_notification(8, reason="mention"))
+    # a second notification of the subject doesn't queue another task
+    assert handler.process_gh_notification(make_gh_notification(7)) is None
+
+    handler.flush_tasks()
+
+    tasks = {task["uuid"]: task for task in stored_tasks(handler)}
+    assert (tasks[first]["id"], tasks[second]["id"]) == (2, 3)
+    assert (tmp_path / "2.md").read_text().splitlines() == [
+        "https://github.com/octo/repo/pull/7",
+        "title: PR 7",
+        "type: review_requested",
+    ]
+    note = (tmp_path / "3.md").read_text()
+    assert note.startswith("https://github.com/octo/repo/pull/8")
+    task = handler.task_index.get(
+        "https://github.com/octo/repo/pull/7", "review_requested"
+    )
+    assert task["id"] == 2
+
+
+def test_failed_import_does_not_block_the_subject(handler, monkeypatch):
+    from tasklib.backends import TaskWarriorException
+
+    execute_command = handler.tw.execute_command
+
+    def fail_import(args, *posargs, **kwargs):
+        if "import" in args:
+            raise TaskWarriorException("database is locked")
+        return execute_command(args, *posargs, **kwargs)
+
+    notification = make_gh_notification(7)
+    monkeypatch.setattr(handler.tw, "execute_command", fail_import)
+    assert handler.process_gh_notification(notification) is not None
+    with pytest.raises(TaskWarriorException):
+        handler.flush_tasks()
+    assert handler._pending_tasks == [] and handler._pending_tasknotes == []
+
+    # the retried notification queues its task again
+    monkeypatch.setattr(handler.tw, "execute_command", execute_command)
+    task_uuid = handler.process_gh_notification(notification)
+    assert task_uuid is not None
+    handler.flush_tasks()
+    assert [task["uuid"] for task in stored_tasks(handler)] == ["0", task_uuid]
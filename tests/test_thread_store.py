@@ -0,0 +1,105 @@
+"""Tests for the store of processed notification threads."""
+
+from gh_taskw.accounts import Account
+from gh_taskw.cli import process_notifications
+from gh_taskw.replay import ReplayClient
+from gh_taskw.state import PollState
+from gh_taskw.thread_store import ABANDONED, FAILED, HANDLED, MAX_ATTEMPTS, ThreadStore
+from tests.conftest import FakeHandler, make_notification
+
+
+def test_thread_store_outcomes(tmp_path):
+    store = ThreadStore(tmp_path / "threads.sqlite3")
+    handled, failed = make_notification("1"), make_notification("2")
+
+    store.record("default", handled, HANDLED, task_uuid="abc")
+    store.record("default", failed, FAILED)
+    assert not store.is_unchanged("default", handled)
+    store.commit()
+
+    assert store.is_unchanged("default", handled)
+    assert not store.is_unchanged(
+        "default", make_notification("1", updated_at="2026-10-02T10:00:00Z")
+    )
+    assert not store.is_unchanged("other", handled)
+    assert store.get("default", "1")["task_uuid"] == "abc"
+    assert store.failed("default") == [failed]
+
+    for _ in range(MAX_ATTEMPTS - 1):
+        store.record("default", failed, FAILED)
+        store.commit()
+    assert store.failed("default") == []
+
+    store.record("default", failed, FAILED)
+    store.rollback()
+    store.commit()
+    assert store.get("default", "2")["attempts"] == MAX_ATTEMPTS
+
+
+def test_unchanged_threads_are_skipped_and_failed_ones_retried(tmp_path):
+    notifications = [make_notification("1"), make_notification("2")]
+    account = Account(
+        name="default",
+        github=ReplayClient(notification_pages=[notifications]),
+        poll_state=PollState(),
+    )
+    handler = FakeHandler([account], ThreadStore(tmp_path / "threads.sqlite3"))
+    handler.fail = {2}
+
+    process_notifications(handler)
+    assert handler.processed == [("default", 1), ("default", 2)]
+    assert handler.thread_store.get("default", "2")["outcome"] == FAILED
+
+    # the same threads are delivered again: 1 is unchanged, 2 is retried
+    handler.processed.clear()
+    handler.fail.clear()
+    account.github = ReplayClient(notification_pages=[notifications])
+    account.poll_state.last_polled = 0
+    process_notifications(handler)
+    assert handler.processed == [("default", 2)]
+    assert handler.thread_store.get("default", "2")["task_uuid"] == "uuid-2"
+
+    # nothing new and nothing left to retry
+    handler.processed.clear()
+    account.github = ReplayClient(notification_pages=[notifications])
+    account.poll_state.last_polled = 0
+    process_notifications(handler)
+    assert handler.processed == []
+
+
+class RecordingReplayClient(ReplayClient):
+    def __init__(self, notification_pages):
+        super().__init__(notification_pages=notification_pages)
+        self.requests = []
+
+    def request(self, method, path, params=None, json_body=None, headers=None):
+        self.requests.append((method, path, json_body))
+        return super().request(method, path, params, json_body, headers)
+
+
+def test_threads_that_keep_failing_are_given_up(tmp_path):
+    notifications = [
+        make_notification("1"),
+        make_notification("2", updated_at="2026-10-01T09:00:00Z"),
+    ]
+    account = Account(name="default", github=ReplayClient(), poll_state=PollState())
+    handler = FakeHandler([account], ThreadStore(tmp_path / "threads.sqlite3"))
+    handler.fail = {2}
+
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        # the failing thread stays unread and is fetched again every cycle
+        account.github = RecordingReplayClient([notifications])
+        account.poll_state.last_polled = 0
+        process_notifications(handler)
+        mark_read = [
+            request for request in account.github.requests if request[0] != "GET"
+        ]
+        if attempt < MAX_ATTEMPTS:
+            # last_read_at must not reach the failed thread, 1 is marked on its own
+            assert mark_read == [("PATCH", "notifications/threads/1", None)]
+
+    assert handler.thread_store.get("default", "2")["outcome"] == ABANDONED
+    # back to a single call for the whole window
+    assert mark_read == [
+        ("PUT", "notifications", {"last_read_at": "2026-10-01T10:00:00Z", "read": True})
+    ]
@@ -0,0 +1,169 @@
+"""Tests for the webhook receiver, with recorded deliveries."""
+
+import json
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from gh_taskw.accounts import Account
+from gh_taskw.cli import run_cycles
+from gh_taskw.replay import ReplayClient
+from gh_taskw.state import PollState
+from gh_taskw.task_index import TaskIndex
+from gh_taskw.taskwarrior_handler import TaskwarriorHandler
+from gh_taskw.webhook import (
+    WebhookReceiver,
+    parse_event,
+    send_delivery,
+    sign,
+    verify_signature,
+)
+from tests.conftest import FakeHandler, FakeQuerySet, make_task
+
+DELIVERIES = Path(__file__).parent / "test_data" / "webhooks"
+PR_URL = "https://github.com/octocat/Hello-World/pull/1347"
+
+
+def load(name):
+    return json.loads((DELIVERIES / f"{name}.json").read_text())
+
+
+@pytest.fixture
+def receiver():
+    receiver = WebhookReceiver(FakeHandler(), "s3cret", login="monalisa", port=0)
+    receiver.start()
+    yield receiver
+    receiver.shutdown()
+
+
+def test_parse_event():
+    notification, closed_url = parse_event(
+        "pull_request", load("pull_request.review_requested"), login="monalisa"
+    )
+    assert closed_url is None
+    assert notification.reason == "review_requested"
+    assert notification.url == PR_URL
+    assert notification.id == 1347
+    assert (notification.owner, notification.repository) == ("octocat", "Hello-World")
+
+    assert parse_event("pull_request", load("pull_request.closed")) == (None, PR_URL)
+    comment = load("issue_comment.created")
+    assert parse_event("issue_comment", comment, "monalisa")[0].reason == "mention"
+    # review requests for someone else and your own comments don't notify you
+    review_requested = load("pull_request.review_requested")
+    assert parse_event("pull_request", review_requested, "other") == (None, None)
+    assert parse_event("issue_comment", comment, "hubot") == (None, None)
+
+
+def test_receiver_processes_signed_deliveries(receiver):
+    for event, name in [
+        ("pull_request", "pull_request.review_requested"),
+        ("issue_comment", "issue_comment.created"),
+        ("pull_request", "pull_request.closed"),
+    ]:
+        body = (DELIVERIES / f"{name}.json").read_bytes()
+        assert send_delivery(receiver.url, "s3cret", event, body) == 202
+
+    handler = receiver.handler
+    assert [n.reason for n in handler.notifications] == ["review_requested", "mention"]
+    assert handler.flushed == 2
+    assert handler.closed == [PR_URL]
+
+
+def test_receiver_rejects_bad_signatures(receiver):
+    body = (DELIVERIES / "pull_request.review_requested.json").read_bytes()
+
+    assert send_delivery(receiver.url, "wrong", "pull_request", body) == 401
+    assert send_delivery(receiver.url, "s3cret", "ping", b"{}") == 200
+    assert send_delivery(receiver.url, "s3cret", "pull_request", b"not json") == 400
+    assert receiver.handler.processed == []
+    assert verify_signature("s3cret", body, sign("s3cret", body))
+    assert not verify_signature("s3cret", body, "sha256=ünicode")
+
+
+def test_deliveries_during_a_poll_are_left_to_its_flush(receiver):
+    body = (DELIVERIES / "pull_request.review_requested.json").read_bytes()
+
+    receiver.polling.set()
+    assert send_delivery(receiver.url, "s3cret", "pull_request", body) == 202
+    assert len(receiver.handler.processed) == 1
+    assert receiver.handler.flushed == 0
+
+
+def test_a_poll_waits_for_the_flush_of_a_delivery(receiver):
+    body = (DELIVERIES / "pull_request.review_requested.json").read_bytes()
+    handler = receiver.handler
+    handler.accounts = [
+        Account(name="default", github=ReplayClient(), poll_state=PollState())
+    ]
+    events = []
+    flushing, release, stop = threading.Event(), threading.Event(), threading.Event()
+
+    class Polling(threading.Event):
+        def set(self):
+            events.append("poll")
+            super().set()
+
+    def flush_tasks():
+        events.append("flush")
+        flushing.set()
+        release.wait(timeout=5)
+        events.append("flushed")
+
+    receiver.polling = Polling()
+    handler.flush_tasks = flush_tasks
+    handler.write_metrics = stop.set
+    delivery = threading.Thread(
+        target=send_delivery, args=(receiver.url, "s3cret", "pull_request", body)
+    )
+    delivery.start()
+    assert flushing.wait(timeout=5)
+    cycle = threading.Thread(
+        target=run_cycles,
+        args=(handler, stop, 3600),
+        kwargs={"polling": receiver.polling},
+    )
+    cycle.start()
+    time.sleep(0.1)
+    release.set()
+    delivery.join(timeout=5)
+    cycle.join(timeout=5)
+
+    # the cycle only started queueing tasks once the delivery's flush was done
+    assert events[:3] == ["flush", "flushed", "poll"]
+
+
+def test_close_subject(tmp_path):
+    commands = []
+    tasks = FakeQuerySet(
+        [make_task("a", PR_URL, "review_requested"), make_task("b", PR_URL, "mention")]
+    )
+    handler = TaskwarriorHandler(github=ReplayClient(), state_dir=tmp_path)
+    handler._tw = SimpleNamespace(tasks=tasks, execute_command=commands.append)
+    handler._task_index = TaskIndex(handler._tw)
+
+    locks_held = []
+
+    def notify(notification):
+        # taken from another thread, as a processing worker would
+        def try_locks():
+            for lock in (handler._lock, handler.write_lock):
+                locks_held.append(not lock.acquire(blocking=False))
+                if not locks_held[-1]:
+                    lock.release()
+
+        thread = threading.Thread(target=try_locks)
+        thread.start()
+        thread.join()
+
+    handler.notifier = SimpleNamespace(notify=notify)
+
+    assert handler.close_subject(PR_URL)
+    assert not handler.close_subject(PR_URL)
+    assert commands == [["a", "done"]]
+    assert handler.task_index.get(PR_URL, "mention")["uuid"] == "b"
+    # the notification is sent without holding up the other workers
+    assert locks_held == [False, False]